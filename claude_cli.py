@@ -100,8 +100,13 @@ class ClaudeCLI:
                 return True
             elif tool == "search" and action == "pattern":
                 pattern = parts[2]
-                result = self.claude.search_files(pattern)
-                self.print_result(result)
+                # 边搜索边显示，找够结果后立即停止扫描
+                print("\n[搜索结果]")
+                count = 0
+                for match in self.claude.iter_search(pattern, max_results=20):
+                    print(f"  {match['file']}:{match['line_number']}: {match['line_content'][:100]}")
+                    count += 1
+                print(f"\n✅ 找到 {count} 个匹配")
                 return True
         except:
             pass
@@ -149,13 +154,25 @@ class ClaudeCLI:
    - action: "write" - 写入文件
    - action: "search" - 在文件中搜索
    - action: "list" - 列出目录
+   - action: "find" - 按文件名模糊查找文件（pattern 为查询，如 "srch tl"）
    
 3. search_tool - 在多个文件中搜索模式
    - 用于：搜索代码、查找文本等
    
-4. task_tool - 创建和管理子任务
-   - subagent_type: "plan-agent" - 制定计划
+4. symbol_tool - 查找符号定义与引用
+   - action: "definitions" - 类/函数/变量在哪里定义
+   - action: "references" - 在哪里被调用或导入
+   - action: "outline" - 列出文件中的符号
+   
+5. retrieve - 按相关性检索代码片段（本地 BM25 索引）
+   - 用于：不确定从哪里开始时，快速定位相关的函数和类
+   
+6. task_tool - 创建和管理子任务
+   - subagent_type: "plan-agent" - 制定计划（output_format: "json" 时输出可执行的结构化步骤图）
+   - depends_on: 依赖的任务 ID 列表，依赖完成后才开始执行
+   - budget: 可选的开销上限（max_total_tokens、deadline_seconds、max_tool_calls、max_cost_usd），达到后返回部分结果
    - subagent_type: "explore-agent" - 探索代码库
+   - subagent_type: "parallel-explore" - 分区并行探索大型代码库并合并结论
    - subagent_type: "general-purpose" - 复杂任务
 
 重要原则：
@@ -178,7 +195,9 @@ class ClaudeCLI:
             available_tools = {
                 "run_shell_command": self.claude.tools["bash"],
                 "file_tool": self.claude.tools["file"],
-                "search_tool": self.claude.tools["search"]
+                "search_tool": self.claude.tools["search"],
+                "symbol_tool": self.claude.tools["symbol"],
+                "retrieve": self.claude.tools["retrieve"]
             }
             
             # 调用 LLM
@@ -4,5 +4,7 @@ from .base_agent import BaseAgent
 from .general_purpose_agent import GeneralPurposeAgent
 from .plan_agent import PlanAgent
 from .explore_agent import ExploreAgent
+from .parallel_explore_agent import ParallelExploreAgent, partition_tree
 
-__all__ = ["BaseAgent", "GeneralPurposeAgent", "PlanAgent", "ExploreAgent"]
+__all__ = ["BaseAgent", "GeneralPurposeAgent", "PlanAgent", "ExploreAgent", "ParallelExploreAgent",
+           "partition_tree"]
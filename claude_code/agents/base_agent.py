@@ -1,17 +1,24 @@
 """Base agent class for Claude Code Python."""
 
 from abc import ABC, abstractmethod
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, List
 from ..tools import ToolResult
+from ..budget import Budget
 
 
 class BaseAgent(ABC):
     """Base class for all agents."""
     
-    def __init__(self, description: str, constraints: Optional[str] = None, output_format: Optional[str] = None):
+    def __init__(self, description: str, constraints: Optional[str] = None, output_format: Optional[str] = None,
+                 budget: Optional[Budget] = None):
         self.description = description
         self.constraints = constraints
         self.output_format = output_format
+        # Limits on each execute(); AGENT_* env vars apply when none is given
+        self.budget = budget if budget is not None else Budget.from_env()
+        # Paths (relative to the working directory) the agent should keep
+        # to, or None for the whole tree; agents that search honour it
+        self.scope: Optional[List[str]] = None
     
     @abstractmethod
     def execute(self, prompt: str) -> ToolResult:
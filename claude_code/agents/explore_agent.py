@@ -3,29 +3,53 @@
 import os
 from typing import Optional, List, Dict, Any
 from .base_agent import BaseAgent
-from ..tools import ToolResult, BashTool, FileTool, SearchTool
+from ..tools import ToolResult, BashTool, FileTool, SearchTool, SymbolTool, RetrieveTool
+from ..indexing.repo_map import repo_map_preamble
+from ..budget import Budget, BudgetTracker
 from ..llm_client import LLMClient
 
 
 class ExploreAgent(BaseAgent):
     """Explore agent for codebase exploration and analysis."""
     
-    def __init__(self, description: str, constraints: Optional[str] = None, output_format: Optional[str] = None):
-        super().__init__(description, constraints, output_format)
+    # Chunks retrieved up front for the prompt, and lines shown of each
+    CONTEXT_CHUNKS = 5
+    CONTEXT_SNIPPET_LINES = 6
+    # Token budget of the repository map included in the prompt
+    REPO_MAP_TOKENS = 1500
+    
+    def __init__(self, description: str, constraints: Optional[str] = None, output_format: Optional[str] = None,
+                 budget: Optional[Budget] = None):
+        super().__init__(description, constraints, output_format, budget)
         self.bash_tool = BashTool()
         self.file_tool = FileTool()
         self.search_tool = SearchTool()
+        self.symbol_tool = SymbolTool()
+        self.retrieve_tool = RetrieveTool()
         self.llm_client = LLMClient()
     
     def execute(self, prompt: str) -> ToolResult:
         """Execute the explore agent using LLM."""
+        # Prompt preparation counts against the deadline too
+        tracker = BudgetTracker(self.budget)
         try:
             system_prompt = self.get_system_prompt()
+            # Start from a map of the tree instead of spending the first
+            # iterations on ls, find and READMEs
+            repo_map = repo_map_preamble(".", self.REPO_MAP_TOKENS, scope=self.scope)
+            # Rank likely-relevant code locally so the first tool calls can
+            # go straight to the right files
+            context = self.retrieve_tool.preamble(prompt, top_k=self.CONTEXT_CHUNKS,
+                                                  snippet_lines=self.CONTEXT_SNIPPET_LINES,
+                                                  scope=self.scope)
+            # Directory searches stay within the scope
+            self.search_tool.scope = self.scope
             full_prompt = f"""{system_prompt}
-
+{repo_map}
 Exploration Request:
 {prompt}
 
+{context}
 Your role is to:
 1. Explore and understand the codebase structure
 2. Analyze code patterns, architecture, and conventions
@@ -34,13 +58,17 @@ Your role is to:
 5. Provide recommendations for improvements
 
 Use appropriate tools to explore files, search for patterns, and analyze the codebase.
+To find where a class or function is defined or called, prefer symbol_tool over regex searches.
+Use retrieve to rank code by relevance to a question when you don't know where to start.
 """
             
             # Prepare available tools
             available_tools = {
                 "run_shell_command": self.bash_tool,
                 "file_tool": self.file_tool,
-                "search_tool": self.search_tool
+                "search_tool": self.search_tool,
+                "symbol_tool": self.symbol_tool,
+                "retrieve": self.retrieve_tool
             }
             
             # Call LLM with tool support
@@ -48,6 +76,7 @@ Use appropriate tools to explore files, search for patterns, and analyze the cod
                 system_prompt=full_prompt,
                 user_prompt=prompt,
                 available_tools=available_tools,
+                tracker=tracker,
                 temperature=0.5  # Lower temperature for more focused analysis
             )
             
@@ -63,6 +92,8 @@ Use appropriate tools to explore files, search for patterns, and analyze the cod
                     "agent": "ExploreAgent",
                     "model": self.llm_client.model,
                     "exploration_type": "codebase_analysis",
+                    "context_chunks": context.count("\n- "),
+                    "repo_map": bool(repo_map),
                     **(result.metadata or {})
                 }
             )
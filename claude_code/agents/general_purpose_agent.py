@@ -3,16 +3,19 @@
 import os
 from typing import Optional, Dict, Any
 from .base_agent import BaseAgent
-from ..tools import ToolResult, BashTool, FileTool, SearchTool
+from ..tools import ToolResult, BashTool, PythonTool, FileTool, SearchTool
+from ..budget import Budget
 from ..llm_client import LLMClient
 
 
 class GeneralPurposeAgent(BaseAgent):
     """General purpose agent for complex tasks."""
     
-    def __init__(self, description: str, constraints: Optional[str] = None, output_format: Optional[str] = None):
-        super().__init__(description, constraints, output_format)
+    def __init__(self, description: str, constraints: Optional[str] = None, output_format: Optional[str] = None,
+                 budget: Optional[Budget] = None):
+        super().__init__(description, constraints, output_format, budget)
         self.bash_tool = BashTool()
+        self.python_tool = PythonTool()
         self.file_tool = FileTool()
         self.search_tool = SearchTool()
         self.llm_client = LLMClient()
@@ -28,6 +31,7 @@ User Request:
 
 You have access to the following tools:
 - BashTool (run_shell_command): Execute shell commands
+- PythonTool (run_python): Run Python snippets without interpreter start-up cost
 - FileTool (file_tool): Read, write, and search files
 - SearchTool (search_tool): Search for patterns in files
 
@@ -37,6 +41,7 @@ Please analyze the request and decide whether to use tools. If you need to use t
             # Prepare available tools
             available_tools = {
                 "run_shell_command": self.bash_tool,
+                "run_python": self.python_tool,
                 "file_tool": self.file_tool,
                 "search_tool": self.search_tool
             }
@@ -46,6 +51,7 @@ Please analyze the request and decide whether to use tools. If you need to use t
                 system_prompt=full_prompt,
                 user_prompt=prompt,
                 available_tools=available_tools,
+                budget=self.budget,
                 temperature=0.6
             )
             
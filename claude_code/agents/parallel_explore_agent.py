@@ -0,0 +1,223 @@
+"""Parallel Explore Agent that maps explorations over partitions of a codebase and reduces the findings."""
+
+import os
+from typing import Optional, List, Dict, Any
+from .base_agent import BaseAgent
+from ..tools import ToolResult
+from ..tools.task_tool import TaskManager
+from ..tools.walker import iter_files
+from ..budget import Budget, BudgetTracker
+from ..llm_client import LLMClient
+
+# Most sub-explorations run at once for one request
+MAX_PARTITIONS = 8
+
+
+def partition_tree(root: str, max_partitions: int = MAX_PARTITIONS) -> List[Dict[str, Any]]:
+    """
+    Split the files under `root` into at most `max_partitions` groups of similar size.
+
+    Directories heavier than an even share are split into their children
+    until every unit fits (or is a single file); runs of neighbouring units
+    then form the partitions.
+
+    Returns:
+        Partitions as {"paths", "files", "bytes"}, heaviest first; directory
+        paths end with "/"
+    """
+    sizes = {}
+    for rel_path, entry in iter_files(root):
+        try:
+            sizes[rel_path] = entry.stat().st_size
+        except OSError:
+            continue
+    if not sizes:
+        return []
+    target = sum(sizes.values()) / max(1, max_partitions)
+
+    def children(prefix: str) -> Dict[str, List[int]]:
+        units: Dict[str, List[int]] = {}
+        for rel_path, size in sizes.items():
+            if prefix and not rel_path.startswith(prefix):
+                continue
+            head, sep, _ = rel_path[len(prefix):].partition("/")
+            unit = units.setdefault(prefix + head + sep, [0, 0])
+            unit[0] += size
+            unit[1] += 1
+        return units
+
+    units = children("")
+    while True:
+        splittable = [path for path, (weight, _) in units.items() if path.endswith("/") and weight > target]
+        if not splittable:
+            break
+        heaviest = max(splittable, key=lambda path: units[path][0])
+        del units[heaviest]
+        units.update(children(heaviest))
+
+    # Cut the units, in path order so neighbouring code stays together, into
+    # runs of about an even share of what is left
+    partitions: List[Dict[str, Any]] = []
+    remaining = sum(sizes.values())
+    left = max(1, max_partitions)
+    share = remaining / left
+    current = None
+    for path, (weight, files) in sorted(units.items()):
+        if current is None or (left > 1 and current["bytes"] and current["bytes"] + weight / 2 > share):
+            if current is not None:
+                remaining -= current["bytes"]
+                left -= 1
+                share = remaining / left
+            current = {"paths": [], "files": 0, "bytes": 0}
+            partitions.append(current)
+        current["paths"].append(path)
+        current["files"] += files
+        current["bytes"] += weight
+    return sorted(partitions, key=lambda p: -p["bytes"])
+
+
+class ParallelExploreAgent(BaseAgent):
+    """Explore agent that fans out over partitions of a large codebase."""
+
+    # Total tokens one request may spend (unless its budget sets
+    # max_total_tokens), and the share one sub-exploration is expected to
+    # use; together they cap the number of partitions
+    TOKEN_BUDGET = 64000
+    TOKENS_PER_PARTITION = 8000
+    # Tokens of partition findings passed to the reduce step
+    REDUCE_TOKENS = 12000
+    CHARS_PER_TOKEN = 4
+
+    def __init__(self, description: str, constraints: Optional[str] = None, output_format: Optional[str] = None,
+                 budget: Optional[Budget] = None):
+        super().__init__(description, constraints, output_format, budget)
+        self.llm_client = LLMClient()
+
+    def execute(self, prompt: str) -> ToolResult:
+        """Explore each partition in parallel, then merge the findings with the LLM."""
+        task_manager = TaskManager()
+        budget = self.budget or Budget()
+        if budget.max_total_tokens is None:
+            budget = budget.model_copy(update={"max_total_tokens": self.TOKEN_BUDGET})
+        tracker = BudgetTracker(budget)
+        try:
+            max_partitions = max(1, min(MAX_PARTITIONS, budget.max_total_tokens // self.TOKENS_PER_PARTITION))
+            partitions = partition_tree(os.getcwd(), max_partitions)
+            if not partitions:
+                return ToolResult(success=False, error="ParallelExploreAgent found no files to explore")
+
+            # Each partition gets an even share of the budget; the reduce step keeps one share
+            child_budget = budget.split(len(partitions) + 1, deadline_seconds=tracker.remaining_seconds())
+
+            # Map: one explore-agent task per partition, run concurrently
+            task_ids = []
+            for i, partition in enumerate(partitions, 1):
+                task_ids.append(task_manager.create_task(
+                    agent_type="explore-agent",
+                    description=f"{self.description} (part {i}/{len(partitions)})",
+                    prompt=self._partition_prompt(prompt, partition),
+                    constraints=self.constraints,
+                    budget=child_budget,
+                    scope=partition["paths"]
+                ))
+            task_manager.wait_for_all_tasks(timeout=tracker.remaining_seconds())
+
+            findings = []
+            for partition, task_id in zip(partitions, task_ids):
+                task = task_manager.get_task_status(task_id)
+                response = None
+                if task.result is not None:
+                    tracker.merge((task.result.metadata or {}).get("budget"))
+                if task.status == "completed" and task.result and task.result.success:
+                    response = (task.result.data.get("llm_result") or {}).get("llm_response")
+                findings.append({
+                    "paths": partition["paths"],
+                    "files": partition["files"],
+                    "status": task.status if response else "failed",
+                    "findings": response,
+                    "error": task.error or (task.result.error if task.result else None)
+                })
+
+            # Reduce: merge the partition findings into one analysis
+            analysis = self._reduce(prompt, findings, tracker)
+
+            return ToolResult(
+                success=any(f["findings"] for f in findings),
+                data={
+                    "agent_type": "parallel-explore",
+                    "description": self.description,
+                    "analysis": analysis,
+                    "partitions": findings,
+                    "prompt": prompt
+                },
+                metadata={
+                    "agent": "ParallelExploreAgent",
+                    "model": self.llm_client.model,
+                    "exploration_type": "partitioned_codebase_analysis",
+                    "partitions": len(partitions),
+                    "failed_partitions": sum(1 for f in findings if not f["findings"]),
+                    "budget": tracker.report()
+                }
+            )
+
+        except Exception as e:
+            return ToolResult(
+                success=False,
+                error=f"ParallelExploreAgent execution failed: {str(e)}"
+            )
+        finally:
+            # Past a deadline, leave late sub-explorations to finish in the background
+            task_manager.executor.shutdown(wait=tracker.exhausted is None)
+
+    def _partition_prompt(self, prompt: str, partition: Dict[str, Any]) -> str:
+        """The exploration request scoped to one partition."""
+        paths = "\n".join(f"- {path}" for path in partition["paths"])
+        return f"""{prompt}
+
+You are exploring one part of a larger codebase; other agents cover the rest.
+Only explore these paths ({partition['files']} files):
+{paths}
+
+Report concrete findings for these paths (components, responsibilities, notable
+patterns, dependencies on code outside them) so they can be merged with the
+other parts."""
+
+    def _reduce(self, prompt: str, findings: List[Dict[str, Any]], tracker: BudgetTracker) -> str:
+        """
+        Merge partition findings; falls back to concatenating them if the
+        budget is spent or the LLM call fails.
+        """
+        share = self.REDUCE_TOKENS * self.CHARS_PER_TOKEN // max(1, len(findings))
+        sections = []
+        for finding in findings:
+            text = finding["findings"] or f"(exploration failed: {finding['error']})"
+            if len(text) > share:
+                text = text[:share] + "\n... (truncated)"
+            sections.append(f"## Partition: {', '.join(finding['paths'])}\n{text}")
+        merged = "\n\n".join(sections)
+        if tracker.check():
+            return merged
+
+        system_prompt = f"""{self.get_system_prompt()}
+
+Several agents explored separate parts of one codebase for the request below.
+Merge their findings into one coherent analysis: the overall architecture, key
+components and how they relate across parts, conventions, and recommendations.
+Remove duplication and resolve contradictions; keep concrete file references.
+
+Exploration Request:
+{prompt}
+"""
+        try:
+            response = self.llm_client.chat_completion(
+                messages=[
+                    {"role": "system", "content": system_prompt},
+                    {"role": "user", "content": merged}
+                ],
+                temperature=0.3,
+                timeout=tracker.remaining_seconds()
+            )
+            tracker.record_usage(getattr(response, "usage", None))
+            return response.choices[0].message.content
+        except Exception:
+            return merged
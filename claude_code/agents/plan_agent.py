@@ -3,22 +3,41 @@
 from typing import Optional
 from .base_agent import BaseAgent
 from ..tools import ToolResult
+from ..indexing.repo_map import repo_map_preamble
+from ..budget import Budget, BudgetTracker
 from ..llm_client import LLMClient
+from ..planning import PLAN_JSON_INSTRUCTIONS, parse_plan
 
 
 class PlanAgent(BaseAgent):
-    """Plan agent for planning and analysis tasks."""
+    """
+    Plan agent for planning and analysis tasks.
     
-    def __init__(self, description: str, constraints: Optional[str] = None, output_format: Optional[str] = None):
-        super().__init__(description, constraints, output_format)
+    In structured mode (structured=True, or output_format "json") the plan
+    is a JSON step graph validated as a Plan, ready for PlanExecutor.
+    """
+    
+    # Token budget of the repository map included in the prompt
+    REPO_MAP_TOKENS = 1000
+    # Extra attempts when a structured plan fails validation
+    STRUCTURED_RETRIES = 1
+    
+    def __init__(self, description: str, constraints: Optional[str] = None, output_format: Optional[str] = None,
+                 budget: Optional[Budget] = None, structured: bool = False):
+        super().__init__(description, constraints, output_format, budget)
+        self.structured = structured or (output_format or "").strip().lower() == "json"
         self.llm_client = LLMClient()
     
     def execute(self, prompt: str) -> ToolResult:
         """Execute the plan agent using LLM."""
+        # Prompt preparation counts against the deadline too
+        tracker = BudgetTracker(self.budget)
         try:
             system_prompt = self.get_system_prompt()
+            # Plans can name real files and modules without a tool loop
+            repo_map = repo_map_preamble(".", self.REPO_MAP_TOKENS)
             full_prompt = f"""{system_prompt}
-
+{repo_map}
 Planning Request:
 {prompt}
 
@@ -29,7 +48,7 @@ Your role is to:
 4. Identify potential challenges and solutions
 5. Suggest the best approach and tools to use
 
-Please provide a detailed plan with numbered steps.
+{PLAN_JSON_INSTRUCTIONS if self.structured else "Please provide a detailed plan with numbered steps."}
 """
             
             # Call LLM for planning
@@ -38,25 +57,51 @@ Please provide a detailed plan with numbered steps.
                 {"role": "user", "content": prompt}
             ]
             
-            response = self.llm_client.chat_completion(
-                messages=messages,
-                temperature=0.3  # Lower temperature for more focused planning
-            )
-            
-            plan = response.choices[0].message.content
+            plan = None
+            structured_plan = None
+            error = None
+            for attempt in range(1 + (self.STRUCTURED_RETRIES if self.structured else 0)):
+                exhausted = tracker.check()
+                if exhausted:
+                    error = error or f"Stopped early: {exhausted}"
+                    break
+                response = self.llm_client.chat_completion(
+                    messages=messages,
+                    temperature=0.3,  # Lower temperature for more focused planning
+                    timeout=tracker.remaining_seconds()
+                )
+                tracker.record_usage(getattr(response, "usage", None))
+                tracker.record_iteration()
+                
+                plan = response.choices[0].message.content
+                if not self.structured:
+                    break
+                try:
+                    structured_plan = parse_plan(plan).model_dump()
+                    error = None
+                    break
+                except ValueError as e:
+                    # Show the model what failed validation and ask again
+                    error = f"Plan did not match the schema: {str(e)}"
+                    messages.append({"role": "assistant", "content": plan})
+                    messages.append({"role": "user", "content": f"{error}\nReply with the corrected JSON only."})
             
             return ToolResult(
-                success=True,
+                success=error is None,
                 data={
                     "agent_type": "plan-agent",
                     "description": self.description,
                     "plan": plan,
+                    "structured_plan": structured_plan,
                     "prompt": prompt
                 },
+                error=error,
                 metadata={
                     "agent": "PlanAgent",
                     "model": self.llm_client.model,
-                    "output_type": "plan"
+                    "output_type": "structured_plan" if self.structured else "plan",
+                    "repo_map": bool(repo_map),
+                    "budget": tracker.report()
                 }
             )
             
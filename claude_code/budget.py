@@ -0,0 +1,173 @@
+"""Token, time, tool-call and cost budgets for agent runs."""
+
+import os
+import threading
+import time
+from typing import Optional, Dict, Any
+from pydantic import BaseModel
+
+
+class Budget(BaseModel):
+    """Limits on one agent run; ``None`` leaves a limit unbounded.
+
+    Checked by the LLM tool loop before every iteration and tool call: a
+    run that reaches a limit stops with what it has so far instead of
+    failing. Cost is computed from token counts and the per-million-token
+    prices, so ``max_cost_usd`` needs those prices set.
+    """
+    max_prompt_tokens: Optional[int] = None
+    max_completion_tokens: Optional[int] = None
+    max_total_tokens: Optional[int] = None
+    deadline_seconds: Optional[float] = None
+    max_iterations: Optional[int] = None
+    max_tool_calls: Optional[int] = None
+    max_tool_calls_per_tool: Dict[str, int] = {}
+    max_cost_usd: Optional[float] = None
+    prompt_price_per_million: float = 0.0
+    completion_price_per_million: float = 0.0
+
+    @classmethod
+    def from_env(cls) -> Optional["Budget"]:
+        """Create a budget from AGENT_* env vars, or None if none are set."""
+        fields = {
+            "max_total_tokens": ("AGENT_MAX_TOKENS", int),
+            "deadline_seconds": ("AGENT_DEADLINE_SECONDS", float),
+            "max_tool_calls": ("AGENT_MAX_TOOL_CALLS", int),
+            "max_cost_usd": ("AGENT_MAX_COST_USD", float),
+        }
+        values = {name: convert(os.environ[var]) for name, (var, convert) in fields.items()
+                  if os.getenv(var)}
+        if not values:
+            return None
+        for name, var in (("prompt_price_per_million", "LLM_PROMPT_PRICE_PER_MILLION"),
+                          ("completion_price_per_million", "LLM_COMPLETION_PRICE_PER_MILLION")):
+            if os.getenv(var):
+                values[name] = float(os.environ[var])
+        return cls(**values)
+
+    def split(self, parts: int, deadline_seconds: Optional[float] = None) -> "Budget":
+        """
+        An even share of this budget for each of `parts` concurrent sub-runs.
+
+        Token, tool-call and cost limits are divided; the deadline (by
+        default this budget's) and the iteration limit apply to each part whole.
+        """
+        parts = max(1, parts)
+
+        def share(value):
+            if value is None:
+                return None
+            return max(1, value // parts) if isinstance(value, int) else value / parts
+
+        return self.model_copy(update={
+            "max_prompt_tokens": share(self.max_prompt_tokens),
+            "max_completion_tokens": share(self.max_completion_tokens),
+            "max_total_tokens": share(self.max_total_tokens),
+            "max_tool_calls": share(self.max_tool_calls),
+            "max_tool_calls_per_tool": {name: max(1, limit // parts)
+                                        for name, limit in self.max_tool_calls_per_tool.items()},
+            "max_cost_usd": share(self.max_cost_usd),
+            "deadline_seconds": self.deadline_seconds if deadline_seconds is None else deadline_seconds,
+        })
+
+
+class BudgetTracker:
+    """Spend of one run against a Budget; safe to share between threads."""
+
+    def __init__(self, budget: Optional[Budget] = None):
+        self.budget = budget or Budget()
+        self.started = time.time()
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.iterations = 0
+        self.tool_calls: Dict[str, int] = {}
+        self.exhausted: Optional[str] = None  # Why the run was stopped, once it is
+        self._lock = threading.Lock()
+
+    @property
+    def cost_usd(self) -> float:
+        return (self.prompt_tokens * self.budget.prompt_price_per_million +
+                self.completion_tokens * self.budget.completion_price_per_million) / 1_000_000
+
+    def remaining_seconds(self) -> Optional[float]:
+        """Seconds until the deadline, or None without one."""
+        if self.budget.deadline_seconds is None:
+            return None
+        return max(0.0, self.started + self.budget.deadline_seconds - time.time())
+
+    def record_usage(self, usage: Any) -> None:
+        """Add the token usage of an LLM response (its `usage` attribute; may be None)."""
+        if usage is None:
+            return
+        with self._lock:
+            self.prompt_tokens += getattr(usage, "prompt_tokens", 0) or 0
+            self.completion_tokens += getattr(usage, "completion_tokens", 0) or 0
+
+    def record_iteration(self) -> None:
+        with self._lock:
+            self.iterations += 1
+
+    def merge(self, report: Optional[Dict[str, Any]]) -> None:
+        """Add the spend of a sub-run, as returned by its tracker's report()."""
+        if not report:
+            return
+        with self._lock:
+            self.prompt_tokens += report.get("prompt_tokens", 0)
+            self.completion_tokens += report.get("completion_tokens", 0)
+            for name, calls in report.get("tool_calls", {}).items():
+                self.tool_calls[name] = self.tool_calls.get(name, 0) + calls
+
+    def check(self) -> Optional[str]:
+        """The first limit reached, as a reason string, or None if the run may go on."""
+        budget = self.budget
+        with self._lock:
+            total = self.prompt_tokens + self.completion_tokens
+            reason = None
+            if budget.max_prompt_tokens is not None and self.prompt_tokens >= budget.max_prompt_tokens:
+                reason = f"prompt token budget of {budget.max_prompt_tokens} reached"
+            elif budget.max_completion_tokens is not None and self.completion_tokens >= budget.max_completion_tokens:
+                reason = f"completion token budget of {budget.max_completion_tokens} reached"
+            elif budget.max_total_tokens is not None and total >= budget.max_total_tokens:
+                reason = f"token budget of {budget.max_total_tokens} reached"
+            elif budget.max_cost_usd is not None and self.cost_usd >= budget.max_cost_usd:
+                reason = f"cost budget of ${budget.max_cost_usd} reached"
+            elif budget.max_iterations is not None and self.iterations >= budget.max_iterations:
+                reason = f"iteration budget of {budget.max_iterations} reached"
+            elif budget.deadline_seconds is not None and \
+                    time.time() - self.started >= budget.deadline_seconds:
+                reason = f"deadline of {budget.deadline_seconds}s reached"
+            if reason and self.exhausted is None:
+                self.exhausted = reason
+            return reason
+
+    def allow_tool_call(self, tool_name: str) -> Optional[str]:
+        """
+        Count a call to `tool_name` if the budget allows it.
+
+        Returns:
+            None if the call may go ahead, otherwise why it may not
+        """
+        budget = self.budget
+        with self._lock:
+            calls = sum(self.tool_calls.values())
+            if budget.max_tool_calls is not None and calls >= budget.max_tool_calls:
+                return f"tool call budget of {budget.max_tool_calls} reached"
+            limit = budget.max_tool_calls_per_tool.get(tool_name)
+            if limit is not None and self.tool_calls.get(tool_name, 0) >= limit:
+                return f"budget of {limit} calls to {tool_name} reached"
+            self.tool_calls[tool_name] = self.tool_calls.get(tool_name, 0) + 1
+            return None
+
+    def report(self) -> Dict[str, Any]:
+        """The spend so far, for result metadata."""
+        with self._lock:
+            return {
+                "prompt_tokens": self.prompt_tokens,
+                "completion_tokens": self.completion_tokens,
+                "total_tokens": self.prompt_tokens + self.completion_tokens,
+                "cost_usd": round(self.cost_usd, 6),
+                "elapsed_seconds": round(time.time() - self.started, 3),
+                "iterations": self.iterations,
+                "tool_calls": dict(self.tool_calls),
+                "exhausted": self.exhausted
+            }
@@ -0,0 +1,17 @@
+"""Persistent indexes that speed up code search and exploration."""
+
+from .trigram import TrigramIndex, build_index, refresh_index, get_trigram_index, plan_query
+from .bm25 import BM25Index, get_bm25_index
+from .paths import PathIndex, get_path_index, fuzzy_match
+from .repo_map import RepoMap, get_repo_map, repo_map_preamble
+from .symbols import SymbolIndex, get_symbol_index, register_extractor
+from .watcher import FileChange, ChangeBus, get_change_bus, watch_directory, unwatch_directory
+
+__all__ = [
+    "TrigramIndex", "build_index", "refresh_index", "get_trigram_index", "plan_query",
+    "BM25Index", "get_bm25_index",
+    "PathIndex", "get_path_index", "fuzzy_match",
+    "RepoMap", "get_repo_map", "repo_map_preamble",
+    "SymbolIndex", "get_symbol_index", "register_extractor",
+    "FileChange", "ChangeBus", "get_change_bus", "watch_directory", "unwatch_directory",
+]
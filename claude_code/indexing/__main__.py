@@ -0,0 +1,121 @@
+"""
+Command-line interface for building and inspecting search indexes.
+
+Usage:
+    python -m claude_code.indexing build [ROOT] [--max-file-size BYTES] [--all]
+    python -m claude_code.indexing refresh [ROOT]
+    python -m claude_code.indexing stats [ROOT]
+    python -m claude_code.indexing query PATTERN [ROOT] [-i]
+    python -m claude_code.indexing symbols NAME [ROOT] [--references]
+    python -m claude_code.indexing retrieve QUERY [ROOT] [-k N]
+    python -m claude_code.indexing map [ROOT] [--tokens N]
+"""
+
+import argparse
+import json
+import re
+import sys
+import time
+
+from .bm25 import get_bm25_index
+from .repo_map import DEFAULT_MAP_TOKENS, get_repo_map
+from .symbols import get_symbol_index
+from .trigram import DEFAULT_MAX_FILE_SIZE, build_index, refresh_index, get_trigram_index
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(prog="python -m claude_code.indexing",
+                                     description="Build and inspect code search indexes")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    build = commands.add_parser("build", help="Build the trigram index from scratch")
+    build.add_argument("root", nargs="?", default=".")
+    build.add_argument("--max-file-size", type=int, default=DEFAULT_MAX_FILE_SIZE,
+                       help="Skip files larger than this many bytes")
+    build.add_argument("--all", action="store_true",
+                       help="Also update the symbol, BM25 and repository map indexes used by tools and agents")
+
+    refresh = commands.add_parser("refresh", help="Rebuild the index if files changed")
+    refresh.add_argument("root", nargs="?", default=".")
+
+    stats = commands.add_parser("stats", help="Show index statistics")
+    stats.add_argument("root", nargs="?", default=".")
+
+    query = commands.add_parser("query", help="List candidate files for a regex")
+    query.add_argument("pattern")
+    query.add_argument("root", nargs="?", default=".")
+    query.add_argument("-i", "--ignore-case", action="store_true")
+
+    symbols = commands.add_parser("symbols", help="Update the symbol index and look up a name")
+    symbols.add_argument("name")
+    symbols.add_argument("root", nargs="?", default=".")
+    symbols.add_argument("--references", action="store_true",
+                         help="List call sites and imports instead of definitions")
+
+    retrieve = commands.add_parser("retrieve", help="Update the BM25 index and rank chunks for a query")
+    retrieve.add_argument("query")
+    retrieve.add_argument("root", nargs="?", default=".")
+    retrieve.add_argument("-k", "--top-k", type=int, default=10)
+
+    repo_map = commands.add_parser("map", help="Update and print the repository map")
+    repo_map.add_argument("root", nargs="?", default=".")
+    repo_map.add_argument("--tokens", type=int, default=DEFAULT_MAP_TOKENS,
+                          help="Approximate token budget of the map")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "map":
+        print(get_repo_map(args.root).render(args.tokens), end="")
+        return 0
+
+    if args.command == "build":
+        result = build_index(args.root, max_file_size=args.max_file_size)
+        if args.all:
+            for name, get_index in (("symbols", get_symbol_index), ("bm25", get_bm25_index),
+                                    ("repo_map", get_repo_map)):
+                result[name] = get_index(args.root).stats()
+    elif args.command == "refresh":
+        result = refresh_index(args.root)
+    elif args.command == "symbols":
+        index = get_symbol_index(args.root)
+        started = time.perf_counter()
+        locations = index.references(args.name) if args.references else index.definitions(args.name)
+        result = {
+            "name": args.name,
+            "files": len(index.files),
+            "milliseconds": round((time.perf_counter() - started) * 1000, 3),
+            "locations": locations
+        }
+    elif args.command == "retrieve":
+        index = get_bm25_index(args.root)
+        started = time.perf_counter()
+        chunks = index.search(args.query, top_k=args.top_k)
+        result = {
+            "query": args.query,
+            "files": len(index.files),
+            "milliseconds": round((time.perf_counter() - started) * 1000, 3),
+            "chunks": chunks
+        }
+    else:
+        index = get_trigram_index(args.root)
+        if index is None:
+            print(f"No index for {args.root}; run 'build' first", file=sys.stderr)
+            return 1
+        if args.command == "stats":
+            result = index.stats()
+        else:
+            started = time.perf_counter()
+            candidates = index.candidates(args.pattern, re.IGNORECASE if args.ignore_case else 0)
+            result = {
+                "candidates": len(candidates),
+                "files": len(index.files),
+                "milliseconds": round((time.perf_counter() - started) * 1000, 3),
+                "paths": candidates
+            }
+
+    print(json.dumps(result, indent=2, ensure_ascii=False))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,277 @@
+"""Local BM25 retrieval over chunks of a repository (functions, classes, paragraphs)."""
+
+import ast
+import heapq
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Optional, List, Dict, Any, Iterable, Sequence, Tuple, Union
+
+from ..tools.encoding import read_text_file
+from .file_index import FileIndex
+from .symbols import EXTRACTORS
+from .trigram import DEFAULT_MAX_FILE_SIZE
+
+BM25_FILE = "bm25.json"
+BM25_VERSION = 1
+
+# Okapi BM25 parameters
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+# Longer chunks are split into windows of this many lines
+CHUNK_MAX_LINES = 80
+
+_WORD = re.compile(r"\w+")
+_SUBWORD = re.compile(r"[A-Z]+(?![a-z])|[A-Z]?[a-z]+|\d+")
+STOPWORDS = frozenset("""
+a an and are as at be but by for from has have if in into is it its of on or self that the
+this to was were will with not no do does def class return none true false import else elif
+var let const function new public private static void int str
+""".split())
+
+# A chunk as stored: [start_line, end_line, title, length, {term: frequency}]
+Chunk = List[Any]
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Lowercased search terms of a text.
+
+    Identifiers count as themselves and as their parts, so "parse_config",
+    "parseConfig" and "config" all match a chunk defining parseConfig.
+    """
+    terms = []
+    for word in _WORD.findall(text):
+        lower = word.lower()
+        if len(lower) > 1 and lower not in STOPWORDS and not lower.isdigit():
+            terms.append(lower)
+        parts = [part.lower() for piece in word.split("_") for part in _SUBWORD.findall(piece)]
+        if len(parts) > 1:
+            terms.extend(part for part in parts if len(part) > 1 and part not in STOPWORDS
+                         and not part.isdigit())
+    return terms
+
+
+def _python_spans(text: str) -> Optional[List[Tuple[int, int, str]]]:
+    """Functions, methods and class bodies of Python source as (start, end, title)."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return None
+    spans = []
+
+    def start_of(node) -> int:
+        return min([node.lineno] + [d.lineno for d in getattr(node, "decorator_list", [])])
+
+    for node in tree.body:
+        if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef)):
+            spans.append((start_of(node), node.end_lineno, node.name))
+        elif isinstance(node, ast.ClassDef):
+            methods = [n for n in node.body if isinstance(n, (ast.FunctionDef, ast.AsyncFunctionDef))]
+            header_end = start_of(methods[0]) - 1 if methods else node.end_lineno
+            spans.append((start_of(node), header_end, node.name))
+            for method in methods:
+                spans.append((start_of(method), method.end_lineno, f"{node.name}.{method.name}"))
+    return spans
+
+
+def _definition_spans(text: str, extension: str) -> Optional[List[Tuple[int, int, str]]]:
+    """Spans from one definition line to the next, via the symbol extractors."""
+    extractor = EXTRACTORS.get(extension)
+    if extractor is None:
+        return None
+    defs = sorted({(d[2], d[3]) for d in extractor(text)["defs"]})
+    line_count = text.count("\n") + 1
+    return [(line, (defs[i + 1][0] - 1 if i + 1 < len(defs) else line_count), title)
+            for i, (line, title) in enumerate(defs)]
+
+
+def chunk_text(text: str, extension: str) -> List[Tuple[int, int, str]]:
+    """
+    Split a file into (start line, end line, title) chunks.
+
+    Python is split per function, method and class header; other code at
+    the definitions its symbol extractor finds; anything else, and code
+    between definitions, into blank-line separated paragraphs. No chunk
+    is longer than CHUNK_MAX_LINES.
+    """
+    lines = text.split("\n")
+    spans = _python_spans(text) if extension in (".py", ".pyi") else None
+    if spans is None:
+        spans = _definition_spans(text, extension) or []
+
+    covered = [False] * (len(lines) + 2)
+    for start, end, _ in spans:
+        for line in range(start, end + 1):
+            covered[line] = True
+    # Uncovered lines become paragraphs
+    paragraph_start = None
+    for number in range(1, len(lines) + 2):
+        blank = number > len(lines) or covered[number] or not lines[number - 1].strip()
+        if not blank and paragraph_start is None:
+            paragraph_start = number
+        elif blank and paragraph_start is not None:
+            spans.append((paragraph_start, number - 1, lines[paragraph_start - 1].strip()[:80]))
+            paragraph_start = None
+
+    chunks = []
+    for start, end, title in sorted(spans):
+        for window_start in range(start, end + 1, CHUNK_MAX_LINES):
+            chunks.append((window_start, min(end, window_start + CHUNK_MAX_LINES - 1), title))
+    return chunks
+
+
+class BM25Index(FileIndex):
+    """
+    Okapi BM25 ranking over repository chunks, persisted per file.
+
+    Each chunk stores its term frequencies; postings (term -> chunk ->
+    frequency) are kept in memory and updated per file, so a query only
+    touches the chunks that contain one of its terms.
+    """
+
+    FILE_NAME = BM25_FILE
+    VERSION = BM25_VERSION
+
+    def __init__(self, root: str, index_dir: Optional[str] = None,
+                 max_file_size: int = DEFAULT_MAX_FILE_SIZE):
+        self._postings: Dict[str, Dict[Tuple[str, int], int]] = {}
+        self._lengths: Dict[Tuple[str, int], int] = {}
+        self._total_length = 0
+        super().__init__(root, index_dir, max_file_size)
+
+    def extract(self, path: str) -> Optional[Dict[str, Any]]:
+        text = read_text_file(path)
+        if text is None:
+            return None
+        rel_path = os.path.relpath(path, self.root).replace(os.sep, "/")
+        path_terms = tokenize(rel_path)
+        lines = text.split("\n")
+        chunks = []
+        for start, end, title in chunk_text(text, os.path.splitext(path)[1].lower()):
+            terms = tokenize("\n".join(lines[start - 1:end])) + path_terms
+            if terms:
+                chunks.append([start, end, title, len(terms), dict(Counter(terms))])
+        return {"chunks": chunks}
+
+    def _add(self, rel_path: str, entry: Dict[str, Any]) -> None:
+        super()._add(rel_path, entry)
+        for i, chunk in enumerate(entry["chunks"]):
+            key = (rel_path, i)
+            self._lengths[key] = chunk[3]
+            self._total_length += chunk[3]
+            for term, frequency in chunk[4].items():
+                self._postings.setdefault(term, {})[key] = frequency
+
+    def _remove(self, rel_path: str) -> Optional[Dict[str, Any]]:
+        entry = super()._remove(rel_path)
+        if entry is None:
+            return None
+        for i, chunk in enumerate(entry["chunks"]):
+            key = (rel_path, i)
+            self._total_length -= self._lengths.pop(key, 0)
+            for term in chunk[4]:
+                postings = self._postings.get(term)
+                if postings is not None:
+                    postings.pop(key, None)
+                    if not postings:
+                        del self._postings[term]
+        return entry
+
+    def search(self, query: str, top_k: int = 10, scope: Optional[Union[str, Sequence[str]]] = None,
+               snippet_lines: int = 0) -> List[Dict[str, Any]]:
+        """
+        The `top_k` chunks ranked by BM25 against `query`.
+
+        Args:
+            query: Free text; identifiers are split as in tokenize()
+            top_k: Number of chunks to return
+            scope: Only chunks of files under this directory or file (or
+                under any of several)
+            snippet_lines: Include up to this many lines of each chunk's text
+
+        Returns:
+            Dicts with file, start_line, end_line, title, score (and text)
+        """
+        self._sync()
+        terms = set(tokenize(query))
+        prefixes = None
+        scopes = [scope] if isinstance(scope, str) else scope
+        if scopes is not None and all(os.path.abspath(path) != self.root for path in scopes):
+            prefixes = [os.path.relpath(os.path.abspath(path), self.root).replace(os.sep, "/")
+                        for path in scopes]
+        with self._lock:
+            count = len(self._lengths)
+            if not count:
+                return []
+            average = self._total_length / count
+            scores: Dict[Tuple[str, int], float] = {}
+            for term in terms:
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for key, frequency in postings.items():
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._lengths[key] / average)
+                    scores[key] = scores.get(key, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+            if prefixes is not None:
+                scores = {key: score for key, score in scores.items()
+                          if any(key[0] == prefix or key[0].startswith(prefix + "/") for prefix in prefixes)}
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], item[0][0], -item[0][1]))
+            results = []
+            for (rel_path, i), score in best:
+                start, end, title = self.files[rel_path]["chunks"][i][:3]
+                results.append({"file": os.path.join(self.root, rel_path), "start_line": start,
+                                "end_line": end, "title": title, "score": round(score, 4)})
+        if snippet_lines:
+            for result in results:
+                result["text"] = self._snippet(result["file"], result["start_line"],
+                                               min(result["end_line"], result["start_line"] + snippet_lines - 1))
+        return results
+
+    @staticmethod
+    def _snippet(path: str, start: int, end: int) -> str:
+        text = read_text_file(path) or ""
+        return "\n".join(text.split("\n")[start - 1:end])
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "root": self.root,
+                "files": len(self.files),
+                "chunks": len(self._lengths),
+                "terms": len(self._postings),
+                "updated_at": self.updated_at,
+                "pending_changes": len(self._dirty)
+            }
+
+
+_open_indexes: Dict[str, BM25Index] = {}
+_open_lock = threading.Lock()
+
+
+def get_bm25_index(root: str, update: bool = True) -> BM25Index:
+    """
+    Get the shared BM25 index for a root, loading it from disk if saved.
+
+    The first call per process runs update() (unless `update` is False),
+    which re-chunks only files whose mtime changed since the index was saved.
+    """
+    root = os.path.abspath(root)
+    with _open_lock:
+        index = _open_indexes.get(root)
+        if index is None:
+            index = BM25Index(root)
+            _open_indexes[root] = index
+            index.subscribe()
+            if update:
+                index.update()
+        return index
+
+
+def find_bm25_root(path: str) -> Optional[str]:
+    """The nearest directory at or above `path` with a saved BM25 index."""
+    return BM25Index.find_root(path)
@@ -0,0 +1,218 @@
+"""Base class for indexes that store one JSON entry per file and update by mtime."""
+
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Optional, List, Dict, Any, Iterable, Tuple, Set
+
+from ..tools.walker import ALWAYS_SKIP_DIRS, iter_files
+from .trigram import INDEX_DIR_NAME, DEFAULT_MAX_FILE_SIZE
+from .watcher import FileChange, get_change_bus, unwatch_directory, watch_directory
+
+
+class FileIndex(ABC):
+    """
+    Per-file entries under a root, persisted as one JSON file in .claude_index.
+
+    Subclasses set FILE_NAME and VERSION, implement extract() and may
+    restrict accepts(); they keep their lookup maps in step by extending
+    _add() and _remove(). A file is re-extracted only when its mtime or
+    size changes, either on update() or, once watched, from change-bus
+    events applied lazily by _sync() before a lookup.
+    """
+
+    FILE_NAME = ""
+    VERSION = 1
+
+    def __init__(self, root: str, index_dir: Optional[str] = None,
+                 max_file_size: int = DEFAULT_MAX_FILE_SIZE):
+        self.root = os.path.abspath(root)
+        self.index_dir = index_dir or os.path.join(self.root, INDEX_DIR_NAME)
+        self.path = os.path.join(self.index_dir, self.FILE_NAME)
+        self.max_file_size = max_file_size
+        self.files: Dict[str, Dict[str, Any]] = {}  # rel_path -> {"mtime_ns", "size", ...}
+        self._dirty: Set[str] = set()
+        self._rescan = False
+        self._lock = threading.RLock()
+        self._subscription: Optional[int] = None
+        self.watched = False
+        self.updated_at: Optional[float] = None
+
+        if os.path.isfile(self.path):
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    data = json.load(f)
+                if data.get("version") == self.VERSION:
+                    self.max_file_size = data.get("max_file_size", max_file_size)
+                    self.updated_at = data.get("updated_at")
+                    for rel_path, entry in data["files"].items():
+                        self._add(rel_path, entry)
+            except (OSError, ValueError, KeyError):
+                for rel_path in list(self.files):
+                    self._remove(rel_path)  # Unreadable; rebuilt by the next update()
+
+    @classmethod
+    def find_root(cls, path: str) -> Optional[str]:
+        """The nearest directory at or above `path` with a saved index of this kind."""
+        current = os.path.abspath(path)
+        if os.path.isfile(current):
+            current = os.path.dirname(current)
+        while True:
+            if os.path.isfile(os.path.join(current, INDEX_DIR_NAME, cls.FILE_NAME)):
+                return current
+            parent = os.path.dirname(current)
+            if parent == current:
+                return None
+            current = parent
+
+    def accepts(self, rel_path: str) -> bool:
+        """Whether a file (by '/'-separated relative path) belongs in the index."""
+        return True
+
+    @abstractmethod
+    def extract(self, path: str) -> Optional[Dict[str, Any]]:
+        """The entry for one file, or None to leave it out of the index."""
+        pass
+
+    def _add(self, rel_path: str, entry: Dict[str, Any]) -> None:
+        self.files[rel_path] = entry
+
+    def _remove(self, rel_path: str) -> Optional[Dict[str, Any]]:
+        return self.files.pop(rel_path, None)
+
+    def _reindex(self, rel_path: str, state: Optional[Tuple[int, int]]) -> bool:
+        """Re-extract one file if its (mtime_ns, size) changed; None means it is gone."""
+        current = self.files.get(rel_path)
+        if state is not None and current is not None and \
+                (current["mtime_ns"], current["size"]) == tuple(state):
+            return False
+        self._remove(rel_path)
+        if state is None:
+            return current is not None
+        entry = self.extract(os.path.join(self.root, rel_path))
+        if entry is None:
+            return current is not None
+        self._add(rel_path, dict(entry, mtime_ns=state[0], size=state[1]))
+        return True
+
+    def _scan(self) -> Iterable[Tuple[str, Tuple[int, int]]]:
+        for rel_path, entry in iter_files(self.root, max_file_size=self.max_file_size):
+            if not self.accepts(rel_path):
+                continue
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            yield rel_path, (st.st_mtime_ns, st.st_size)
+
+    def update(self) -> Dict[str, Any]:
+        """
+        Bring the index in line with the tree, re-reading only changed files.
+
+        Returns:
+            Statistics: files indexed, files re-extracted and removed, seconds
+        """
+        started = time.time()
+        with self._lock:
+            seen = set()
+            changed = 0
+            for rel_path, state in self._scan():
+                seen.add(rel_path)
+                changed += self._reindex(rel_path, state)
+            removed = [rel_path for rel_path in self.files if rel_path not in seen]
+            for rel_path in removed:
+                self._remove(rel_path)
+            self._dirty.clear()
+            self._rescan = False
+            if changed or removed or not os.path.isfile(self.path):
+                self.save()
+            return {
+                "root": self.root,
+                "files": len(self.files),
+                "updated": changed,
+                "removed": len(removed),
+                "seconds": round(time.time() - started, 3)
+            }
+
+    def save(self) -> None:
+        """Write the index atomically to <root>/.claude_index/FILE_NAME."""
+        with self._lock:
+            os.makedirs(self.index_dir, exist_ok=True)
+            self.updated_at = time.time()
+            data = {
+                "version": self.VERSION,
+                "root": self.root,
+                "updated_at": self.updated_at,
+                "max_file_size": self.max_file_size,
+                "files": self.files
+            }
+            with open(self.path + ".tmp", "w", encoding="utf-8") as f:
+                json.dump(data, f, separators=(",", ":"))
+            os.replace(self.path + ".tmp", self.path)
+
+    def subscribe(self) -> None:
+        """Receive change events from the shared change bus."""
+        if self._subscription is None:
+            self._subscription = get_change_bus().subscribe(self.apply_changes)
+
+    def unsubscribe(self) -> None:
+        if self._subscription is not None:
+            get_change_bus().unsubscribe(self._subscription)
+            self._subscription = None
+
+    def watch(self) -> None:
+        """Keep this index fresh with a filesystem watcher on its root."""
+        self.subscribe()
+        with self._lock:
+            if not self.watched:
+                self._rescan = True  # Catch up with changes made while unwatched
+            self.watched = True
+        watch_directory(self.root, holder=self)
+
+    def unwatch(self) -> None:
+        """Stop watching the root; the watcher stops once no other index needs it."""
+        with self._lock:
+            if not self.watched:
+                return
+            self.watched = False
+        unwatch_directory(self.root, self)
+
+    def apply_changes(self, changes: List[FileChange]) -> None:
+        """Record changed paths; they are re-extracted lazily at the next lookup."""
+        prefix = self.root + os.sep
+        with self._lock:
+            for change in changes:
+                if change.path == self.root:
+                    self._rescan = True
+                    continue
+                if not change.path.startswith(prefix):
+                    continue
+                rel = change.path[len(prefix):].replace(os.sep, "/")
+                if any(part in ALWAYS_SKIP_DIRS for part in rel.split("/")):
+                    continue
+                if change.is_dir or change.kind == "unknown":
+                    self._rescan = True
+                elif self.accepts(rel):
+                    self._dirty.add(rel)
+
+    def _sync(self) -> None:
+        """Apply recorded changes before a lookup."""
+        with self._lock:
+            if self._rescan:
+                self.update()
+                return
+            if not self._dirty:
+                return
+            dirty, self._dirty = self._dirty, set()
+            changed = False
+            for rel_path in dirty:
+                try:
+                    st = os.stat(os.path.join(self.root, rel_path))
+                    state = None if st.st_size > self.max_file_size else (st.st_mtime_ns, st.st_size)
+                except OSError:
+                    state = None
+                changed |= self._reindex(rel_path, state)
+            if changed:
+                self.save()
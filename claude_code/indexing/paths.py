@@ -0,0 +1,298 @@
+"""Cached per-root file list with fzf-style fuzzy path matching."""
+
+import bisect
+import heapq
+import os
+import re
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Set, Tuple
+
+from ..tools.walker import ALWAYS_SKIP_DIRS, IGNORE_FILES, is_ignored_path, iter_files
+from .watcher import FileChange, get_change_bus, unwatch_directory, watch_directory
+
+# Scoring, after fzf: every matched character scores, characters at word
+# boundaries and camelCase humps earn bonuses, runs of consecutive matches
+# keep the bonus of their first character, and gaps cost points
+SCORE_MATCH = 16
+SCORE_GAP_START = -3
+SCORE_GAP_EXTENSION = -1
+BONUS_BOUNDARY = 8
+BONUS_PATH_SEPARATOR = 9
+BONUS_CAMEL = 7
+BONUS_CONSECUTIVE = 4
+BONUS_FIRST_CHAR_MULTIPLIER = 2
+BONUS_BASENAME = 20
+
+# Most path indexes kept watched at once; the least recently watched is
+# released (and walked again on next use) when another root is watched
+MAX_WATCHED_PATH_INDEXES = 8
+
+_BOUNDARY_CHARS = "_-. "
+
+
+def _char_bonus(text: str, i: int) -> int:
+    if i == 0:
+        return BONUS_BOUNDARY
+    previous, char = text[i - 1], text[i]
+    if previous == "/":
+        return BONUS_PATH_SEPARATOR
+    if previous in _BOUNDARY_CHARS:
+        return BONUS_BOUNDARY
+    if (previous.islower() and char.isupper()) or (not previous.isdigit() and char.isdigit()):
+        return BONUS_CAMEL
+    return 0
+
+
+def _positions(query: str, text: str, start: int) -> Optional[List[int]]:
+    """
+    Tightest placement of `query` as a subsequence of text[start:].
+
+    A forward pass finds where the first complete match ends; a backward
+    pass from there finds the latest start, as in fzf's v1 algorithm.
+    """
+    end = start
+    for char in query:
+        end = text.find(char, end)
+        if end < 0:
+            return None
+        end += 1
+    positions = []
+    i = end
+    for char in reversed(query):
+        i = text.rfind(char, start, i)
+        positions.append(i)
+    positions.reverse()
+    return positions
+
+
+def _score(path: str, positions: List[int]) -> int:
+    score = 0
+    run_bonus = 0
+    previous = None
+    for n, i in enumerate(positions):
+        bonus = _char_bonus(path, i)
+        if previous is not None and i == previous + 1:
+            run_bonus = max(run_bonus, bonus, BONUS_CONSECUTIVE)
+            bonus = run_bonus
+        else:
+            if previous is not None:
+                score += SCORE_GAP_START + SCORE_GAP_EXTENSION * (i - previous - 2)
+            run_bonus = bonus
+        score += SCORE_MATCH + (bonus * BONUS_FIRST_CHAR_MULTIPLIER if n == 0 else bonus)
+        previous = i
+    return score
+
+
+def fuzzy_match(query: str, path: str, case_sensitive: bool = False) -> Optional[Tuple[int, List[int]]]:
+    """
+    Score `path` against a fuzzy `query` (its characters in order, gaps allowed).
+
+    The file name is tried first and a match there earns BONUS_BASENAME,
+    so "cfg" prefers "src/config.py" over "cli/fancy/gui.py".
+
+    Returns:
+        Tuple of (score, matched character positions), or None if no match
+    """
+    text = path if case_sensitive else path.lower()
+    if not case_sensitive:
+        query = query.lower()
+    if len(text) != len(path):
+        text = path  # Lowercasing changed the length; fall back to exact case
+    base_start = path.rfind("/") + 1
+    positions = _positions(query, text, base_start) if base_start else None
+    if positions is not None:
+        return _score(path, positions) + BONUS_BASENAME, positions
+    positions = _positions(query, text, 0)
+    if positions is None:
+        return None
+    return _score(path, positions) + (BONUS_BASENAME if base_start == 0 else 0), positions
+
+
+class PathIndex:
+    """
+    All files under a root (honouring .gitignore), kept fresh from the change bus.
+
+    Paths are also held as one newline-joined buffer so a query is
+    narrowed with a single regex scan in C before any Python scoring.
+    """
+
+    def __init__(self, root: str):
+        self.root = os.path.abspath(root)
+        self._paths: Set[str] = set()
+        self._lines: List[str] = []
+        self._buffers: Dict[bool, str] = {}
+        self._offsets: List[int] = []
+        self._stale = True       # Full walk needed
+        self._changed = True     # Buffers need rebuilding
+        self._lock = threading.RLock()
+        self._subscription: Optional[int] = None
+        self.watched = False
+
+    def refresh(self) -> None:
+        """Walk the tree again."""
+        with self._lock:
+            self._paths = {rel_path for rel_path, _ in iter_files(self.root)}
+            self._stale = False
+            self._changed = True
+
+    def _current(self) -> None:
+        with self._lock:
+            if self._stale:
+                self.refresh()
+            if self._changed:
+                self._lines = sorted(self._paths)
+                self._buffers = {}
+                self._offsets = []
+                offset = 0
+                for line in self._lines:
+                    self._offsets.append(offset)
+                    offset += len(line) + 1
+                self._changed = False
+
+    def _buffer(self, case_sensitive: bool) -> str:
+        buffer = self._buffers.get(case_sensitive)
+        if buffer is None:
+            buffer = "\n".join(self._lines)
+            if not case_sensitive:
+                lowered = buffer.lower()
+                # Keep offsets valid; rare characters change length when lowercased
+                buffer = lowered if len(lowered) == len(buffer) else buffer
+            self._buffers[case_sensitive] = buffer
+        return buffer
+
+    def __len__(self) -> int:
+        self._current()
+        return len(self._paths)
+
+    def subscribe(self) -> None:
+        """Receive change events from the shared change bus."""
+        if self._subscription is None:
+            self._subscription = get_change_bus().subscribe(self.apply_changes)
+
+    def unsubscribe(self) -> None:
+        if self._subscription is not None:
+            get_change_bus().unsubscribe(self._subscription)
+            self._subscription = None
+
+    def watch(self) -> None:
+        """Keep the file list fresh with a filesystem watcher on the root."""
+        self.subscribe()
+        with self._lock:
+            self.watched = True
+        watch_directory(self.root, holder=self)
+        with _open_lock:
+            _watched_indexes[self.root] = self
+            _watched_indexes.move_to_end(self.root)
+            evicted = []
+            while len(_watched_indexes) > MAX_WATCHED_PATH_INDEXES:
+                evicted.append(_watched_indexes.popitem(last=False)[1])
+        for index in evicted:
+            index.unwatch()
+
+    def unwatch(self) -> None:
+        """Stop watching the root; the tree is walked again on next use."""
+        with _open_lock:
+            if _watched_indexes.get(self.root) is self:
+                del _watched_indexes[self.root]
+        with self._lock:
+            if not self.watched:
+                return
+            self.watched = False
+            self._stale = True
+        unwatch_directory(self.root, self)
+
+    def apply_changes(self, changes: List[FileChange]) -> None:
+        """Add and remove files as they are created and deleted; rescan on anything else."""
+        prefix = self.root + os.sep
+        with self._lock:
+            for change in changes:
+                if change.kind == "modified" and not change.is_dir:
+                    if os.path.basename(change.path) in IGNORE_FILES:
+                        self._stale = True
+                    continue
+                if change.path == self.root:
+                    self._stale = True
+                    continue
+                if not change.path.startswith(prefix):
+                    continue
+                rel = change.path[len(prefix):].replace(os.sep, "/")
+                if any(part in ALWAYS_SKIP_DIRS for part in rel.split("/")):
+                    continue
+                if change.kind == "deleted":
+                    if change.is_dir:
+                        self._paths = {p for p in self._paths if not p.startswith(rel + "/")}
+                    self._paths.discard(rel)
+                    self._changed = True
+                elif change.kind == "created" and not change.is_dir and \
+                        os.path.basename(rel) not in IGNORE_FILES:
+                    if os.path.isfile(change.path) and not is_ignored_path(self.root, rel):
+                        self._paths.add(rel)
+                        self._changed = True
+                else:
+                    self._stale = True
+
+    def find(self, query: str, limit: int = 20) -> Tuple[List[Dict[str, Any]], int]:
+        """
+        Best fuzzy matches for `query`, highest score first.
+
+        Space-separated terms must all match (in any order). Matching is
+        case-insensitive unless the query has an uppercase letter.
+
+        Returns:
+            Tuple of (matches as {"path", "score", "positions"}, total matching files)
+        """
+        terms = query.split()
+        if not terms:
+            return [], 0
+        case_sensitive = any(char.isupper() for char in query)
+        with self._lock:
+            self._current()
+            buffer = self._buffer(case_sensitive)
+            lines, offsets = self._lines, self._offsets
+        # Narrow with the longest term: one regex scan over all paths. Leading
+        # with a literal lets the engine skip ahead to its occurrences, and
+        # after a hit the scan resumes at the next line
+        anchor = max(terms, key=len)
+        anchor_text = anchor if case_sensitive else anchor.lower()
+        narrow = re.compile(re.escape(anchor_text[0]) +
+                            "".join(f"[^{re.escape(c)}\n]*{re.escape(c)}" for c in anchor_text[1:]))
+        scored = []
+        position = 0
+        while True:
+            match = narrow.search(buffer, position)
+            if match is None:
+                break
+            line_number = bisect.bisect_right(offsets, match.start()) - 1
+            position = offsets[line_number + 1] if line_number + 1 < len(offsets) else len(buffer)
+            path = lines[line_number]
+            total = 0
+            positions: List[int] = []
+            for term in terms:
+                result = fuzzy_match(term, path, case_sensitive)
+                if result is None:
+                    break
+                total += result[0]
+                positions.extend(result[1])
+            else:
+                scored.append((total, -len(path), path, sorted(set(positions))))
+        best = heapq.nlargest(limit, scored)
+        return [{"path": path, "score": score, "positions": positions}
+                for score, _, path, positions in best], len(scored)
+
+
+_open_indexes: Dict[str, PathIndex] = {}
+_watched_indexes: "OrderedDict[str, PathIndex]" = OrderedDict()
+_open_lock = threading.Lock()
+
+
+def get_path_index(root: str) -> PathIndex:
+    """Get the shared path index for a root; the tree is walked on first use."""
+    root = os.path.abspath(root)
+    with _open_lock:
+        index = _open_indexes.get(root)
+        if index is None:
+            index = PathIndex(root)
+            _open_indexes[root] = index
+            index.subscribe()
+        return index
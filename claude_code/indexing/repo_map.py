@@ -0,0 +1,298 @@
+"""Compact, token-budgeted repository map: tree, languages, top-level symbols, entry points."""
+
+import hashlib
+import os
+import re
+import threading
+from typing import Optional, List, Dict, Any, Sequence, Tuple
+
+from ..tools.encoding import read_text_file
+from .file_index import FileIndex
+from .symbols import EXTRACTORS
+from .trigram import DEFAULT_MAX_FILE_SIZE
+
+REPO_MAP_FILE = "repo_map.json"
+REPO_MAP_VERSION = 1
+# A rendered map per token budget, headed by the tree fingerprint it was built from
+RENDERED_MAP_FILE = "repo_map.{tokens}.txt"
+
+DEFAULT_MAP_TOKENS = 1500
+CHARS_PER_TOKEN = 4  # Rough estimate for code and paths
+
+# Symbols listed per file at each level of detail, most detailed first;
+# past the last level, directory depth shrinks
+SYMBOL_LEVELS = (8, 3, 0)
+
+# Top-level definition kinds worth listing in a map
+MAP_KINDS = ("class", "function", "type")
+
+LANGUAGES = {
+    ".py": "Python", ".pyi": "Python", ".js": "JavaScript", ".jsx": "JavaScript",
+    ".mjs": "JavaScript", ".cjs": "JavaScript", ".ts": "TypeScript", ".tsx": "TypeScript",
+    ".go": "Go", ".rs": "Rust", ".java": "Java", ".kt": "Kotlin", ".cs": "C#",
+    ".c": "C", ".h": "C", ".cc": "C++", ".cpp": "C++", ".cxx": "C++", ".hpp": "C++", ".hh": "C++",
+    ".rb": "Ruby", ".php": "PHP", ".swift": "Swift", ".scala": "Scala", ".sh": "Shell",
+    ".md": "Markdown", ".rst": "reStructuredText", ".txt": "Text", ".json": "JSON",
+    ".yaml": "YAML", ".yml": "YAML", ".toml": "TOML", ".ini": "INI", ".cfg": "INI",
+    ".html": "HTML", ".css": "CSS", ".sql": "SQL",
+}
+
+ENTRY_POINT_NAMES = frozenset([
+    "__main__.py", "main.py", "cli.py", "app.py", "manage.py", "setup.py",
+    "main.go", "main.rs", "index.js", "index.ts", "Makefile", "Dockerfile",
+])
+_ENTRY_POINT_CODE = re.compile(
+    r"^if __name__ == ['\"]__main__['\"]|^func main\(\)|^fn main\(\)|static void [Mm]ain\(",
+    re.MULTILINE
+)
+
+
+class RepoMap(FileIndex):
+    """
+    Per-file summaries (language, line count, top-level symbols, entry
+    point) rendered into a map that fits a token budget.
+
+    Summaries update per file like any FileIndex. The rendered text is
+    cached in memory and on disk under a fingerprint of the whole tree,
+    so an unchanged repository renders without touching its files.
+    """
+
+    FILE_NAME = REPO_MAP_FILE
+    VERSION = REPO_MAP_VERSION
+
+    def __init__(self, root: str, index_dir: Optional[str] = None,
+                 max_file_size: int = DEFAULT_MAX_FILE_SIZE):
+        self._rendered: Dict[Tuple[str, int, Optional[Tuple[str, ...]]], str] = {}
+        super().__init__(root, index_dir, max_file_size)
+
+    def extract(self, path: str) -> Optional[Dict[str, Any]]:
+        extension = os.path.splitext(path)[1].lower()
+        entry = {"language": LANGUAGES.get(extension), "lines": 0, "symbols": [],
+                 "entry_point": os.path.basename(path) in ENTRY_POINT_NAMES}
+        text = read_text_file(path)
+        if text is None:
+            return entry
+        entry["lines"] = text.count("\n") + (0 if text.endswith("\n") or not text else 1)
+        extractor = EXTRACTORS.get(extension)
+        if extractor is not None:
+            seen = set()
+            for name, kind, _, qualname in extractor(text)["defs"]:
+                if kind in MAP_KINDS and qualname == name and not name.startswith("_") \
+                        and name not in seen:
+                    seen.add(name)
+                    entry["symbols"].append(name)
+            if _ENTRY_POINT_CODE.search(text):
+                entry["entry_point"] = True
+        return entry
+
+    def fingerprint(self) -> str:
+        """Hash of every indexed path with its mtime and size."""
+        self._sync()
+        digest = hashlib.sha1()
+        with self._lock:
+            for rel_path in sorted(self.files):
+                entry = self.files[rel_path]
+                digest.update(f"{rel_path}\0{entry['mtime_ns']}\0{entry['size']}\n".encode("utf-8", "replace"))
+        return digest.hexdigest()
+
+    def render(self, max_tokens: int = DEFAULT_MAP_TOKENS, scope: Optional[Sequence[str]] = None) -> str:
+        """
+        The repository map, at the most detail that fits `max_tokens`.
+
+        Detail is shed in steps: fewer symbols per file, then no symbols,
+        then files below ever shallower directories folded into their
+        directory's totals.
+
+        Args:
+            max_tokens: Approximate token budget
+            scope: Only map these '/'-separated paths relative to the root
+                (files, or directories ending in "/"); maps of a scope are
+                cached in memory only
+        """
+        fingerprint = self.fingerprint()
+        scope = tuple(sorted(scope)) if scope is not None else None
+        key = (fingerprint, max_tokens, scope)
+        with self._lock:
+            text = self._rendered.get(key)
+            if text is None and scope is None:
+                text = self._load_rendered(fingerprint, max_tokens)
+            if text is None:
+                files = self.files
+                if scope is not None:
+                    files = {rel_path: entry for rel_path, entry in files.items()
+                             if any(rel_path == path.rstrip("/") or rel_path.startswith(path.rstrip("/") + "/")
+                                    for path in scope)}
+                text = self._render(max_tokens, files)
+                if scope is None:
+                    self._save_rendered(fingerprint, max_tokens, text)
+            # Maps of older trees are never asked for again
+            self._rendered = {k: v for k, v in self._rendered.items() if k[0] == fingerprint}
+            self._rendered[key] = text
+            return text
+
+    def _rendered_path(self, max_tokens: int) -> str:
+        return os.path.join(self.index_dir, RENDERED_MAP_FILE.format(tokens=max_tokens))
+
+    def _load_rendered(self, fingerprint: str, max_tokens: int) -> Optional[str]:
+        try:
+            with open(self._rendered_path(max_tokens), "r", encoding="utf-8") as f:
+                if f.readline().strip() == f"# {fingerprint}":
+                    return f.read()
+        except OSError:
+            pass
+        return None
+
+    def _save_rendered(self, fingerprint: str, max_tokens: int, text: str) -> None:
+        path = self._rendered_path(max_tokens)
+        try:
+            os.makedirs(self.index_dir, exist_ok=True)
+            with open(path + ".tmp", "w", encoding="utf-8") as f:
+                f.write(f"# {fingerprint}\n{text}")
+            os.replace(path + ".tmp", path)
+        except OSError:
+            pass  # The in-memory copy still serves this process
+
+    def _render(self, max_tokens: int, files: Dict[str, Dict[str, Any]]) -> str:
+        budget = max_tokens * CHARS_PER_TOKEN
+        header = self._header(files)
+        max_depth = max((rel_path.count("/") for rel_path in files), default=0)
+        levels = [(symbols, None) for symbols in SYMBOL_LEVELS] + \
+                 [(0, depth) for depth in range(max_depth - 1, -1, -1)]
+        body = ""
+        for symbols, depth in levels:
+            body = "\n".join(self._tree_lines(files, symbols, depth))
+            if len(header) + len(body) <= budget:
+                break
+        text = header + body
+        if len(text) > budget:
+            text = text[:max(0, budget - 16)].rsplit("\n", 1)[0] + "\n... (truncated)"
+        return text + "\n"
+
+    def _header(self, files: Dict[str, Dict[str, Any]]) -> str:
+        languages: Dict[str, List[int]] = {}
+        for entry in files.values():
+            if entry["language"]:
+                totals = languages.setdefault(entry["language"], [0, 0])
+                totals[0] += 1
+                totals[1] += entry["lines"]
+        ranked = sorted(languages.items(), key=lambda item: (-item[1][1], item[0]))
+        entry_points = sorted(p for p, entry in files.items() if entry["entry_point"])
+        lines = [f"Repository map of {os.path.basename(self.root) or self.root} "
+                 f"({len(files)} files, {sum(e['lines'] for e in files.values())} lines)"]
+        if ranked:
+            lines.append("Languages: " + ", ".join(f"{name} {files} files/{total} lines"
+                                                  for name, (files, total) in ranked))
+        if entry_points:
+            lines.append("Entry points: " + ", ".join(entry_points[:12]) +
+                         (f" (+{len(entry_points) - 12} more)" if len(entry_points) > 12 else ""))
+        return "\n".join(lines) + "\n\n"
+
+    def _tree_lines(self, files: Dict[str, Dict[str, Any]], symbols: int,
+                    max_depth: Optional[int]) -> List[str]:
+        """
+        Indented tree lines. Files list up to `symbols` top-level names;
+        below `max_depth` directories show only file and line totals.
+        """
+        totals: Dict[str, List[int]] = {}
+        for rel_path, entry in files.items():
+            parent = rel_path.rpartition("/")[0]
+            while parent:
+                counts = totals.setdefault(parent, [0, 0])
+                counts[0] += 1
+                counts[1] += entry["lines"]
+                parent = parent.rpartition("/")[0]
+
+        lines = []
+        shown_dirs = set()
+        # Directories sort before the files beside them
+        for rel_path in sorted(files, key=lambda p: [(i == p.count("/"), part)
+                                                          for i, part in enumerate(p.split("/"))]):
+            parts = rel_path.split("/")
+            for depth in range(len(parts) - 1):
+                directory = "/".join(parts[:depth + 1])
+                if directory in shown_dirs:
+                    continue
+                shown_dirs.add(directory)
+                if max_depth is not None and depth > max_depth:
+                    break
+                count, total = totals[directory]
+                folded = max_depth is not None and depth == max_depth
+                lines.append("  " * depth + f"{parts[depth]}/ ({count} files, {total} lines)" +
+                             (" ..." if folded else ""))
+            if max_depth is not None and len(parts) - 1 > max_depth:
+                continue
+            entry = files[rel_path]
+            line = "  " * (len(parts) - 1) + parts[-1]
+            if entry["language"] and entry["lines"]:
+                line += f" ({entry['lines']})"
+            if symbols and entry["symbols"]:
+                names = entry["symbols"][:symbols]
+                line += ": " + ", ".join(names) + (" ..." if len(entry["symbols"]) > symbols else "")
+            lines.append(line)
+        return lines
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "root": self.root,
+                "files": len(self.files),
+                "updated_at": self.updated_at,
+                "pending_changes": len(self._dirty)
+            }
+
+
+_open_maps: Dict[str, RepoMap] = {}
+_open_lock = threading.Lock()
+
+
+def get_repo_map(root: str, update: bool = True) -> RepoMap:
+    """
+    Get the shared repository map for a root, loading its summaries from disk if saved.
+
+    The first call per process runs update() (unless `update` is False),
+    which re-reads only files whose mtime changed since the map was saved.
+    """
+    root = os.path.abspath(root)
+    with _open_lock:
+        repo_map = _open_maps.get(root)
+        if repo_map is None:
+            repo_map = RepoMap(root)
+            _open_maps[root] = repo_map
+            repo_map.subscribe()
+            if update:
+                repo_map.update()
+        return repo_map
+
+
+def find_repo_map_root(path: str) -> Optional[str]:
+    """The nearest directory at or above `path` with a saved repository map."""
+    return RepoMap.find_root(path)
+
+
+def repo_map_preamble(path: str = ".", max_tokens: int = DEFAULT_MAP_TOKENS,
+                      scope: Optional[Sequence[str]] = None) -> str:
+    """
+    Prompt section holding the map of the repository at `path`.
+
+    Only a map that already exists (see `python -m claude_code.indexing
+    map`) is used and no watcher is started, so this stays cheap on an
+    agent's first turn. The map covers `path`, or only the `scope` paths
+    (relative to `path`) if given.
+
+    Returns an empty string without a map or on failure, so callers can
+    include it unconditionally.
+    """
+    try:
+        root = find_repo_map_root(path)
+        if root is None:
+            return ""
+        repo_map = get_repo_map(root)
+        base = os.path.relpath(os.path.abspath(path), root)
+        scope = [os.path.normpath(os.path.join(base, rel_path)).replace(os.sep, "/")
+                 for rel_path in (scope if scope is not None else ["."])]
+        if "." in scope:
+            scope = None  # The whole repository
+        return "Repository map (precomputed; explore from here instead of listing directories):\n" + \
+            repo_map.render(max_tokens, scope)
+    except Exception:
+        return ""
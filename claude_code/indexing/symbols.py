@@ -0,0 +1,379 @@
+"""Persistent symbol index: definitions, imports and call sites per file."""
+
+import ast
+import os
+import re
+import threading
+from typing import Optional, List, Dict, Any, Callable, Iterable, Tuple, Set
+
+from ..tools.encoding import read_text_file
+from .file_index import FileIndex
+from .trigram import DEFAULT_MAX_FILE_SIZE
+
+SYMBOLS_FILE = "symbols.json"
+SYMBOLS_VERSION = 1
+
+# Per-file symbols, as stored on disk:
+#   "defs":    [name, kind, line, qualname]
+#   "imports": [name, module, line]
+#   "calls":   [name, line]
+FileSymbols = Dict[str, List[List[Any]]]
+Extractor = Callable[[str], FileSymbols]
+
+DEFINITION_KINDS = ("class", "function", "method", "variable", "type")
+
+
+def _empty() -> FileSymbols:
+    return {"defs": [], "imports": [], "calls": []}
+
+
+class _PythonVisitor(ast.NodeVisitor):
+    """Collects definitions, imports and calls, tracking the enclosing scope."""
+
+    def __init__(self):
+        self.symbols = _empty()
+        self._scope: List[Tuple[str, str]] = []  # (name, kind)
+
+    def _qualname(self, name: str) -> str:
+        return ".".join([scope for scope, _ in self._scope] + [name])
+
+    def _define(self, node: ast.AST, name: str, kind: str) -> None:
+        self.symbols["defs"].append([name, kind, node.lineno, self._qualname(name)])
+
+    def visit_ClassDef(self, node: ast.ClassDef) -> None:
+        self._define(node, node.name, "class")
+        self._scope.append((node.name, "class"))
+        self.generic_visit(node)
+        self._scope.pop()
+
+    def visit_FunctionDef(self, node) -> None:
+        in_class = bool(self._scope) and self._scope[-1][1] == "class"
+        self._define(node, node.name, "method" if in_class else "function")
+        self._scope.append((node.name, "function"))
+        self.generic_visit(node)
+        self._scope.pop()
+
+    visit_AsyncFunctionDef = visit_FunctionDef
+
+    def _visit_assign_targets(self, node: ast.AST, targets: Iterable[ast.AST]) -> None:
+        # Only module and class level names are worth indexing as variables
+        if not self._scope or self._scope[-1][1] == "class":
+            for target in targets:
+                for name in ast.walk(target):
+                    if isinstance(name, ast.Name):
+                        self._define(node, name.id, "variable")
+
+    def visit_Assign(self, node: ast.Assign) -> None:
+        self._visit_assign_targets(node, node.targets)
+        self.generic_visit(node)
+
+    def visit_AnnAssign(self, node: ast.AnnAssign) -> None:
+        self._visit_assign_targets(node, [node.target])
+        self.generic_visit(node)
+
+    def visit_Import(self, node: ast.Import) -> None:
+        for alias in node.names:
+            name = alias.asname or alias.name.split(".")[0]
+            self.symbols["imports"].append([name, alias.name, node.lineno])
+
+    def visit_ImportFrom(self, node: ast.ImportFrom) -> None:
+        module = "." * node.level + (node.module or "")
+        for alias in node.names:
+            self.symbols["imports"].append([alias.name, module, node.lineno])
+
+    def visit_Call(self, node: ast.Call) -> None:
+        func = node.func
+        if isinstance(func, ast.Name):
+            self.symbols["calls"].append([func.id, node.lineno])
+        elif isinstance(func, ast.Attribute):
+            self.symbols["calls"].append([func.attr, node.lineno])
+        self.generic_visit(node)
+
+
+def extract_python(text: str) -> FileSymbols:
+    """Symbols of Python source, via ast; falls back to regexes on syntax errors."""
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return _PYTHON_FALLBACK(text)
+    visitor = _PythonVisitor()
+    visitor.visit(tree)
+    return visitor.symbols
+
+
+_CALL = re.compile(r"\b([A-Za-z_]\w*)\s*\(")
+_CALL_KEYWORDS = {
+    "if", "for", "while", "switch", "return", "catch", "function", "sizeof", "typeof",
+    "elif", "and", "or", "not", "in", "match", "fn", "func", "new", "throw", "await",
+    "with", "except", "print", "defined", "assert", "yield", "super", "this",
+    "async", "import", "else", "case", "do",
+}
+
+
+class RegexExtractor:
+    """
+    Light extractor for languages without a parser: line-anchored regexes.
+
+    Each definition regex captures the symbol name in its first group;
+    import regexes capture the imported module (first group, or "module"),
+    recorded under the comma-separated names of an optional "names" group,
+    else under its last dotted component, or its file name when
+    `path_imports` is set.
+    Calls are identifiers followed by "(" that are not keywords or the
+    line's own definition.
+    """
+
+    def __init__(self, definitions: List[Tuple[str, str]], imports: Iterable[str] = (),
+                 path_imports: bool = False):
+        self.definitions = [(kind, re.compile(pattern, re.MULTILINE)) for kind, pattern in definitions]
+        self.imports = [re.compile(pattern, re.MULTILINE) for pattern in imports]
+        self.path_imports = path_imports
+
+    def _import_name(self, module: str) -> str:
+        if self.path_imports:
+            return os.path.splitext(module.rstrip("/").rsplit("/", 1)[-1])[0]
+        return re.split(r"[.:]+", module.rstrip(".:"))[-1]
+
+    def __call__(self, text: str) -> FileSymbols:
+        symbols = _empty()
+        line_starts = [0] + [m.end() for m in re.finditer("\n", text)]
+
+        def line_of(offset: int) -> int:
+            low, high = 0, len(line_starts)
+            while low + 1 < high:
+                middle = (low + high) // 2
+                if line_starts[middle] <= offset:
+                    low = middle
+                else:
+                    high = middle
+            return low + 1
+
+        defined: Set[Tuple[str, int]] = set()
+        for kind, regex in self.definitions:
+            for match in regex.finditer(text):
+                line = line_of(match.start(1))
+                symbols["defs"].append([match.group(1), kind, line, match.group(1)])
+                defined.add((match.group(1), line))
+        for regex in self.imports:
+            for match in regex.finditer(text):
+                groups = match.groupdict()
+                module = groups.get("module") or match.group(1)
+                line = line_of(match.start())
+                names = [name.split(" as ")[0].strip(" {}*\t\n") for name in (groups.get("names") or "").split(",")]
+                names = [name for name in names if name.isidentifier()]
+                for name in names or [self._import_name(module)]:
+                    symbols["imports"].append([name, module, line])
+        for match in _CALL.finditer(text):
+            name = match.group(1)
+            line = line_of(match.start(1))
+            if name not in _CALL_KEYWORDS and (name, line) not in defined:
+                symbols["calls"].append([name, line])
+        symbols["defs"].sort(key=lambda d: d[2])
+        return symbols
+
+
+_PYTHON_FALLBACK = RegexExtractor(
+    [("class", r"^\s*class\s+(\w+)"), ("function", r"^\s*(?:async\s+)?def\s+(\w+)")],
+    [r"^\s*from\s+(?P<module>[\w.]+)\s+import\s+\(?(?P<names>[\w, ]+)", r"^\s*import\s+([\w.]+)"]
+)
+
+_JAVASCRIPT = RegexExtractor(
+    [("class", r"^\s*(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(\w+)"),
+     ("function", r"^\s*(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(\w+)"),
+     ("function", r"^\s*(?:export\s+)?(?:const|let|var)\s+(\w+)\s*=\s*(?:async\s+)?(?:function\b|\([^)]*\)\s*=>|\w+\s*=>)"),
+     ("type", r"^\s*(?:export\s+)?(?:interface|type|enum)\s+(\w+)")],
+    [r"""^\s*import\s+(?:(?P<names>[^'"]*?)\s+from\s+)?['"](?P<module>[^'"]+)['"]""", r"""require\(\s*['"]([^'"]+)['"]\s*\)"""],
+    path_imports=True
+)
+
+_GO = RegexExtractor(
+    [("function", r"^func\s+(\w+)"),
+     ("method", r"^func\s+\([^)]*\)\s*(\w+)"),
+     ("type", r"^type\s+(\w+)")],
+    [r"""^\s*(?:import\s+)?(?:\w+\s+)?"([\w./-]+)"$"""],
+    path_imports=True
+)
+
+_RUST = RegexExtractor(
+    [("function", r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:unsafe\s+)?fn\s+(\w+)"),
+     ("type", r"^\s*(?:pub(?:\([^)]*\))?\s+)?(?:struct|enum|trait|type)\s+(\w+)")],
+    [r"^\s*use\s+([\w:]+)"]
+)
+
+_JAVA = RegexExtractor(
+    [("class", r"^\s*(?:(?:public|protected|private|abstract|final|static|sealed|partial|internal)\s+)*"
+               r"(?:class|interface|enum|record|struct)\s+(\w+)")],
+    [r"^\s*(?:import|using)\s+(?:static\s+)?([\w.]+)"]
+)
+
+_C = RegexExtractor(
+    [("type", r"^\s*(?:typedef\s+)?(?:struct|class|union|enum)\s+(\w+)\s*[{:]"),
+     ("function", r"^[A-Za-z_][\w\s\*&:<>,]*?\b(\w+)\s*\([^;{]*\)\s*(?:const\s*)?\{")],
+    [r"^\s*#\s*include\s*[<\"]([^>\"]+)[>\"]"],
+    path_imports=True
+)
+
+EXTRACTORS: Dict[str, Extractor] = {}
+
+
+def register_extractor(extensions: Iterable[str], extractor: Extractor) -> None:
+    """Use `extractor` (text -> FileSymbols) for files with these extensions."""
+    for extension in extensions:
+        EXTRACTORS[extension.lower()] = extractor
+
+
+register_extractor([".py", ".pyi"], extract_python)
+register_extractor([".js", ".jsx", ".mjs", ".cjs", ".ts", ".tsx"], _JAVASCRIPT)
+register_extractor([".go"], _GO)
+register_extractor([".rs"], _RUST)
+register_extractor([".java", ".kt", ".cs"], _JAVA)
+register_extractor([".c", ".h", ".cc", ".cpp", ".cxx", ".hpp", ".hh"], _C)
+
+
+def extract_file(path: str) -> Optional[FileSymbols]:
+    """Symbols of one file, or None if no extractor handles it or it can't be read."""
+    extractor = EXTRACTORS.get(os.path.splitext(path)[1].lower())
+    if extractor is None:
+        return None
+    text = read_text_file(path)
+    if text is None:
+        return None
+    return extractor(text)
+
+
+class SymbolIndex(FileIndex):
+    """
+    Name -> locations maps over every indexed file, persisted as JSON.
+
+    Lookups are dictionary hits, not scans; see FileIndex for how files
+    are kept up to date.
+    """
+
+    FILE_NAME = SYMBOLS_FILE
+    VERSION = SYMBOLS_VERSION
+
+    def __init__(self, root: str, index_dir: Optional[str] = None,
+                 max_file_size: int = DEFAULT_MAX_FILE_SIZE):
+        self._definitions: Dict[str, List[Tuple[str, List[Any]]]] = {}
+        self._references: Dict[str, List[Tuple[str, str, List[Any]]]] = {}
+        super().__init__(root, index_dir, max_file_size)
+
+    def accepts(self, rel_path: str) -> bool:
+        return os.path.splitext(rel_path)[1].lower() in EXTRACTORS
+
+    def extract(self, path: str) -> Optional[Dict[str, Any]]:
+        return extract_file(path)
+
+    def _add(self, rel_path: str, entry: Dict[str, Any]) -> None:
+        super()._add(rel_path, entry)
+        for definition in entry["defs"]:
+            self._definitions.setdefault(definition[0], []).append((rel_path, definition))
+            if definition[3] != definition[0]:
+                self._definitions.setdefault(definition[3], []).append((rel_path, definition))
+        for call in entry["calls"]:
+            self._references.setdefault(call[0], []).append((rel_path, "call", call))
+        for imported in entry["imports"]:
+            self._references.setdefault(imported[0], []).append((rel_path, "import", imported))
+
+    def _remove(self, rel_path: str) -> Optional[Dict[str, Any]]:
+        entry = super()._remove(rel_path)
+        if entry is None:
+            return None
+        names = {d[0] for d in entry["defs"]} | {d[3] for d in entry["defs"]}
+        for name in names:
+            kept = [item for item in self._definitions.get(name, []) if item[0] != rel_path]
+            if kept:
+                self._definitions[name] = kept
+            else:
+                self._definitions.pop(name, None)
+        for name in {c[0] for c in entry["calls"]} | {i[0] for i in entry["imports"]}:
+            kept = [item for item in self._references.get(name, []) if item[0] != rel_path]
+            if kept:
+                self._references[name] = kept
+            else:
+                self._references.pop(name, None)
+        return entry
+
+    def definitions(self, name: str, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Where `name` (or a qualified name such as "Class.method") is defined."""
+        self._sync()
+        with self._lock:
+            return [
+                {"file": os.path.join(self.root, rel_path), "line": d[2], "name": d[0],
+                 "kind": d[1], "qualname": d[3]}
+                for rel_path, d in sorted(self._definitions.get(name, []), key=lambda item: (item[0], item[1][2]))
+                if kind is None or d[1] == kind
+            ]
+
+    def references(self, name: str, kind: Optional[str] = None) -> List[Dict[str, Any]]:
+        """Call sites and imports of `name`; `kind` narrows to "call" or "import"."""
+        self._sync()
+        short_name = name.rsplit(".", 1)[-1]
+        with self._lock:
+            results = []
+            for rel_path, ref_kind, ref in self._references.get(short_name, []):
+                if kind is not None and ref_kind != kind:
+                    continue
+                result = {"file": os.path.join(self.root, rel_path), "name": ref[0], "kind": ref_kind}
+                if ref_kind == "import":
+                    result["module"], result["line"] = ref[1], ref[2]
+                else:
+                    result["line"] = ref[1]
+                results.append(result)
+            results.sort(key=lambda r: (r["file"], r["line"]))
+            return results
+
+    def outline(self, file_path: str) -> Optional[Dict[str, Any]]:
+        """All symbols of one indexed file, or None if it is not indexed."""
+        self._sync()
+        rel_path = os.path.relpath(os.path.abspath(file_path), self.root).replace(os.sep, "/")
+        with self._lock:
+            entry = self.files.get(rel_path)
+            if entry is None:
+                return None
+            return {
+                "file": os.path.join(self.root, rel_path),
+                "definitions": [{"line": d[2], "name": d[0], "kind": d[1], "qualname": d[3]}
+                                for d in entry["defs"]],
+                "imports": [{"line": i[2], "name": i[0], "module": i[1]} for i in entry["imports"]],
+                "calls": len(entry["calls"])
+            }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "root": self.root,
+                "files": len(self.files),
+                "definitions": sum(len(entry["defs"]) for entry in self.files.values()),
+                "references": sum(len(refs) for refs in self._references.values()),
+                "updated_at": self.updated_at,
+                "pending_changes": len(self._dirty)
+            }
+
+
+_open_indexes: Dict[str, SymbolIndex] = {}
+_open_lock = threading.Lock()
+
+
+def get_symbol_index(root: str, update: bool = True) -> SymbolIndex:
+    """
+    Get the shared symbol index for a root, loading it from disk if saved.
+
+    The first call per process runs update() (unless `update` is False),
+    which re-extracts only files whose mtime changed since the index was saved.
+    """
+    root = os.path.abspath(root)
+    with _open_lock:
+        index = _open_indexes.get(root)
+        if index is None:
+            index = SymbolIndex(root)
+            _open_indexes[root] = index
+            index.subscribe()
+            if update:
+                index.update()
+        return index
+
+
+def find_symbol_root(path: str) -> Optional[str]:
+    """The nearest directory at or above `path` with a saved symbol index."""
+    return SymbolIndex.find_root(path)
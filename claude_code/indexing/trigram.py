@@ -0,0 +1,589 @@
+"""On-disk trigram index that narrows regex searches to candidate files."""
+
+import json
+import mmap
+import os
+import re
+import struct
+import threading
+import time
+from array import array
+from typing import Optional, List, Dict, Any, Tuple, Set, Iterable
+
+try:  # Python 3.11+
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+from ..tools.encoding import sniff_file, iter_decoded
+from ..tools.walker import ALWAYS_SKIP_DIRS, iter_files
+from .watcher import FileChange, FileWatcher, get_change_bus, unwatch_directory, watch_directory
+
+# Index files live in this directory under the indexed root
+INDEX_DIR_NAME = ".claude_index"
+INDEX_FILE = "trigram.idx"
+META_FILE = "trigram.json"
+INDEX_VERSION = 1
+
+# Files larger than this are not indexed (they are usually generated);
+# they are listed separately and always returned as candidates
+DEFAULT_MAX_FILE_SIZE = 1024 * 1024
+
+_MAGIC = b"CCTRI001"
+_HEADER = struct.Struct("<8sIIB3x")   # magic, files, trigrams, posting id width
+_ENTRY = struct.Struct("<IQI")        # trigram, posting offset, posting count
+
+# A query is None (no constraint), ("tri", int), ("and", [...]) or ("or", [...])
+Query = Optional[Tuple[str, Any]]
+
+
+def _pack(a: int, b: int, c: int) -> int:
+    return (a << 16) | (b << 8) | c
+
+
+def text_trigrams(data: bytes) -> Set[int]:
+    """Distinct trigrams of a normalised (UTF-8, lowercased) buffer."""
+    return {_pack(a, b, c) for a, b, c in set(zip(data, data[1:], data[2:]))}
+
+
+def normalise(text: str) -> bytes:
+    """
+    Bytes that are indexed for a file and queried for a literal.
+
+    Text is re-encoded as UTF-8 whatever the file's encoding, newlines are
+    translated as in text mode, and ASCII is lowercased so one index serves
+    case-sensitive and case-insensitive queries alike.
+    """
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text.encode("utf-8", errors="replace").lower()
+
+
+def file_trigrams(path: str) -> Optional[Set[int]]:
+    """Trigrams of a file's normalised text, or None for binary or unreadable files."""
+    try:
+        kind = sniff_file(path)
+        if kind.is_binary:
+            return None
+        return text_trigrams(normalise("".join(iter_decoded(path, kind.encoding, errors="replace"))))
+    except OSError:
+        return None
+
+
+def _matches(query: Query, trigrams: Set[int]) -> bool:
+    """Evaluate a query against one file's trigram set."""
+    if query is None:
+        return True
+    kind, arg = query
+    if kind == "tri":
+        return arg in trigrams
+    if kind == "or":
+        return any(_matches(sub, trigrams) for sub in arg)
+    return all(_matches(sub, trigrams) for sub in arg)
+
+
+def _literal_query(chars: List[str]) -> Query:
+    """AND of the trigrams in a run of literal characters."""
+    data = normalise("".join(chars))
+    if len(data) < 3:
+        return None
+    trigrams = sorted({_pack(*data[i:i + 3]) for i in range(len(data) - 2)})
+    if len(trigrams) == 1:
+        return ("tri", trigrams[0])
+    return ("and", [("tri", t) for t in trigrams])
+
+
+def _plan_items(items: Iterable, ignorecase: bool) -> Query:
+    """Build the trigram query implied by a parsed regex sequence."""
+    parts: List[Tuple[str, Any]] = []
+    run: List[str] = []
+
+    def require(query: Query):
+        if query is None:
+            return
+        if query[0] == "and":
+            parts.extend(query[1])
+        else:
+            parts.append(query)
+
+    def flush():
+        require(_literal_query(run))
+        run.clear()
+
+    def visit(seq, ignorecase):
+        for op, av in seq:
+            name = str(op)
+            if name == "LITERAL":
+                char = chr(av)
+                if ignorecase and not char.isascii():
+                    flush()  # Only ASCII is case-folded in the index
+                else:
+                    run.append(char)
+            elif name == "SUBPATTERN":
+                _, add_flags, del_flags, sub = av
+                # Groups do not break a literal run ("ab(cd)" requires "abcd")
+                visit(sub, (ignorecase or bool(add_flags & re.IGNORECASE)) and not del_flags & re.IGNORECASE)
+            elif name == "ATOMIC_GROUP":
+                visit(av, ignorecase)
+            elif name == "AT":
+                pass  # Anchors consume nothing, so the run continues
+            elif name == "BRANCH":
+                flush()
+                alternatives = [_plan_items(alt, ignorecase) for alt in av[1]]
+                if all(alt is not None for alt in alternatives):
+                    parts.append(("or", alternatives))
+            elif name in ("MAX_REPEAT", "MIN_REPEAT", "POSSESSIVE_REPEAT"):
+                flush()
+                low, _, sub = av
+                if low >= 1:
+                    require(_plan_items(sub, ignorecase))
+            else:
+                flush()  # Classes, wildcards, backreferences, lookarounds
+
+    visit(items, ignorecase)
+    flush()
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else ("and", parts)
+
+
+def plan_query(pattern: str, flags: int = 0) -> Query:
+    """
+    Derive a trigram query from a regex: the trigrams any match must contain.
+
+    Returns None when the pattern implies no trigram (e.g. ``\\w+``), in
+    which case every indexed file is a candidate.
+    """
+    parsed = sre_parse.parse(pattern, flags)
+    ignorecase = bool(parsed.state.flags & re.IGNORECASE)
+    return _plan_items(parsed, ignorecase)
+
+
+class TrigramIndex:
+    """
+    Read side of a trigram index: memory-mapped postings plus a file list.
+
+    Postings are sorted file ids stored as fixed-width little-endian
+    integers (16-bit when the index holds fewer than 65536 files), so a
+    list is decoded with one array.frombytes() call. The entry table is
+    sorted by trigram and binary-searched in place in the mapping.
+
+    Changes published on the change bus after the build are kept in an
+    in-memory overlay: changed files are re-read (once, at the next query)
+    and matched against their own trigram sets, so the index stays exact
+    at a cost proportional to what changed. ``refresh`` folds the overlay
+    into a new on-disk index.
+
+    Files over the size limit are not indexed but are listed in
+    ``unindexed`` and returned by every query, so narrowing never drops a match.
+    Binary and unreadable files are listed in ``skipped`` so freshness checks
+    compare the same set of files the build saw.
+    """
+
+    def __init__(self, root: str, index_dir: Optional[str] = None):
+        self.root = os.path.abspath(root)
+        self.index_dir = index_dir or os.path.join(self.root, INDEX_DIR_NAME)
+        with open(os.path.join(self.index_dir, META_FILE), "r", encoding="utf-8") as f:
+            meta = json.load(f)
+        if meta.get("version") != INDEX_VERSION:
+            raise ValueError(f"Unsupported index version: {meta.get('version')}")
+        self.meta = meta
+        self.files: List[List[Any]] = meta["files"]  # [rel_path, mtime_ns, size]
+        # Oversized files: {rel_path: (mtime_ns, size)}
+        self.unindexed: Dict[str, Tuple[int, int]] = {rel: (mtime, size)
+                                                      for rel, mtime, size in meta.get("unindexed", [])}
+        # Binary or unreadable files: {rel_path: (mtime_ns, size)}
+        self.skipped: Dict[str, Tuple[int, int]] = {rel: (mtime, size)
+                                                    for rel, mtime, size in meta.get("skipped", [])}
+
+        index_path = os.path.join(self.index_dir, INDEX_FILE)
+        self.index_mtime = os.stat(index_path).st_mtime_ns
+        with open(index_path, "rb") as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, n_files, n_trigrams, width = _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC or n_files != len(self.files):
+            raise ValueError(f"Corrupt trigram index: {index_path}")
+        self.n_trigrams = n_trigrams
+        self._typecode = "H" if width == 2 else "I"
+        self._width = width
+        self._table = _HEADER.size
+
+        self._overlay: Dict[str, Optional[Set[int]]] = {}  # rel_path -> trigrams, None if gone
+        self._dirty: Set[str] = set()       # Files to re-read at the next query
+        self._rescan: Set[str] = set()      # Directories to diff against the file list
+        self._overlay_lock = threading.Lock()
+        self._subscription: Optional[int] = None
+        self.watched = False
+
+    @classmethod
+    def exists(cls, root: str) -> bool:
+        """Whether an index has been built for `root`."""
+        index_dir = os.path.join(root, INDEX_DIR_NAME)
+        return os.path.isfile(os.path.join(index_dir, INDEX_FILE)) and \
+            os.path.isfile(os.path.join(index_dir, META_FILE))
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _entry(self, i: int) -> Tuple[int, int, int]:
+        return _ENTRY.unpack_from(self._mm, self._table + i * _ENTRY.size)
+
+    def _find(self, trigram: int) -> Optional[Tuple[int, int]]:
+        """Binary-search the entry table; returns (offset, count) or None."""
+        lo, hi = 0, self.n_trigrams
+        while lo < hi:
+            mid = (lo + hi) // 2
+            key, offset, count = self._entry(mid)
+            if key < trigram:
+                lo = mid + 1
+            elif key > trigram:
+                hi = mid
+            else:
+                return offset, count
+        return None
+
+    def posting_count(self, trigram: int) -> int:
+        found = self._find(trigram)
+        return found[1] if found else 0
+
+    def postings(self, trigram: int) -> Set[int]:
+        """File ids containing a trigram."""
+        found = self._find(trigram)
+        if found is None:
+            return set()
+        offset, count = found
+        ids = array(self._typecode)
+        ids.frombytes(self._mm[offset:offset + count * self._width])
+        return set(ids)
+
+    def _evaluate(self, query: Query) -> Optional[Set[int]]:
+        """File ids satisfying a query; None means all files."""
+        if query is None:
+            return None
+        kind, arg = query
+        if kind == "tri":
+            return self.postings(arg)
+        if kind == "or":
+            result: Set[int] = set()
+            for sub in arg:
+                ids = self._evaluate(sub)
+                if ids is None:
+                    return None
+                result |= ids
+            return result
+        # AND: intersect the most selective trigrams first, stop when empty
+        subs = sorted(arg, key=lambda q: self.posting_count(q[1]) if q[0] == "tri" else 1 << 32)
+        result = None
+        for sub in subs:
+            ids = self._evaluate(sub)
+            if ids is None:
+                continue
+            result = ids if result is None else result & ids
+            if not result:
+                break
+        return result
+
+    def candidates(self, pattern: str, flags: int = 0) -> List[str]:
+        """Absolute paths of files that may match a regex."""
+        query = plan_query(pattern, flags)
+        overlay = self._current_overlay()
+        ids = self._evaluate(query)
+        if ids is None:
+            ids = range(len(self.files))
+        paths = [self.files[i][0] for i in sorted(ids)]
+        if overlay:
+            paths = [rel for rel in paths if rel not in overlay]
+            paths += sorted(rel for rel, trigrams in overlay.items()
+                            if trigrams is not None and _matches(query, trigrams))
+        with self._overlay_lock:
+            paths += sorted(self.unindexed)
+        return [os.path.join(self.root, rel) for rel in paths]
+
+    def subscribe(self) -> None:
+        """Receive change events from the shared change bus."""
+        if self._subscription is None:
+            self._subscription = get_change_bus().subscribe(self.apply_changes)
+
+    def unsubscribe(self) -> None:
+        if self._subscription is not None:
+            get_change_bus().unsubscribe(self._subscription)
+            self._subscription = None
+
+    def watch(self) -> FileWatcher:
+        """
+        Keep this index fresh with a filesystem watcher on its root.
+
+        The first call also schedules a one-off diff of the tree against the
+        file list, to catch up with changes made while nothing was watching.
+
+        Returns:
+            The shared watcher for the root
+        """
+        self.subscribe()
+        with self._overlay_lock:
+            if not self.watched:
+                self._rescan.add("")
+            self.watched = True
+        return watch_directory(self.root, holder=self)
+
+    def unwatch(self) -> None:
+        """Stop watching the root; the watcher stops once no other index needs it."""
+        with self._overlay_lock:
+            if not self.watched:
+                return
+            self.watched = False
+        unwatch_directory(self.root, self)
+
+    def rescan(self) -> None:
+        """
+        Diff the tree against the file list at the next query.
+
+        For unwatched indexes: only stat() calls, with changed files re-read.
+        """
+        with self._overlay_lock:
+            self._rescan.add("")
+
+    def _indexed_state(self) -> Dict[str, Tuple[int, int]]:
+        """(mtime_ns, size) of every file the build saw, indexed or not."""
+        indexed = {rel: (mtime, size) for rel, mtime, size in self.files}
+        indexed.update(self.unindexed)
+        indexed.update(self.skipped)
+        return indexed
+
+    def apply_changes(self, changes: List[FileChange]) -> None:
+        """Record changed paths; they are re-indexed lazily at the next query."""
+        prefix = self.root + os.sep
+        with self._overlay_lock:
+            for change in changes:
+                if change.path == self.root:
+                    rel = ""
+                elif change.path.startswith(prefix):
+                    rel = change.path[len(prefix):].replace(os.sep, "/")
+                else:
+                    continue
+                if any(part in ALWAYS_SKIP_DIRS for part in rel.split("/")):
+                    continue
+                if change.is_dir or change.kind == "unknown":
+                    self._rescan.add(rel)
+                else:
+                    self._dirty.add(rel)
+
+    def _current_overlay(self) -> Dict[str, Optional[Set[int]]]:
+        """Bring the overlay up to date with recorded changes and return it."""
+        with self._overlay_lock:
+            if not self._dirty and not self._rescan:
+                return self._overlay
+            dirty, self._dirty = self._dirty, set()
+            rescan, self._rescan = self._rescan, set()
+
+            max_file_size = self.meta.get("max_file_size", DEFAULT_MAX_FILE_SIZE)
+            if rescan:
+                indexed = self._indexed_state()
+                for rel_dir in rescan:
+                    dirty.update(self._diff_directory(rel_dir, indexed))
+
+            for rel in dirty:
+                path = os.path.join(self.root, rel)
+                try:
+                    st = os.stat(path)
+                except OSError:
+                    st = None  # Deleted
+                self.unindexed.pop(rel, None)
+                self.skipped.pop(rel, None)
+                if st is not None and st.st_size > max_file_size:
+                    self._overlay[rel] = None
+                    self.unindexed[rel] = (st.st_mtime_ns, st.st_size)
+                    continue
+                trigrams = None if st is None else file_trigrams(path)
+                if st is not None and trigrams is None:
+                    self.skipped[rel] = (st.st_mtime_ns, st.st_size)
+                self._overlay[rel] = trigrams
+            return self._overlay
+
+    def _diff_directory(self, rel_dir: str, indexed: Dict[str, Tuple[int, int]]) -> Set[str]:
+        """Paths under a directory that differ from the indexed file list."""
+        changed = set()
+        base = os.path.join(self.root, rel_dir) if rel_dir else self.root
+        prefix = rel_dir + "/" if rel_dir else ""
+        seen = set()
+        if os.path.isdir(base):
+            for rel_path, state in _scan_files(base):
+                rel_path = prefix + rel_path
+                seen.add(rel_path)
+                if indexed.get(rel_path) != state:
+                    changed.add(rel_path)
+        for rel_path in list(indexed) + list(self._overlay):
+            if rel_path.startswith(prefix) and rel_path not in seen:
+                changed.add(rel_path)  # Deleted, or now ignored
+        return changed
+
+    def pending_changes(self) -> int:
+        """Number of files currently served from the overlay."""
+        with self._overlay_lock:
+            return len(self._overlay) + len(self._dirty)
+
+    def is_stale(self) -> bool:
+        """Whether files were added, removed or changed since the build."""
+        with self._overlay_lock:
+            indexed = self._indexed_state()
+        return indexed != dict(_scan_files(self.root))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "root": self.root,
+            "files": len(self.files),
+            "unindexed_files": len(self.unindexed),
+            "skipped_files": len(self.skipped),
+            "trigrams": self.n_trigrams,
+            "index_bytes": len(self._mm),
+            "built_at": self.meta.get("built_at"),
+            "overlay_files": self.pending_changes()
+        }
+
+
+def _scan_files(root: str) -> Iterable[Tuple[str, Tuple[int, int]]]:
+    """Files under root as (rel_path, (mtime_ns, size)), in walk order."""
+    for rel_path, entry in iter_files(root):
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        yield rel_path, (st.st_mtime_ns, st.st_size)
+
+
+def build_index(root: str, max_file_size: int = DEFAULT_MAX_FILE_SIZE,
+                index_dir: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Build (or rebuild) the trigram index for a directory tree.
+
+    Honours .gitignore and skips binaries, which are listed as skipped.
+    Files over `max_file_size` are listed as unindexed, so queries still
+    return them.
+    The index is written to temporary files and renamed into place, so
+    readers never see a partial index.
+
+    Returns:
+        Build statistics
+    """
+    started = time.time()
+    root = os.path.abspath(root)
+    index_dir = index_dir or os.path.join(root, INDEX_DIR_NAME)
+    os.makedirs(index_dir, exist_ok=True)
+
+    files: List[List[Any]] = []
+    unindexed: List[List[Any]] = []
+    skipped: List[List[Any]] = []
+    postings: Dict[int, array] = {}
+    for rel_path, (mtime_ns, size) in _scan_files(root):
+        if size > max_file_size:
+            unindexed.append([rel_path, mtime_ns, size])
+            continue
+        trigrams = file_trigrams(os.path.join(root, rel_path))
+        if trigrams is None:
+            skipped.append([rel_path, mtime_ns, size])
+            continue
+        file_id = len(files)
+        files.append([rel_path, mtime_ns, size])
+        for trigram in trigrams:
+            ids = postings.get(trigram)
+            if ids is None:
+                ids = postings[trigram] = array("I")
+            ids.append(file_id)
+
+    width = 2 if len(files) < 0xFFFF else 4
+    typecode = "H" if width == 2 else "I"
+    keys = sorted(postings)
+    index_path = os.path.join(index_dir, INDEX_FILE)
+    tmp_path = index_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, len(files), len(keys), width))
+        offset = _HEADER.size + len(keys) * _ENTRY.size
+        table = bytearray()
+        for key in keys:
+            count = len(postings[key])
+            table += _ENTRY.pack(key, offset, count)
+            offset += count * width
+        f.write(table)
+        for key in keys:
+            ids = postings[key]
+            f.write(ids.tobytes() if width == 4 else array(typecode, ids).tobytes())
+        f.flush()
+        os.fsync(f.fileno())
+
+    meta_path = os.path.join(index_dir, META_FILE)
+    meta = {
+        "version": INDEX_VERSION,
+        "root": root,
+        "built_at": time.time(),
+        "max_file_size": max_file_size,
+        "files": files,
+        "unindexed": unindexed,
+        "skipped": skipped
+    }
+    with open(meta_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(meta, f)
+    os.replace(tmp_path, index_path)
+    os.replace(meta_path + ".tmp", meta_path)
+
+    return {
+        "root": root,
+        "files": len(files),
+        "unindexed_files": len(unindexed),
+        "skipped_files": len(skipped),
+        "trigrams": len(keys),
+        "index_bytes": os.path.getsize(index_path),
+        "seconds": round(time.time() - started, 3)
+    }
+
+
+def refresh_index(root: str, max_file_size: Optional[int] = None) -> Dict[str, Any]:
+    """Rebuild the index only if files changed since it was built."""
+    if TrigramIndex.exists(root):
+        index = get_trigram_index(root)
+        if not index.is_stale():
+            return dict(index.stats(), rebuilt=False)
+        max_file_size = max_file_size or index.meta.get("max_file_size")
+    stats = build_index(root, max_file_size or DEFAULT_MAX_FILE_SIZE)
+    return dict(stats, rebuilt=True)
+
+
+_open_indexes: Dict[str, TrigramIndex] = {}
+_open_lock = threading.Lock()
+
+
+def get_trigram_index(root: str) -> Optional[TrigramIndex]:
+    """
+    Get the index for a root, or None if none was built.
+
+    Open indexes are shared per process and reopened when the index file
+    is replaced by a rebuild.
+    """
+    root = os.path.abspath(root)
+    if not TrigramIndex.exists(root):
+        return None
+    mtime = os.stat(os.path.join(root, INDEX_DIR_NAME, INDEX_FILE)).st_mtime_ns
+    with _open_lock:
+        index = _open_indexes.get(root)
+        if index is None or index.index_mtime != mtime:
+            previous = index
+            index = TrigramIndex(root)
+            _open_indexes[root] = index
+            index.subscribe()
+            if previous is not None:
+                previous.unsubscribe()
+                if previous.watched:
+                    index.watch()
+                    previous.unwatch()
+        return index
+
+
+def find_index_root(path: str) -> Optional[str]:
+    """The nearest directory at or above `path` that has a trigram index."""
+    current = os.path.abspath(path)
+    while True:
+        if TrigramIndex.exists(current):
+            return current
+        parent = os.path.dirname(current)
+        if parent == current:
+            return None
+        current = parent
@@ -0,0 +1,440 @@
+"""Filesystem watching and a change bus for keeping caches and indexes fresh."""
+
+import atexit
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Optional, List, Dict, Callable, NamedTuple, Set
+
+from ..tools.walker import ALWAYS_SKIP_DIRS, walk_tree
+
+# Seconds without new events before a batch is published, and the most a
+# change can be delayed while events keep arriving
+DEFAULT_DEBOUNCE = 0.1
+MAX_LATENCY = 1.0
+
+# Interval between scans for the polling fallback
+DEFAULT_POLL_INTERVAL = 1.0
+
+
+class FileChange(NamedTuple):
+    """
+    One change to the working tree.
+
+    ``kind`` is "created", "modified", "deleted", or "unknown" when anything
+    under ``path`` may have changed (an event overflow, or a shell command
+    that ran where nothing was watching) and subscribers should rescan it.
+    """
+    path: str
+    kind: str
+    is_dir: bool = False
+
+
+Subscriber = Callable[[List[FileChange]], None]
+
+
+class ChangeBus:
+    """Publishes batches of file changes to subscribed caches and indexes."""
+
+    def __init__(self):
+        self._subscribers: Dict[int, Subscriber] = {}
+        self._next_token = 0
+        self._lock = threading.Lock()
+
+    def subscribe(self, callback: Subscriber) -> int:
+        """Register a callback for change batches; returns a token for unsubscribe()."""
+        with self._lock:
+            self._next_token += 1
+            self._subscribers[self._next_token] = callback
+            return self._next_token
+
+    def unsubscribe(self, token: int) -> None:
+        with self._lock:
+            self._subscribers.pop(token, None)
+
+    def publish(self, changes: List[FileChange]) -> None:
+        """Deliver a batch synchronously; a failing subscriber does not affect others."""
+        if not changes:
+            return
+        with self._lock:
+            subscribers = list(self._subscribers.values())
+        for callback in subscribers:
+            try:
+                callback(changes)
+            except Exception:
+                pass
+
+
+_shared_bus: Optional[ChangeBus] = None
+_bus_lock = threading.Lock()
+
+
+def get_change_bus() -> ChangeBus:
+    """Get the process-wide change bus."""
+    global _shared_bus
+    with _bus_lock:
+        if _shared_bus is None:
+            _shared_bus = ChangeBus()
+        return _shared_bus
+
+
+def publish_changes(paths: List[str], kind: str = "modified") -> None:
+    """Announce changes made by this process (e.g. FileTool writes) on the shared bus."""
+    get_change_bus().publish([FileChange(os.path.abspath(path), kind) for path in paths])
+
+
+class FileWatcher(ABC):
+    """
+    Base class for watchers: collects changes, debounces and publishes batches.
+
+    Subclasses implement _poll(timeout), which waits up to `timeout`
+    seconds and records any changes it sees with _record().
+    """
+
+    backend = "none"
+
+    def __init__(self, root: str, bus: Optional[ChangeBus] = None,
+                 debounce: float = DEFAULT_DEBOUNCE):
+        self.root = os.path.abspath(root)
+        self.bus = bus or get_change_bus()
+        self.debounce = debounce
+        self._pending: Dict[str, FileChange] = {}
+        self._first_pending = 0.0
+        self._last_event = 0.0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.batches_published = 0
+
+    def start(self) -> "FileWatcher":
+        self._thread = threading.Thread(target=self._run, name=f"watcher:{self.root}", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def _record(self, change: FileChange) -> None:
+        """Merge a change into the pending batch (one entry per path)."""
+        now = time.monotonic()
+        with self._lock:
+            if not self._pending:
+                self._first_pending = now
+            previous = self._pending.get(change.path)
+            if previous is not None and previous.kind == "created" and change.kind == "modified":
+                change = previous  # Still a creation as far as subscribers are concerned
+            self._pending[change.path] = change
+            self._last_event = now
+
+    def _take_batch(self, force: bool = False) -> List[FileChange]:
+        with self._lock:
+            if not self._pending:
+                return []
+            now = time.monotonic()
+            quiet = now - self._last_event >= self.debounce
+            overdue = now - self._first_pending >= MAX_LATENCY
+            if not (force or quiet or overdue):
+                return []
+            batch = list(self._pending.values())
+            self._pending.clear()
+            return batch
+
+    def _publish(self, batch: List[FileChange]) -> None:
+        if batch:
+            self.batches_published += 1
+            self.bus.publish(batch)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            try:
+                self._poll(self.debounce if self._pending else 0.25)
+            except Exception:
+                # Lost track of the tree; tell subscribers to rescan it
+                self._record(FileChange(self.root, "unknown", True))
+                self._stop.wait(0.5)
+            self._publish(self._take_batch())
+
+    @abstractmethod
+    def _poll(self, timeout: float) -> None:
+        """Wait up to `timeout` seconds, recording changes seen meanwhile."""
+        pass
+
+    def flush(self) -> None:
+        """Pick up everything that has happened so far and publish it now."""
+        self._poll(0)
+        self._publish(self._take_batch(force=True))
+
+
+class PollingWatcher(FileWatcher):
+    """Portable fallback: periodically diffs (mtime, size) snapshots of the tree."""
+
+    backend = "polling"
+
+    def __init__(self, root: str, bus: Optional[ChangeBus] = None,
+                 debounce: float = DEFAULT_DEBOUNCE, interval: float = DEFAULT_POLL_INTERVAL):
+        super().__init__(root, bus, debounce)
+        self.interval = interval
+        self._scan_lock = threading.Lock()
+        self._snapshot = self._scan()
+        self._last_scan = time.monotonic()
+
+    def _scan(self) -> Dict[str, tuple]:
+        snapshot = {}
+        for rel_path, entry, _ in walk_tree(self.root, sort=False):
+            try:
+                st = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            snapshot[rel_path] = (entry.is_dir(follow_symlinks=False), st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def _poll(self, timeout: float) -> None:
+        if timeout:
+            self._stop.wait(max(0.0, min(timeout, self.interval - (time.monotonic() - self._last_scan))))
+            if time.monotonic() - self._last_scan < self.interval:
+                return
+        with self._scan_lock:
+            current = self._scan()
+            self._last_scan = time.monotonic()
+            previous, self._snapshot = self._snapshot, current
+        for rel_path, state in current.items():
+            old = previous.get(rel_path)
+            if old is None:
+                self._record(FileChange(os.path.join(self.root, rel_path), "created", state[0]))
+            elif old != state and not state[0]:
+                self._record(FileChange(os.path.join(self.root, rel_path), "modified"))
+        for rel_path, state in previous.items():
+            if rel_path not in current:
+                self._record(FileChange(os.path.join(self.root, rel_path), "deleted", state[0]))
+
+
+# inotify(7) constants
+IN_MODIFY = 0x00000002
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+
+WATCH_MASK = (IN_MODIFY | IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE |
+              IN_DELETE | IN_DELETE_SELF | IN_MOVE_SELF | IN_ONLYDIR)
+
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, name length
+
+_libc = None
+
+
+def _load_libc():
+    """libc with inotify symbols, or None where inotify is unavailable."""
+    global _libc
+    if _libc is None:
+        try:
+            libc = ctypes.CDLL(ctypes.util.find_library("c") or "libc.so.6", use_errno=True)
+            libc.inotify_init1, libc.inotify_add_watch  # Raise if missing
+            _libc = libc
+        except (OSError, AttributeError):
+            _libc = False
+    return _libc or None
+
+
+def inotify_available() -> bool:
+    return _load_libc() is not None
+
+
+class InotifyWatcher(FileWatcher):
+    """Linux watcher: one inotify watch per (non-ignored) directory."""
+
+    backend = "inotify"
+
+    def __init__(self, root: str, bus: Optional[ChangeBus] = None,
+                 debounce: float = DEFAULT_DEBOUNCE):
+        super().__init__(root, bus, debounce)
+        self._libc = _load_libc()
+        if self._libc is None:
+            raise OSError(errno.ENOSYS, "inotify is not available")
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._dirs: Dict[int, str] = {}
+        self._read_lock = threading.Lock()
+        try:
+            self._add_tree(self.root, announce=False)
+        except OSError:
+            os.close(self._fd)
+            raise
+
+    def _add_watch(self, path: str) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(path), WATCH_MASK)
+        if wd < 0:
+            err = ctypes.get_errno()
+            if err in (errno.ENOENT, errno.ENOTDIR, errno.EACCES):
+                return  # Vanished or unreadable; nothing to watch
+            raise OSError(err, f"inotify_add_watch failed for {path}")
+        self._dirs[wd] = path
+
+    def _add_tree(self, path: str, announce: bool = True) -> None:
+        """Watch a directory and its subdirectories, announcing existing files if new."""
+        self._add_watch(path)
+        for rel_path, entry, _ in walk_tree(path, sort=False):
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if is_dir:
+                self._add_watch(entry.path)
+            if announce:
+                # Files created before the watch existed would otherwise be missed
+                self._record(FileChange(entry.path, "created", is_dir))
+
+    def _poll(self, timeout: float) -> None:
+        with self._read_lock:
+            if self._fd < 0:
+                return
+            ready, _, _ = select.select([self._fd], [], [], timeout)
+            if not ready:
+                return
+            while True:
+                try:
+                    data = os.read(self._fd, 64 * 1024)
+                except BlockingIOError:
+                    return
+                if not data:
+                    return
+                self._parse(data)
+
+    def _parse(self, data: bytes) -> None:
+        offset = 0
+        while offset + _EVENT.size <= len(data):
+            wd, mask, _, length = _EVENT.unpack_from(data, offset)
+            name = data[offset + _EVENT.size:offset + _EVENT.size + length].rstrip(b"\0")
+            offset += _EVENT.size + length
+
+            if mask & IN_Q_OVERFLOW:
+                self._record(FileChange(self.root, "unknown", True))
+                continue
+            if mask & IN_IGNORED:
+                self._dirs.pop(wd, None)
+                continue
+            directory = self._dirs.get(wd)
+            if directory is None:
+                continue
+            if mask & (IN_DELETE_SELF | IN_MOVE_SELF):
+                self._record(FileChange(directory, "deleted", True))
+                continue
+
+            name = os.fsdecode(name)
+            path = os.path.join(directory, name)
+            is_dir = bool(mask & IN_ISDIR)
+            if is_dir and name in ALWAYS_SKIP_DIRS:
+                continue
+            if mask & (IN_CREATE | IN_MOVED_TO):
+                self._record(FileChange(path, "created", is_dir))
+                if is_dir:
+                    try:
+                        self._add_tree(path)
+                    except OSError:
+                        self._record(FileChange(path, "unknown", True))
+            elif mask & (IN_DELETE | IN_MOVED_FROM):
+                self._record(FileChange(path, "deleted", is_dir))
+            elif not is_dir:
+                self._record(FileChange(path, "modified"))
+
+    def stop(self) -> None:
+        super().stop()
+        with self._read_lock:
+            if self._fd >= 0:
+                os.close(self._fd)
+                self._fd = -1
+
+
+_watchers: Dict[str, FileWatcher] = {}
+# Who needs each watcher: ids of holders, and None for callers that never release it
+_holders: Dict[str, Set[Optional[int]]] = {}
+_watchers_lock = threading.Lock()
+
+
+def watch_directory(root: str, bus: Optional[ChangeBus] = None,
+                    backend: str = "auto", holder: Any = None) -> FileWatcher:
+    """
+    Get the shared watcher for a directory tree, starting it on first use.
+
+    Args:
+        root: Directory to watch recursively
+        bus: Change bus to publish to (the shared one by default)
+        backend: "inotify", "polling" or "auto" (inotify when available;
+            polling if the kernel's watch limit is exhausted)
+        holder: Object (e.g. an index) that releases its interest with
+            unwatch_directory(); without one the watcher runs until exit
+    """
+    root = os.path.abspath(root)
+    with _watchers_lock:
+        _holders.setdefault(root, set()).add(None if holder is None else id(holder))
+        watcher = _watchers.get(root)
+        if watcher is not None and watcher.running:
+            return watcher
+        watcher = None
+        if backend in ("auto", "inotify") and inotify_available():
+            try:
+                watcher = InotifyWatcher(root, bus)
+            except OSError:
+                if backend == "inotify":
+                    raise
+        if watcher is None:
+            watcher = PollingWatcher(root, bus)
+        _watchers[root] = watcher.start()
+        return watcher
+
+
+def unwatch_directory(root: str, holder: Any) -> None:
+    """Release `holder`'s interest in a watcher, stopping it once nothing needs it."""
+    root = os.path.abspath(root)
+    with _watchers_lock:
+        holders = _holders.get(root)
+        if holders is None:
+            return
+        holders.discard(id(holder))
+        if holders:
+            return
+        del _holders[root]
+        watcher = _watchers.pop(root, None)
+    if watcher is not None:
+        watcher.stop()
+
+
+def is_watched(path: str) -> bool:
+    """Whether a running watcher covers `path`."""
+    path = os.path.abspath(path)
+    with _watchers_lock:
+        return any(
+            watcher.running and (path == root or path.startswith(root + os.sep))
+            for root, watcher in _watchers.items()
+        )
+
+
+def stop_all_watchers() -> None:
+    with _watchers_lock:
+        watchers = list(_watchers.values())
+        _watchers.clear()
+        _holders.clear()
+    for watcher in watchers:
+        watcher.stop()
+
+
+atexit.register(stop_all_watchers)
@@ -5,6 +5,7 @@ from typing import List, Dict, Any, Optional
 from openai import OpenAI
 from dotenv import load_dotenv
 from .tools import ToolResult
+from .budget import Budget, BudgetTracker
 
 # Load environment variables
 load_dotenv()
@@ -34,7 +35,8 @@ class LLMClient:
     def chat_completion(self, messages: List[Dict[str, str]], 
                        tools: Optional[List[Dict[str, Any]]] = None,
                        tool_choice: Optional[str] = "auto",
-                       temperature: float = 0.6) -> Any:
+                       temperature: float = 0.6,
+                       timeout: Optional[float] = None) -> Any:
         """
         Send chat completion request to LLM.
         
@@ -43,6 +45,7 @@ class LLMClient:
             tools: Optional list of tool definitions for function calling
             tool_choice: How to choose tools ("auto", "none", or specific tool)
             temperature: Sampling temperature (0.0 to 1.0)
+            timeout: Seconds to wait for the response
             
         Returns:
             API response object
@@ -57,12 +60,17 @@ class LLMClient:
             kwargs["tools"] = tools
             kwargs["tool_choice"] = tool_choice
         
+        if timeout is not None:
+            kwargs["timeout"] = timeout
+        
         return self.client.chat.completions.create(**kwargs)
     
     def execute_with_tools(self, system_prompt: str, user_prompt: str, 
                           available_tools: Dict[str, Any],
                           temperature: float = 0.6,
-                          max_iterations: int = 10) -> ToolResult:
+                          max_iterations: int = 10,
+                          budget: Optional[Budget] = None,
+                          tracker: Optional[BudgetTracker] = None) -> ToolResult:
         """
         Execute LLM with tool calling capability (supports multi-turn tool calls).
         
@@ -72,10 +80,19 @@ class LLMClient:
             available_tools: Dictionary of tool name to tool instance
             temperature: Sampling temperature
             max_iterations: Maximum number of tool call iterations
+            budget: Token, time, tool-call and cost limits; checked before each
+                iteration and tool call. When one is reached the run stops with
+                a partial result. The spend is reported in metadata["budget"].
+            tracker: Tracker to charge instead of a new one for `budget`, e.g.
+                one the caller started before preparing the prompt
             
         Returns:
             ToolResult with LLM response or tool execution results
         """
+        if tracker is None:
+            tracker = BudgetTracker(budget)
+        if tracker.budget.max_iterations is not None:
+            max_iterations = tracker.budget.max_iterations
         try:
             # Prepare messages
             messages = [
@@ -99,19 +116,44 @@ class LLMClient:
             
             total_tool_calls = 0
             all_tool_results = []
+            last_content = None
             
             # Multi-turn loop: keep calling LLM until it doesn't request tools
             for iteration in range(max_iterations):
+                exhausted = tracker.check()
+                if exhausted:
+                    # Stop gracefully with whatever the model has said so far
+                    return ToolResult(
+                        success=True,
+                        data={
+                            "llm_response": last_content or f"Stopped early: {exhausted}",
+                            "tool_results": [r.to_dict() for r in all_tool_results],
+                            "tool_calls": total_tool_calls,
+                            "iterations": iteration,
+                            "budget_exhausted": exhausted
+                        },
+                        metadata={
+                            "model": self.model,
+                            "execution_type": "budget_exhausted",
+                            "total_tool_calls": total_tool_calls,
+                            "budget": tracker.report()
+                        }
+                    )
+                
                 # Call LLM
                 response = self.chat_completion(
                     messages=messages,
                     tools=tools if tools else None,
                     tool_choice="auto" if tools else None,
-                    temperature=temperature
+                    temperature=temperature,
+                    timeout=tracker.remaining_seconds()
                 )
+                tracker.record_usage(getattr(response, "usage", None))
+                tracker.record_iteration()
                 
                 # Process response
                 message = response.choices[0].message
+                last_content = message.content or last_content
                 
                 # Check if LLM wants to call a tool
                 if message.tool_calls:
@@ -126,10 +168,14 @@ class LLMClient:
                             import json
                             args = json.loads(tool_args)
                             
-                            # Execute tool
-                            tool_result = tool.execute(**args)
-                            all_tool_results.append(tool_result)
-                            total_tool_calls += 1
+                            # Execute tool, unless its call budget is spent
+                            denied = tracker.allow_tool_call(tool_name)
+                            if denied:
+                                tool_result = ToolResult(success=False, error=f"Not run: {denied}")
+                            else:
+                                tool_result = tool.execute(**args)
+                                all_tool_results.append(tool_result)
+                                total_tool_calls += 1
                             
                             # Add tool call and result to messages for next iteration
                             messages.append({
@@ -161,7 +207,8 @@ class LLMClient:
                         metadata={
                             "model": self.model,
                             "execution_type": "multi_turn" if total_tool_calls > 0 else "direct_response",
-                            "total_tool_calls": total_tool_calls
+                            "total_tool_calls": total_tool_calls,
+                            "budget": tracker.report()
                         }
                     )
             
@@ -177,7 +224,8 @@ class LLMClient:
                 metadata={
                     "model": self.model,
                     "execution_type": "multi_turn_max_iter",
-                    "total_tool_calls": total_tool_calls
+                    "total_tool_calls": total_tool_calls,
+                    "budget": tracker.report()
                 }
             )
         
@@ -185,5 +233,5 @@ class LLMClient:
             return ToolResult(
                 success=False,
                 error=f"LLM execution failed: {str(e)}",
-                metadata={"model": self.model}
+                metadata={"model": self.model, "budget": tracker.report()}
             )
@@ -1,7 +1,9 @@
 """Main Claude Code Python implementation."""
 
-from typing import Dict, Any, Optional, List
-from .tools import TaskTool, BashTool, FileTool, SearchTool, ToolResult
+from typing import Dict, Any, Optional, List, Union
+from .budget import Budget
+from .planning import Plan, PlanExecutor
+from .tools import TaskTool, BashTool, PythonTool, FileTool, SearchTool, SymbolTool, RetrieveTool, ToolResult
 
 
 class ClaudeCode:
@@ -11,8 +13,11 @@ class ClaudeCode:
         self.tools = {
             "task": TaskTool(),
             "bash": BashTool(),
+            "python": PythonTool(),
             "file": FileTool(),
-            "search": SearchTool()
+            "search": SearchTool(),
+            "symbol": SymbolTool(),
+            "retrieve": RetrieveTool()
         }
         self.task_tool = self.tools["task"]
     
@@ -29,14 +34,18 @@ class ClaudeCode:
     
     def create_task(self, subagent_type: str, description: str, prompt: str,
                    constraints: Optional[str] = None,
-                   output_format: Optional[str] = None) -> ToolResult:
-        """Create a new task with a subagent."""
+                   output_format: Optional[str] = None,
+                   depends_on: Optional[List[str]] = None,
+                   budget: Optional[Budget] = None) -> ToolResult:
+        """Create a new task with a subagent, optionally after other tasks and within a budget."""
         return self.task_tool.execute(
             subagent_type=subagent_type,
             description=description,
             prompt=prompt,
             constraints=constraints,
-            output_format=output_format
+            output_format=output_format,
+            depends_on=depends_on,
+            budget=budget
         )
     
     def get_task_status(self, task_id: str) -> Optional[ToolResult]:
@@ -59,6 +68,10 @@ class ClaudeCode:
             )
         return ToolResult(success=False, error=f"Task not found: {task_id}")
     
+    def run_plan(self, plan: Union[Plan, Dict[str, Any]], timeout: Optional[float] = None) -> ToolResult:
+        """Run a structured plan's steps as dependent tasks, independent steps in parallel."""
+        return PlanExecutor(self.task_tool.task_manager).execute(plan, timeout)
+    
     def wait_for_all_tasks(self, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
         """Wait for all tasks to complete."""
         tasks = self.task_tool.wait_for_all_tasks(timeout)
@@ -72,12 +85,25 @@ class ClaudeCode:
             dir_path=dir_path
         )
     
-    def read_file(self, file_path: str, limit: Optional[int] = None) -> ToolResult:
-        """Read a file."""
+    def execute_python(self, code: str, description: str, timeout: Optional[float] = 30,
+                       dir_path: Optional[str] = None) -> ToolResult:
+        """Execute a Python snippet in a warm worker interpreter."""
+        return self.tools["python"].execute(
+            code=code,
+            description=description,
+            timeout=timeout,
+            dir_path=dir_path
+        )
+    
+    def read_file(self, file_path: str, limit: Optional[int] = None,
+                  offset: Optional[int] = None, tail: Optional[int] = None) -> ToolResult:
+        """Read a file, optionally a line range or its last lines."""
         return self.tools["file"].execute(
             action="read",
             file_path=file_path,
-            limit=limit
+            limit=limit,
+            offset=offset,
+            tail=tail
         )
     
     def write_file(self, file_path: str, content: str) -> ToolResult:
@@ -89,13 +115,37 @@ class ClaudeCode:
         )
     
     def search_files(self, pattern: str, path: str = ".", 
-                    include: Optional[str] = None, max_results: int = 100) -> ToolResult:
+                    include: Optional[str] = None, max_results: int = 100,
+                    exclude: Optional[str] = None) -> ToolResult:
         """Search for pattern in files."""
         return self.tools["search"].execute(
             pattern=pattern,
             path=path,
             include=include,
-            max_results=max_results
+            max_results=max_results,
+            exclude=exclude
+        )
+    
+    def iter_search(self, pattern: str, path: str = ".", include: Optional[str] = None,
+                    max_results: Optional[int] = None, context: int = 0, **kwargs):
+        """Yield search matches as they are found; stop iterating to stop the scan."""
+        return self.tools["search"].iter_matches(
+            pattern=pattern,
+            path=path,
+            include=include,
+            max_results=max_results,
+            before_context=context,
+            after_context=context,
+            **kwargs
+        )
+    
+    def find_files(self, query: str, path: str = ".", limit: int = 20) -> ToolResult:
+        """Fuzzy-find files by name or path, best matches first."""
+        return self.tools["file"].execute(
+            action="find",
+            file_path=path,
+            pattern=query,
+            limit=limit
         )
     
     def cleanup(self):
@@ -0,0 +1,180 @@
+"""Structured plans: validated step graphs, executed as dependent tasks."""
+
+import json
+import re
+import time
+from typing import Optional, List, Dict, Any, Union
+from pydantic import BaseModel, field_validator, model_validator
+
+from .tools.base import ToolResult
+from .tools.task_tool import AGENT_TYPES, TaskManager
+
+# Shown to the PlanAgent in structured mode
+PLAN_JSON_INSTRUCTIONS = """Respond with a single JSON object and nothing else, in this form:
+{
+  "goal": "what the plan achieves",
+  "steps": [
+    {"id": "inspect", "description": "Short step title", "agent_type": "explore-agent",
+     "prompt": "Self-contained instructions for the agent running this step", "depends_on": []},
+    {"id": "implement", "description": "...", "agent_type": "general-purpose",
+     "prompt": "...", "depends_on": ["inspect"]}
+  ]
+}
+Rules:
+- agent_type is one of: %s
+- depends_on lists the ids of steps that must finish first; leave it empty
+  whenever a step can start right away, so independent steps run in parallel
+- each prompt must be self-contained: the agent sees only its own prompt
+""" % ", ".join(AGENT_TYPES)
+
+_JSON_FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.DOTALL)
+
+
+class PlanStep(BaseModel):
+    """One step of a plan, run by a subagent once its dependencies complete."""
+    id: str
+    description: str
+    prompt: str
+    agent_type: str = "general-purpose"
+    depends_on: List[str] = []
+
+    @field_validator("id")
+    @classmethod
+    def _check_id(cls, value: str) -> str:
+        if not value.strip():
+            raise ValueError("step id must not be empty")
+        return value
+
+    @field_validator("agent_type")
+    @classmethod
+    def _check_agent_type(cls, value: str) -> str:
+        if value not in AGENT_TYPES:
+            raise ValueError(f"unknown agent_type {value!r}; must be one of: {', '.join(AGENT_TYPES)}")
+        return value
+
+
+class Plan(BaseModel):
+    """A goal and the steps that reach it, forming a dependency graph without cycles."""
+    goal: str = ""
+    steps: List[PlanStep]
+
+    @model_validator(mode="after")
+    def _check_graph(self) -> "Plan":
+        if not self.steps:
+            raise ValueError("a plan needs at least one step")
+        ids = [step.id for step in self.steps]
+        duplicates = sorted({step_id for step_id in ids if ids.count(step_id) > 1})
+        if duplicates:
+            raise ValueError(f"duplicate step ids: {', '.join(duplicates)}")
+        for step in self.steps:
+            unknown = [dep for dep in step.depends_on if dep not in ids]
+            if unknown:
+                raise ValueError(f"step {step.id!r} depends on unknown steps: {', '.join(unknown)}")
+        if len(self.order()) != len(self.steps):
+            raise ValueError("step dependencies form a cycle")
+        return self
+
+    def order(self) -> List[PlanStep]:
+        """Steps in dependency order, otherwise in plan order; steps on a cycle are left out."""
+        done = set()
+        ordered = []
+        remaining = list(self.steps)
+        while remaining:
+            ready = [step for step in remaining if all(dep in done for dep in step.depends_on)]
+            if not ready:
+                break
+            for step in ready:
+                done.add(step.id)
+                ordered.append(step)
+            remaining = [step for step in remaining if step.id not in done]
+        return ordered
+
+
+def parse_plan(text: str) -> Plan:
+    """
+    Parse and validate a plan from LLM output.
+
+    Accepts bare JSON or JSON in a ``` fence, with or without text around it.
+
+    Raises:
+        ValueError: If no JSON object is found or it does not match the schema
+    """
+    fenced = _JSON_FENCE.search(text)
+    candidate = fenced.group(1) if fenced else text
+    start, end = candidate.find("{"), candidate.rfind("}")
+    if start < 0 or end < start:
+        raise ValueError("no JSON object found in plan")
+    return Plan.model_validate(json.loads(candidate[start:end + 1]))
+
+
+class PlanExecutor:
+    """Runs a plan as a dependency graph of tasks, independent steps concurrently."""
+
+    def __init__(self, task_manager: Optional[TaskManager] = None):
+        self.task_manager = task_manager or TaskManager()
+
+    def execute(self, plan: Union[Plan, Dict[str, Any]], timeout: Optional[float] = None) -> ToolResult:
+        """
+        Create one task per step, wired to the tasks of its dependencies, and wait for all.
+
+        Args:
+            plan: Plan, or a dict validated as one
+            timeout: Seconds to wait for the whole plan
+
+        Returns:
+            ToolResult with per-step status, results and timings
+        """
+        try:
+            plan = plan if isinstance(plan, Plan) else Plan.model_validate(plan)
+        except ValueError as e:
+            return ToolResult(success=False, error=f"Invalid plan: {str(e)}")
+
+        started = time.time()
+        task_ids: Dict[str, str] = {}
+        try:
+            for step in plan.order():
+                task_ids[step.id] = self.task_manager.create_task(
+                    agent_type=step.agent_type,
+                    description=step.description,
+                    prompt=step.prompt,
+                    depends_on=[task_ids[dep] for dep in step.depends_on]
+                )
+        except Exception as e:
+            return ToolResult(success=False, error=f"Failed to start plan: {str(e)}",
+                              data={"task_ids": task_ids})
+
+        deadline = None if timeout is None else started + timeout
+        for task_id in task_ids.values():
+            remaining = None if deadline is None else max(0.0, deadline - time.time())
+            self.task_manager.wait_for_task(task_id, remaining)
+        wall_seconds = time.time() - started
+
+        steps = []
+        for step in plan.steps:
+            task = self.task_manager.get_task_status(task_ids[step.id])
+            succeeded = task.status == "completed" and task.result is not None and task.result.success
+            steps.append({
+                "id": step.id,
+                "task_id": task.task_id,
+                "agent_type": step.agent_type,
+                "depends_on": step.depends_on,
+                "status": task.status if succeeded or task.status != "completed" else "failed",
+                "started_after": None if task.started_at is None else round(task.started_at - started, 3),
+                "duration": None if task.duration is None else round(task.duration, 3),
+                "result": task.result.data if task.result else None,
+                "error": task.error or (task.result.error if task.result else None)
+            })
+        serial_seconds = sum(step["duration"] or 0 for step in steps)
+
+        return ToolResult(
+            success=all(step["status"] == "completed" for step in steps),
+            data={"goal": plan.goal, "steps": steps},
+            metadata={
+                "steps": len(steps),
+                "failed_steps": sum(1 for step in steps if step["status"] != "completed"),
+                "wall_seconds": round(wall_seconds, 3),
+                # Time the steps would have taken one after another
+                "serial_seconds": round(serial_seconds, 3),
+                "speedup": round(serial_seconds / wall_seconds, 2) if wall_seconds > 0 else None
+            }
+        )
@@ -3,7 +3,11 @@
 from .base import BaseTool, ToolResult
 from .task_tool import TaskTool
 from .bash_tool import BashTool
+from .python_tool import PythonTool
 from .file_tool import FileTool
 from .search_tool import SearchTool
+from .symbol_tool import SymbolTool
+from .retrieve_tool import RetrieveTool
+from .sandbox import ExecutionProfile
 
-__all__ = ["BaseTool", "ToolResult", "TaskTool", "BashTool", "FileTool", "SearchTool"]
+__all__ = ["BaseTool", "ToolResult", "TaskTool", "BashTool", "PythonTool", "FileTool", "SearchTool", "SymbolTool", "RetrieveTool", "ExecutionProfile"]
@@ -0,0 +1,66 @@
+"""Aho-Corasick automaton for finding many literal strings in one pass."""
+
+from collections import deque
+from typing import List, Dict, Iterator, Sequence, Set, Tuple
+
+
+class AhoCorasick:
+    """
+    Multi-literal matcher: one pass over the text finds every occurrence of
+    every word, whatever the number of words.
+
+    Build cost is linear in the total length of the words.
+    """
+
+    def __init__(self, words: Sequence[str], ignore_case: bool = False):
+        self.words = list(words)
+        self.ignore_case = ignore_case
+        self._goto: List[Dict[str, int]] = [{}]
+        self._fail: List[int] = [0]
+        self._out: List[List[int]] = [[]]
+
+        for index, word in enumerate(self.words):
+            if not word:
+                continue
+            state = 0
+            for char in (word.lower() if ignore_case else word):
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append([])
+                state = next_state
+            self._out[state].append(index)
+
+        # Breadth-first: each state's failure link points to the longest
+        # proper suffix that is also a trie path; outputs are inherited from it
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                queue.append(next_state)
+                fail = self._fail[state]
+                while fail and char not in self._goto[fail]:
+                    fail = self._fail[fail]
+                target = self._goto[fail].get(char, 0)
+                self._fail[next_state] = target if target != next_state else 0
+                self._out[next_state] = self._out[next_state] + self._out[self._fail[next_state]]
+
+    def iter_matches(self, text: str) -> Iterator[Tuple[int, int]]:
+        """Yield (start offset, word index) for every occurrence, in end order."""
+        if self.ignore_case:
+            text = text.lower()
+        goto, fail, out = self._goto, self._fail, self._out
+        state = 0
+        for position, char in enumerate(text):
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            for index in out[state]:
+                yield position - len(self.words[index]) + 1, index
+
+    def find_all(self, text: str) -> Set[int]:
+        """Indices of the words that occur anywhere in `text`."""
+        return {index for _, index in self.iter_matches(text)}
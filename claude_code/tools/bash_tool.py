@@ -5,16 +5,31 @@ import os
 import platform
 from typing import Optional, Dict, Any
 from .base import BaseTool, ToolResult
+from .sandbox import ExecutionProfile, CgroupPlacement
+from .command_cache import CommandCache, is_read_only_command
+from ..indexing.watcher import FileChange, get_change_bus, is_watched
 
 
 class BashTool(BaseTool):
     """Tool for executing bash/shell commands."""
     
-    def __init__(self):
+    def __init__(self, profile: Optional[ExecutionProfile] = None,
+                 cache: Optional[CommandCache] = None):
+        """
+        Initialize the bash tool.
+        
+        Args:
+            profile: Optional resource-limit profile applied to every command
+                (defaults to the BASH_SANDBOX_PROFILE env var preset, if set)
+            cache: Optional cache for read-only commands (defaults to the
+                shared cache when BASH_COMMAND_CACHE is enabled)
+        """
         super().__init__(
             name="run_shell_command",
             description="Execute shell commands with safety checks and output capture"
         )
+        self.profile = profile if profile is not None else ExecutionProfile.from_env()
+        self.cache = cache if cache is not None else CommandCache.from_env()
     
     def execute(self, command: str, description: str, dir_path: Optional[str] = None) -> ToolResult:
         """
@@ -43,6 +58,22 @@ class BashTool(BaseTool):
                     error=f"Directory does not exist: {cwd}"
                 )
             
+            # Serve repeated read-only commands from the cache
+            fingerprint = None
+            if self.cache:
+                cached, fingerprint = self.cache.lookup(command, cwd)
+                if cached is not None:
+                    return ToolResult(
+                        success=True,
+                        data=dict(cached),
+                        metadata={
+                            "exit_code": 0,
+                            "executed_in": cwd,
+                            "command": command,
+                            "cached": True
+                        }
+                    )
+            
             # Execute command
             if is_windows:
                 # On Windows, handle mkdir specially (remove -p flag which doesn't exist on Windows)
@@ -63,19 +94,23 @@ class BashTool(BaseTool):
                     stderr=subprocess.PIPE,
                     text=True
                 )
+                
+                # Get output
+                stdout, stderr = process.communicate()
             else:
-                # On Unix-like systems
-                process = subprocess.Popen(
-                    command,
-                    shell=True,
-                    cwd=cwd,
-                    stdout=subprocess.PIPE,
-                    stderr=subprocess.PIPE,
-                    text=True
-                )
-            
-            # Get output
-            stdout, stderr = process.communicate()
+                # On Unix-like systems, the shell applies the sandbox profile
+                with CgroupPlacement(self.profile) as cgroup_path:
+                    process = subprocess.Popen(
+                        self.profile.wrap_command(command, cgroup_path) if self.profile else command,
+                        shell=True,
+                        cwd=cwd,
+                        stdout=subprocess.PIPE,
+                        stderr=subprocess.PIPE,
+                        text=True
+                    )
+                    
+                    # Get output
+                    stdout, stderr = process.communicate()
             exit_code = process.returncode
             
             # Prepare result data
@@ -89,6 +124,18 @@ class BashTool(BaseTool):
             
             success = exit_code == 0
             error = stderr if not success else None
+            if self.cache:
+                if fingerprint is not None and success:
+                    self.cache.store(command, cwd, fingerprint, data)
+                elif fingerprint is None:
+                    # The command may have modified files anywhere
+                    self.cache.invalidate()
+            if not is_read_only_command(command) and not is_watched(cwd):
+                # No watcher saw what the command touched; ask caches and
+                # indexes over this tree to rescan it
+                get_change_bus().publish([FileChange(os.path.abspath(cwd), "unknown", True)])
+            if exit_code < 0 and self.profile:
+                error = f"Command killed by signal {-exit_code} (sandbox profile: {self.profile.name})\n{stderr}"
             
             return ToolResult(
                 success=success,
@@ -97,7 +144,8 @@ class BashTool(BaseTool):
                 metadata={
                     "exit_code": exit_code,
                     "executed_in": cwd,
-                    "command": command
+                    "command": command,
+                    "sandbox": self.profile.to_dict() if self.profile else None
                 }
             )
             
@@ -0,0 +1,293 @@
+"""Memoisation of read-only shell commands for the bash tool."""
+
+import os
+import re
+import shlex
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple
+from ..indexing.watcher import get_change_bus
+
+# Programs whose output depends only on the filesystem and their arguments
+READ_ONLY_PROGRAMS = {
+    "ls", "cat", "head", "tail", "wc", "find", "grep", "egrep", "fgrep", "rg",
+    "pwd", "tree", "stat", "du", "file", "sort", "uniq", "cut", "nl", "md5sum",
+    "sha1sum", "sha256sum", "basename", "dirname", "realpath", "readlink", "dir",
+}
+
+# git subcommands that never modify the repository or working tree
+READ_ONLY_GIT_COMMANDS = {
+    "status", "log", "diff", "show", "ls-files", "rev-parse", "blame",
+    "branch", "describe", "shortlog", "grep", "ls-tree", "cat-file",
+}
+
+# Options with which `git branch` only lists branches; anything else may
+# create, rename or delete one
+BRANCH_LIST_OPTIONS = {
+    "-l", "--list", "-a", "--all", "-r", "--remotes", "-v", "-vv", "--verbose",
+    "-i", "--ignore-case", "--show-current", "--sort", "--format", "--color",
+    "--no-color", "--column", "--no-column", "--abbrev", "--no-abbrev",
+    "--contains", "--no-contains", "--merged", "--no-merged", "--points-at",
+}
+# Of those, the ones that take patterns or commits as further arguments
+BRANCH_LIST_MODE_OPTIONS = {"-l", "--list", "--contains", "--no-contains", "--merged",
+                            "--no-merged", "--points-at"}
+
+# Arguments that turn an otherwise read-only program into a writing one.
+# Matched with attached values (-ofile), as abbreviated long options
+# (--out=file) and inside clusters of short options (-no file)
+UNSAFE_ARGUMENTS = {
+    "find": {"-delete", "-exec", "-execdir", "-ok", "-okdir", "-fprint", "-fprint0", "-fprintf", "-fls"},
+    "sort": {"-o", "--output"},
+    # git log/diff/show write their output to a file with --output
+    "log": {"--output"},
+    "diff": {"--output"},
+    "show": {"--output"},
+    # git grep runs a pager program on the matching files
+    "grep": {"-O", "--open-files-in-pager"},
+    # ripgrep runs a preprocessor program on every file searched
+    "rg": {"--pre"},
+}
+
+# Shell syntax that can write files or run arbitrary sub-commands; newlines
+# separate commands just like ";"
+UNSAFE_SHELL_SYNTAX = re.compile(r"[;&<>`\n\r]|\$\(|\|\|")
+
+# Directories skipped when fingerprinting the working tree
+FINGERPRINT_SKIP_DIRS = {".git", "__pycache__", "node_modules", ".venv", "venv"}
+
+# Files inside .git whose changes affect read-only git commands
+GIT_STATE_FILES = ("HEAD", "index", "ORIG_HEAD", "FETCH_HEAD", "packed-refs")
+# Directory inside .git whose files (branch and tag tips) are walked too
+GIT_REFS_DIR = "refs"
+
+
+def _is_unsafe_argument(arg: str, unsafe) -> bool:
+    """Whether `arg` is, or abbreviates or contains, one of the `unsafe` options."""
+    if not arg.startswith("-") or arg == "-":
+        return False
+    name = arg.split("=", 1)[0]
+    for option in unsafe:
+        if name.startswith(option):
+            return True
+        if option.startswith("--") and name.startswith("--") and len(name) > 2 and option.startswith(name):
+            return True
+        if len(option) == 2 and not name.startswith("--") and option[1] in name[1:]:
+            return True
+    return False
+
+
+def _lists_branches(args) -> bool:
+    """Whether `git branch <args>` only lists branches."""
+    options = [arg.split("=", 1)[0] for arg in args if arg.startswith("-")]
+    if any(option not in BRANCH_LIST_OPTIONS for option in options):
+        return False
+    # Without a list-mode option, a name argument creates a branch
+    return len(options) == len(args) or any(option in BRANCH_LIST_MODE_OPTIONS for option in options)
+
+
+def is_read_only_command(command: str) -> bool:
+    """Classify a shell command as read-only (safe to memoise)."""
+    if not command.strip() or UNSAFE_SHELL_SYNTAX.search(command):
+        return False
+
+    for segment in command.split("|"):
+        try:
+            argv = shlex.split(segment)
+        except ValueError:
+            return False
+        if not argv:
+            return False
+
+        program = os.path.basename(argv[0])
+        args = argv[1:]
+        if program == "git":
+            # Skip global options such as `git -C path` or `git --no-pager`
+            while args and args[0].startswith("-"):
+                args = args[2:] if args[0] in ("-C", "-c") else args[1:]
+            if not args or args[0] not in READ_ONLY_GIT_COMMANDS:
+                return False
+            program, args = args[0], args[1:]
+            if program == "branch" and not _lists_branches(args):
+                return False
+        elif program not in READ_ONLY_PROGRAMS:
+            return False
+
+        unsafe = UNSAFE_ARGUMENTS.get(program, set())
+        if any(_is_unsafe_argument(arg, unsafe) for arg in args):
+            return False
+
+    return True
+
+
+def escapes_working_tree(command: str) -> bool:
+    """Whether a command references paths outside its working directory."""
+    try:
+        argv = shlex.split(command.replace("|", " "))
+    except ValueError:
+        return True
+    return any(
+        arg.startswith(("/", "~")) or arg == ".." or arg.startswith("../") or "/../" in arg
+        for arg in argv[1:]
+    )
+
+
+def _git_state_mtime(git_dir: str) -> int:
+    """Newest mtime of the state files and refs of a .git directory."""
+    newest = 0
+    for name in GIT_STATE_FILES:
+        try:
+            newest = max(newest, os.stat(os.path.join(git_dir, name)).st_mtime_ns)
+        except OSError:
+            pass
+    # A commit only moves the tip of the current branch under refs/heads
+    for dir_path, _, file_names in os.walk(os.path.join(git_dir, GIT_REFS_DIR)):
+        for name in [""] + file_names:
+            try:
+                newest = max(newest, os.stat(os.path.join(dir_path, name)).st_mtime_ns)
+            except OSError:
+                pass
+    return newest
+
+
+def tree_fingerprint(root: str, max_entries: int = 20000) -> Optional[Tuple[int, int]]:
+    """
+    Cheap fingerprint of a working tree: (entry count, newest mtime).
+
+    Directory mtimes catch creations, deletions and renames; file mtimes catch
+    content changes. Returns None when the tree is too large to fingerprint
+    cheaply, in which case the caller should not cache.
+    """
+    count = 0
+    newest = 0
+    stack = [root]
+    while stack:
+        current = stack.pop()
+        try:
+            st = os.stat(current)
+            newest = max(newest, st.st_mtime_ns)
+            with os.scandir(current) as entries:
+                for entry in entries:
+                    count += 1
+                    if count > max_entries:
+                        return None
+                    if entry.is_dir(follow_symlinks=False):
+                        if entry.name == ".git":
+                            newest = max(newest, _git_state_mtime(entry.path))
+                        elif entry.name not in FINGERPRINT_SKIP_DIRS:
+                            stack.append(entry.path)
+                    else:
+                        newest = max(newest, entry.stat(follow_symlinks=False).st_mtime_ns)
+        except OSError:
+            continue
+    return count, newest
+
+
+class CommandCache:
+    """
+    LRU cache of read-only command results keyed by (command, cwd).
+
+    Each entry records the fingerprint of the working tree at the time it was
+    produced and is discarded as soon as the fingerprint changes.
+    """
+
+    def __init__(self, max_entries: int = 256, ttl: Optional[float] = None,
+                 max_tree_entries: int = 20000):
+        """
+        Initialize the command cache.
+
+        Args:
+            max_entries: Maximum number of cached command results
+            ttl: Optional maximum age of an entry in seconds
+            max_tree_entries: Trees larger than this are never cached
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_tree_entries = max_tree_entries
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def from_env(cls) -> Optional["CommandCache"]:
+        """Return the shared cache if BASH_COMMAND_CACHE is enabled."""
+        if os.getenv("BASH_COMMAND_CACHE", "").lower() not in ("1", "true", "yes", "on"):
+            return None
+        return get_shared_command_cache()
+
+    def lookup(self, command: str, cwd: str) -> Tuple[Optional[Dict[str, Any]], Optional[Tuple[int, int]]]:
+        """
+        Look up a cached result.
+
+        Returns:
+            Tuple of (cached data or None, current tree fingerprint). The
+            fingerprint should be passed back to store() on a miss.
+        """
+        if not is_read_only_command(command) or escapes_working_tree(command):
+            return None, None
+
+        fingerprint = tree_fingerprint(cwd, self.max_tree_entries)
+        if fingerprint is None:
+            return None, None
+
+        key = (command, os.path.abspath(cwd))
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expired = self.ttl is not None and time.monotonic() - entry["stored_at"] > self.ttl
+                if entry["fingerprint"] == fingerprint and not expired:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return entry["data"], fingerprint
+                del self._entries[key]
+            self.misses += 1
+        return None, fingerprint
+
+    def store(self, command: str, cwd: str, fingerprint: Tuple[int, int], data: Dict[str, Any]) -> None:
+        """Store the result of a read-only command."""
+        key = (command, os.path.abspath(cwd))
+        with self._lock:
+            self._entries[key] = {
+                "fingerprint": fingerprint,
+                "data": data,
+                "stored_at": time.monotonic()
+            }
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, cwd: Optional[str] = None) -> None:
+        """Drop cached entries, either all of them or those under a directory."""
+        with self._lock:
+            if cwd is None:
+                self._entries.clear()
+                return
+            prefix = os.path.abspath(cwd)
+            for key in [k for k in self._entries if k[1].startswith(prefix) or prefix.startswith(k[1])]:
+                del self._entries[key]
+
+    def apply_changes(self, changes) -> None:
+        """Change-bus subscriber: drop results for directories containing changes."""
+        for change in changes:
+            self.invalidate(change.path if change.is_dir else os.path.dirname(change.path))
+
+    def stats(self) -> Dict[str, int]:
+        """Cache statistics."""
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits, "misses": self.misses}
+
+
+_shared_cache: Optional[CommandCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_command_cache() -> CommandCache:
+    """Get the process-wide command cache shared by all agents."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            _shared_cache = CommandCache()
+            get_change_bus().subscribe(_shared_cache.apply_changes)
+        return _shared_cache
@@ -0,0 +1,210 @@
+"""Binary and text-encoding detection shared by the file and search tools."""
+
+import codecs
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, Iterator
+
+# Bytes sampled from the start of a file to decide binary vs text
+SNIFF_BYTES = 8192
+
+# Byte-order marks, longest first so UTF-32 LE is not mistaken for UTF-16 LE
+BOMS = (
+    (codecs.BOM_UTF32_LE, "utf-32"),
+    (codecs.BOM_UTF32_BE, "utf-32"),
+    (codecs.BOM_UTF8, "utf-8-sig"),
+    (codecs.BOM_UTF16_LE, "utf-16"),
+    (codecs.BOM_UTF16_BE, "utf-16"),
+)
+
+# Magic numbers used to summarise binary files
+MAGIC_TYPES = (
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+    (b"RIFF", "application/riff"),
+    (b"%PDF-", "application/pdf"),
+    (b"PK\x03\x04", "application/zip"),
+    (b"\x1f\x8b", "application/gzip"),
+    (b"BZh", "application/x-bzip2"),
+    (b"\xfd7zXZ\x00", "application/x-xz"),
+    (b"7z\xbc\xaf\x27\x1c", "application/x-7z-compressed"),
+    (b"\x7fELF", "application/x-elf"),
+    (b"MZ", "application/x-msdownload"),
+    (b"\xca\xfe\xba\xbe", "application/java-vm"),
+    (b"\x00asm", "application/wasm"),
+    (b"SQLite format 3\x00", "application/x-sqlite3"),
+)
+
+# Legacy encodings tried, in order, when a sample is not valid UTF-8; one
+# is accepted only if the decoded text is plausible (see _plausible_cjk)
+FALLBACK_ENCODINGS = ("gb18030", "big5", "shift_jis", "euc-kr")
+
+# Unicode blocks of CJK text: general and CJK punctuation, kana, bopomofo,
+# Hangul, ideographs and full-width forms
+_CJK_BLOCKS = (
+    (0x2000, 0x206F), (0x3000, 0x30FF), (0x3100, 0x318F), (0x3400, 0x4DBF),
+    (0x4E00, 0x9FFF), (0xAC00, 0xD7AF), (0xF900, 0xFAFF), (0xFF00, 0xFFEF),
+)
+
+# Bytes that never appear in text files (everything below 0x20 except \t \n \f \r \x1b)
+_CONTROL_BYTES = bytes(set(range(32)) - {9, 10, 12, 13, 27}) + b"\x7f"
+
+
+class FileKind:
+    """Sniffing verdict for one version of a file."""
+
+    def __init__(self, is_binary: bool, encoding: Optional[str], file_type: str, size: int):
+        self.is_binary = is_binary
+        self.encoding = encoding
+        self.file_type = file_type
+        self.size = size
+
+    def summary(self) -> str:
+        """Short description used in place of binary contents."""
+        return f"[binary file: {self.file_type}, {self.size} bytes]"
+
+    def to_dict(self):
+        return {
+            "binary": self.is_binary,
+            "encoding": self.encoding,
+            "file_type": self.file_type,
+            "size": self.size
+        }
+
+
+def _decode_sample(sample: bytes, encoding: str) -> Optional[str]:
+    """A sample decoded, tolerating a character cut at the end, or None if it does not decode."""
+    try:
+        return codecs.getincrementaldecoder(encoding)().decode(sample, final=False)
+    except (UnicodeDecodeError, LookupError):
+        return None
+
+
+def _decodes(sample: bytes, encoding: str) -> bool:
+    """Whether a sample decodes cleanly, tolerating a character cut at the end."""
+    return _decode_sample(sample, encoding) is not None
+
+
+def _plausible_cjk(text: str) -> bool:
+    """
+    Whether text decoded with a CJK codec reads as CJK rather than mojibake.
+
+    Latin-1 text often decodes too: each accented letter swallows the
+    byte after it and becomes a lone ideograph inside an ASCII word. Real
+    CJK text keeps to the CJK blocks, its characters mostly side by side.
+    """
+    wide = [i for i, char in enumerate(text) if ord(char) > 0x7F]
+    if not wide:
+        return True
+    in_blocks = sum(1 for i in wide if any(low <= ord(text[i]) <= high for low, high in _CJK_BLOCKS))
+    if in_blocks < len(wide) * 0.95:
+        return False
+    positions = set(wide)
+    paired = sum(1 for i in wide if i - 1 in positions or i + 1 in positions)
+    return paired >= len(wide) / 2
+
+
+def _magic_type(sample: bytes) -> str:
+    """Guess the type of a binary file from its leading bytes."""
+    for magic, file_type in MAGIC_TYPES:
+        if sample.startswith(magic):
+            return file_type
+    return "application/octet-stream"
+
+
+def classify_sample(sample: bytes, size: int) -> FileKind:
+    """Classify the first bytes of a file as binary or text with an encoding."""
+    for bom, encoding in BOMS:
+        if sample.startswith(bom):
+            return FileKind(False, encoding, "text/plain", size)
+
+    if b"\x00" in sample:
+        return FileKind(True, None, _magic_type(sample), size)
+
+    if not sample or _decodes(sample, "utf-8"):
+        return FileKind(False, "utf-8", "text/plain", size)
+
+    # Known signatures or many control characters mean binary even if some
+    # legacy codec would accept the bytes
+    file_type = _magic_type(sample)
+    if file_type != "application/octet-stream" or \
+            len(sample.translate(None, _CONTROL_BYTES)) < len(sample) * 0.9:
+        return FileKind(True, None, file_type, size)
+
+    for encoding in FALLBACK_ENCODINGS:
+        text = _decode_sample(sample, encoding)
+        if text is not None and _plausible_cjk(text):
+            return FileKind(False, encoding, "text/plain", size)
+    return FileKind(False, "latin-1", "text/plain", size)
+
+
+_verdicts: "OrderedDict[Tuple[str, int, int], FileKind]" = OrderedDict()
+_verdict_lock = threading.Lock()
+MAX_CACHED_VERDICTS = 8192
+
+
+def line_indexable(encoding: Optional[str]) -> bool:
+    """Whether lines of text in `encoding` end with a single b"\\n" byte (not UTF-16/32)."""
+    return not (encoding or "").lower().startswith(("utf-16", "utf-32"))
+
+
+def sniff_file(path: str, st: Optional[os.stat_result] = None) -> FileKind:
+    """
+    Detect whether a file is binary and guess its text encoding.
+
+    Only the first SNIFF_BYTES are read. Verdicts are cached per
+    (path, mtime, size), so repeated searches over a tree sniff each file once.
+    """
+    st = st or os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _verdict_lock:
+        kind = _verdicts.get(key)
+        if kind is not None:
+            _verdicts.move_to_end(key)
+            return kind
+
+    with open(path, "rb") as f:
+        sample = f.read(SNIFF_BYTES)
+    kind = classify_sample(sample, st.st_size)
+
+    with _verdict_lock:
+        _verdicts[key] = kind
+        while len(_verdicts) > MAX_CACHED_VERDICTS:
+            _verdicts.popitem(last=False)
+    return kind
+
+
+def iter_decoded(path: str, encoding: str, errors: str = "strict",
+                 chunk_size: int = 1 << 20) -> Iterator[str]:
+    """Decode a file incrementally, yielding text chunks."""
+    decoder = codecs.getincrementaldecoder(encoding)(errors)
+    with open(path, "rb") as f:
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            text = decoder.decode(chunk)
+            if text:
+                yield text
+    tail = decoder.decode(b"", final=True)
+    if tail:
+        yield tail
+
+
+def read_text_file(path: str) -> Optional[str]:
+    """
+    The whole text of a file in its sniffed encoding, undecodable bytes replaced.
+
+    Returns:
+        The text, or None if the file is binary or cannot be read
+    """
+    try:
+        kind = sniff_file(path)
+        if kind.is_binary:
+            return None
+        return "".join(iter_decoded(path, kind.encoding, errors="replace"))
+    except OSError:
+        return None
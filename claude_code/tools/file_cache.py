@@ -0,0 +1,221 @@
+"""Process-wide cache of decoded file contents shared by tools and agents."""
+
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, List, Tuple, Dict
+from .encoding import FileKind, sniff_file, iter_decoded
+from ..indexing.watcher import get_change_bus
+
+# Default size of the shared cache; override with FILE_CACHE_MAX_BYTES
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+
+
+def _validator(st: os.stat_result) -> Tuple[int, int, int]:
+    """Identity of one version of a file."""
+    return (st.st_ino, st.st_mtime_ns, st.st_size)
+
+
+def _read_text(path: str, encoding: str) -> Tuple[str, Optional[str]]:
+    """
+    Decode a file incrementally the way text-mode ``open()`` would.
+
+    Returns:
+        Tuple of (text, decode error message or None). On a decode error the
+        text is decoded with replacement characters so callers can still use it.
+    """
+    try:
+        text = "".join(iter_decoded(path, encoding))
+        error = None
+    except UnicodeDecodeError as e:
+        text = "".join(iter_decoded(path, encoding, errors="replace"))
+        error = str(e)
+    return _universal_newlines(text), error
+
+
+def _universal_newlines(text: str) -> str:
+    """Translate \r\n and \r to \n, as in text mode."""
+    if "\r" in text:
+        text = text.replace("\r\n", "\n").replace("\r", "\n")
+    return text
+
+
+class CachedFile:
+    """Decoded contents of one version of a file."""
+
+    def __init__(self, path: str, validator: Tuple[int, int, int], text: str,
+                 kind: FileKind, decode_error: Optional[str] = None):
+        self.path = path
+        self.validator = validator
+        self.text = text
+        self.kind = kind
+        self.decode_error = decode_error
+        self._lines: Optional[List[str]] = None
+
+    @property
+    def is_binary(self) -> bool:
+        """Binary files are cached as a verdict only, with empty text."""
+        return self.kind.is_binary
+
+    @property
+    def encoding(self) -> Optional[str]:
+        return self.kind.encoding
+
+    @property
+    def lines(self) -> List[str]:
+        """Lines with their line endings, as returned by readlines()."""
+        if self._lines is None:
+            # Split on "\n" only; str.splitlines() also breaks on \f, \x1c, etc.
+            parts = self.text.split("\n")
+            lines = [part + "\n" for part in parts[:-1]]
+            if parts[-1]:
+                lines.append(parts[-1])
+            self._lines = lines
+        return self._lines
+
+    @property
+    def cost(self) -> int:
+        """Approximate memory charged to the cache (text plus line array)."""
+        return len(self.text) * 2 + 1
+
+
+class FileCache:
+    """
+    Byte-bounded LRU cache of decoded file contents and line arrays.
+
+    Entries are keyed by absolute path and validated against
+    (st_ino, st_mtime_ns, st_size) on every lookup, so a file changed by
+    any process is re-read. Writes made through FileTool update the cache
+    directly so the next read does not touch the disk.
+    """
+
+    def __init__(self, max_bytes: int = DEFAULT_MAX_BYTES):
+        """
+        Initialize the file cache.
+
+        Args:
+            max_bytes: Approximate upper bound for cached text, in characters
+        """
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, CachedFile]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def cacheable(self, size: int) -> bool:
+        """Whether a file of `size` bytes is small enough to be cached."""
+        # Decoded text has at most one character per byte
+        return size * 2 + 1 <= self.max_bytes // 4
+
+    def get(self, path: str) -> CachedFile:
+        """
+        Get the decoded contents of a file, reading it only if needed.
+
+        Files too large to cache (see cacheable()) are decoded for the
+        caller but never stored; callers that need only part of such a
+        file should read it through its line index instead.
+
+        Raises:
+            OSError: If the file cannot be stat'ed or read
+        """
+        key = os.path.abspath(path)
+        st = os.stat(key)
+        validator = _validator(st)
+        if not self.cacheable(st.st_size):
+            kind = sniff_file(key, st)
+            if kind.is_binary:
+                return CachedFile(key, validator, "", kind)
+            text, error = _read_text(key, kind.encoding)
+            return CachedFile(key, validator, text, kind, error)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.validator == validator:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+
+        kind = sniff_file(key, st)
+        if kind.is_binary:
+            entry = CachedFile(key, validator, "", kind)
+        else:
+            text, error = _read_text(key, kind.encoding)
+            entry = CachedFile(key, validator, text, kind, error)
+        # Only cache if no write raced with our read
+        if _validator(os.stat(key)) == validator:
+            self._store(entry)
+        return entry
+
+    def put(self, path: str, text: str) -> None:
+        """Record contents that were just written to `path`."""
+        key = os.path.abspath(path)
+        try:
+            st = os.stat(key)
+            kind = sniff_file(key, st)
+        except OSError:
+            self.invalidate(key)
+            return
+        self._store(CachedFile(key, _validator(st), _universal_newlines(text), kind))
+
+    def invalidate(self, path: Optional[str] = None) -> None:
+        """Drop one file, or everything when no path is given."""
+        with self._lock:
+            if path is None:
+                self._entries.clear()
+                self._size = 0
+                return
+            entry = self._entries.pop(os.path.abspath(path), None)
+            if entry is not None:
+                self._size -= entry.cost
+
+    def apply_changes(self, changes) -> None:
+        """Change-bus subscriber: drop entries for files reported as changed."""
+        for change in changes:
+            if not change.is_dir:
+                self.invalidate(change.path)
+            elif change.kind == "deleted":
+                prefix = change.path + os.sep
+                with self._lock:
+                    for key in [k for k in self._entries if k.startswith(prefix)]:
+                        self._size -= self._entries.pop(key).cost
+            # Other directory events need nothing: every lookup re-validates
+    
+    def _store(self, entry: CachedFile) -> None:
+        """Insert an entry and evict least recently used ones over budget."""
+        if entry.cost > self.max_bytes // 4:
+            return  # Too large to be worth evicting everything else for
+        with self._lock:
+            old = self._entries.pop(entry.path, None)
+            if old is not None:
+                self._size -= old.cost
+            self._entries[entry.path] = entry
+            self._size += entry.cost
+            while self._size > self.max_bytes and self._entries:
+                _, evicted = self._entries.popitem(last=False)
+                self._size -= evicted.cost
+
+    def stats(self) -> Dict[str, int]:
+        """Cache statistics."""
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "size": self._size,
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+
+_shared_cache: Optional[FileCache] = None
+_shared_lock = threading.Lock()
+
+
+def get_file_cache() -> FileCache:
+    """Get the process-wide file cache shared by all tools and agents."""
+    global _shared_cache
+    with _shared_lock:
+        if _shared_cache is None:
+            max_bytes = int(os.getenv("FILE_CACHE_MAX_BYTES", str(DEFAULT_MAX_BYTES)))
+            _shared_cache = FileCache(max_bytes=max_bytes)
+            get_change_bus().subscribe(_shared_cache.apply_changes)
+        return _shared_cache
@@ -1,47 +1,123 @@
 """File tool for reading, writing, and searching files."""
 
 import os
-from typing import Optional, List, Dict, Any
+import glob
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Tuple
 from .base import BaseTool, ToolResult
+from .line_index import get_line_index
+from .file_cache import FileCache, get_file_cache
+from .walker import ALWAYS_SKIP_DIRS, IgnoreStack, walk_tree
+from .encoding import line_indexable, sniff_file
+from ..indexing.paths import get_path_index
+from ..indexing.watcher import publish_changes
+from .patching import (
+    PatchConflict, atomic_write, make_diff, apply_edits, apply_hunks,
+    parse_search_replace_blocks, parse_unified_diff
+)
+
+
+# Upper bounds for the read_many action
+READ_MANY_MAX_FILES = 100
+READ_MANY_DEFAULT_BYTES = 200000
+READ_MANY_WORKERS = 8
+
+# Default page size for the tree action, and the number of walks kept
+# for paging through with a cursor
+TREE_PAGE_SIZE = 500
+TREE_CACHED_WALKS = 8
+
+# Default number of matches for the find action
+FIND_DEFAULT_LIMIT = 20
+
+# Sort keys accepted by the list and tree actions
+LIST_SORT_KEYS = {
+    "name": (lambda item: item.get("path", item.get("name")), False),
+    "size": (lambda item: item["size"], True),
+    "mtime": (lambda item: item["mtime"], True),
+    "type": (lambda item: (item["type"] != "directory", item.get("path", item.get("name"))), False),
+}
 
 
 class FileTool(BaseTool):
     """Tool for file operations (read, write, search)."""
     
-    def __init__(self):
+    def __init__(self, file_cache: Optional[FileCache] = None):
         super().__init__(
             name="file_tool",
             description="Read, write, and search files in the filesystem"
         )
+        self.file_cache = file_cache if file_cache is not None else get_file_cache()
+        # Tree walks by cursor token: (walk key, items, summary)
+        self._tree_walks: "OrderedDict[str, Tuple[Any, List[Dict[str, Any]], Dict[str, int]]]" = OrderedDict()
+        self._tree_lock = threading.Lock()
     
     def execute(self, action: str, file_path: str, content: Optional[str] = None, 
-                pattern: Optional[str] = None, limit: Optional[int] = None) -> ToolResult:
+                pattern: Optional[str] = None, limit: Optional[int] = None,
+                offset: Optional[int] = None, byte_offset: Optional[int] = None,
+                byte_limit: Optional[int] = None, tail: Optional[int] = None,
+                paths: Optional[List[Any]] = None, max_bytes: Optional[int] = None,
+                edits: Optional[List[Dict[str, Any]]] = None,
+                max_depth: Optional[int] = None, ignore: Optional[List[str]] = None,
+                sort_by: Optional[str] = None, cursor: Optional[str] = None,
+                page_size: Optional[int] = None) -> ToolResult:
         """
         Execute file operations.
         
         Args:
-            action: Operation to perform (read, write, search, list)
-            file_path: Path to the file or directory
-            content: Content to write (for write action)
-            pattern: Search pattern (for search action)
-            limit: Limit for search results or read lines
+            action: Operation to perform (read, read_many, write, edit, apply_patch, search, list, tree, find)
+            file_path: Path to the file or directory (base directory for read_many)
+            content: Content to write (for write action), SEARCH/REPLACE blocks
+                (for edit action) or a unified diff (for apply_patch action)
+            pattern: Search pattern (for search action) or fuzzy file name query (for find action)
+            limit: Limit for search results, read lines or find matches
+            offset: 0-based line to start reading from (for read action)
+            byte_offset: Byte position to start reading from (for read action)
+            byte_limit: Maximum number of bytes to read (for read action)
+            tail: Read only the last N lines (for read action)
+            paths: File paths or glob patterns, or {"path", "offset", "limit"}
+                objects with their own line range (for read_many action)
+            max_bytes: Total byte budget across all files, in UTF-8 (for read_many action)
+            edits: List of {"old", "new", "replace_all"} replacements (for edit action)
+            max_depth: Maximum recursion depth (for tree action)
+            ignore: Extra gitignore-style patterns to skip (for list and tree actions)
+            sort_by: Sort key: name, size, mtime or type (for list and tree actions)
+            cursor: Cursor returned by a previous page (for list and tree actions)
+            page_size: Maximum number of entries per page (for list and tree actions)
             
         Returns:
             ToolResult with operation results
         """
         try:
             if action == "read":
-                return self._read_file(file_path, limit)
+                if offset is not None or limit is not None or byte_offset is not None or \
+                        byte_limit is not None or tail is not None:
+                    return self._read_range(file_path, offset, limit, byte_offset, byte_limit, tail)
+                return self._read_file(file_path)
+            elif action == "read_many":
+                return self._read_many(file_path, paths or [], limit, max_bytes)
             elif action == "write":
                 return self._write_file(file_path, content or "")
+            elif action == "edit":
+                return self._edit_file(file_path, edits, content)
+            elif action == "apply_patch":
+                return self._apply_patch(file_path, content or "")
             elif action == "search":
                 return self._search_in_file(file_path, pattern or "", limit)
             elif action == "list":
-                return self._list_directory(file_path)
+                return self._list_directory(file_path, ignore, sort_by, cursor, page_size)
+            elif action == "tree":
+                return self._tree(file_path, max_depth, ignore, sort_by, cursor, page_size)
+            elif action == "find":
+                return self._find_files(file_path, pattern or "", limit)
             else:
                 return ToolResult(
                     success=False,
-                    error=f"Unknown action: {action}. Supported: read, write, search, list"
+                    error=f"Unknown action: {action}. Supported: read, read_many, write, edit, apply_patch, search, list, tree, find"
                 )
         except Exception as e:
             return ToolResult(
@@ -49,8 +125,8 @@ class FileTool(BaseTool):
                 error=f"File operation failed: {str(e)}"
             )
     
-    def _read_file(self, file_path: str, limit: Optional[int] = None) -> ToolResult:
-        """Read a file."""
+    def _read_file(self, file_path: str) -> ToolResult:
+        """Read a whole file (ranged reads go through _read_range)."""
         if not os.path.exists(file_path):
             return ToolResult(success=False, error=f"File not found: {file_path}")
         
@@ -58,24 +134,25 @@ class FileTool(BaseTool):
             return ToolResult(success=False, error=f"Not a file: {file_path}")
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                if limit:
-                    lines = []
-                    for i, line in enumerate(f):
-                        if i >= limit:
-                            break
-                        lines.append(line)
-                    content = ''.join(lines)
-                else:
-                    content = f.read()
+            cached = self.file_cache.get(file_path)
+            if cached.is_binary:
+                return self._binary_summary(file_path, cached.kind, "read")
+            content = cached.text
+            
+            data = {
+                "content": content,
+                "file_path": file_path,
+                "size": len(content)
+            }
+            if cached.encoding != "utf-8":
+                data["encoding"] = cached.encoding
+            if cached.decode_error:
+                # Undecodable bytes were replaced with U+FFFD
+                data["decode_error"] = cached.decode_error
             
             return ToolResult(
                 success=True,
-                data={
-                    "content": content,
-                    "file_path": file_path,
-                    "size": len(content)
-                },
+                data=data,
                 metadata={
                     "file_path": file_path,
                     "action": "read"
@@ -84,14 +161,240 @@ class FileTool(BaseTool):
         except Exception as e:
             return ToolResult(success=False, error=f"Failed to read file: {str(e)}")
     
+    def _read_range(self, file_path: str, offset: Optional[int], limit: Optional[int],
+                    byte_offset: Optional[int], byte_limit: Optional[int],
+                    tail: Optional[int]) -> ToolResult:
+        """Read a line range, byte range or tail of a file via its mmap line index."""
+        if not os.path.exists(file_path):
+            return ToolResult(success=False, error=f"File not found: {file_path}")
+        
+        if not os.path.isfile(file_path):
+            return ToolResult(success=False, error=f"Not a file: {file_path}")
+        
+        try:
+            kind = sniff_file(file_path)
+            if kind.is_binary:
+                return self._binary_summary(file_path, kind, "read")
+            if byte_offset is None and byte_limit is None and not line_indexable(kind.encoding):
+                return self._read_decoded_range(file_path, offset, limit, tail)
+            index = get_line_index(file_path)
+            data = {"file_path": file_path, "file_size": index.size}
+            if kind.encoding != "utf-8":
+                data["encoding"] = kind.encoding
+            
+            if byte_offset is not None or byte_limit is not None:
+                start = byte_offset or 0
+                raw = index.read_bytes(start, byte_limit)
+                mode = "bytes"
+                data["byte_range"] = [start, start + len(raw)]
+            elif tail is not None:
+                raw, count = index.read_tail(tail)
+                mode = "tail"
+                data["lines_returned"] = count
+            else:
+                start = offset or 0
+                raw, count = index.read_lines(start, limit)
+                mode = "lines"
+                data["start_line"] = start
+                data["lines_returned"] = count
+            
+            content = raw.decode(kind.encoding, errors="replace")
+            data["content"] = content
+            data["size"] = len(content)
+            
+            return ToolResult(
+                success=True,
+                data=data,
+                metadata={
+                    "file_path": file_path,
+                    "action": "read",
+                    "mode": mode
+                }
+            )
+        except Exception as e:
+            return ToolResult(success=False, error=f"Failed to read file: {str(e)}")
+    
+    def _read_decoded_range(self, file_path: str, offset: Optional[int], limit: Optional[int],
+                            tail: Optional[int]) -> ToolResult:
+        """Line range or tail of a file whose newlines are not single bytes (UTF-16/32)."""
+        cached = self.file_cache.get(file_path)
+        lines = cached.lines
+        if tail is not None:
+            selected = lines[max(0, len(lines) - tail):] if tail > 0 else []
+            data = {"mode": "tail"}
+        else:
+            start = offset or 0
+            selected = lines[start:None if limit is None else start + limit]
+            data = {"mode": "lines", "start_line": start}
+        content = ''.join(selected)
+        mode = data.pop("mode")
+        data.update({
+            "file_path": file_path,
+            "file_size": cached.kind.size,
+            "encoding": cached.encoding,
+            "lines_returned": len(selected),
+            "content": content,
+            "size": len(content)
+        })
+        return ToolResult(
+            success=True,
+            data=data,
+            metadata={
+                "file_path": file_path,
+                "action": "read",
+                "mode": mode
+            }
+        )
+    
+    def _binary_summary(self, file_path: str, kind, action: str) -> ToolResult:
+        """Describe a binary file instead of returning undecodable contents."""
+        return ToolResult(
+            success=True,
+            data={
+                "content": kind.summary(),
+                "file_path": file_path,
+                "binary": True,
+                "file_type": kind.file_type,
+                "file_size": kind.size
+            },
+            metadata={
+                "file_path": file_path,
+                "action": action
+            }
+        )
+    
+    def _read_text_for_edit(self, file_path: str) -> Any:
+        """Read a file exactly (no newline translation) in its detected encoding."""
+        kind = sniff_file(file_path)
+        if kind.is_binary:
+            raise ValueError(f"Cannot edit binary file: {file_path} ({kind.file_type})")
+        with open(file_path, 'r', encoding=kind.encoding, newline='') as f:
+            return f.read(), kind.encoding
+    
+    def _read_many(self, base_dir: str, patterns: List[Any], limit: Optional[int] = None,
+                   max_bytes: Optional[int] = None) -> ToolResult:
+        """
+        Read several files (paths or globs) concurrently into one result.
+        
+        Each entry of `patterns` is a path or glob, or a {"path", "offset",
+        "limit"} object reading only those lines of its files; `limit` is
+        the line limit of entries without their own. `max_bytes` caps the
+        UTF-8 size of all contents together, filled in request order.
+        """
+        if not patterns:
+            return ToolResult(success=False, error="No paths given for read_many")
+        
+        base_dir = base_dir or "."
+        budget = max_bytes or READ_MANY_DEFAULT_BYTES
+        
+        # Expand globs, preserving the requested order and dropping duplicates
+        file_paths: List[Tuple[str, Optional[int], Optional[int]]] = []
+        seen = set()
+        missing = []
+        for entry in patterns:
+            if isinstance(entry, dict):
+                pattern = entry.get("path") or ""
+                line_offset, line_limit = entry.get("offset"), entry.get("limit", limit)
+            else:
+                pattern, line_offset, line_limit = entry, None, limit
+            full_pattern = pattern if os.path.isabs(pattern) else os.path.join(base_dir, pattern)
+            if glob.has_magic(pattern):
+                matches = sorted(glob.glob(full_pattern, recursive=True))
+            elif os.path.isfile(full_pattern):
+                matches = [full_pattern]
+            else:
+                missing.append(pattern)
+                continue
+            for match in matches:
+                if os.path.isfile(match) and match not in seen:
+                    seen.add(match)
+                    file_paths.append((match, line_offset, line_limit))
+        
+        skipped = [path for path, _, _ in file_paths[READ_MANY_MAX_FILES:]]
+        file_paths = file_paths[:READ_MANY_MAX_FILES]
+        
+        def read_one(path: str, line_offset: Optional[int], line_limit: Optional[int]) -> Dict[str, Any]:
+            try:
+                size = os.path.getsize(path)
+                kind = sniff_file(path)
+                if kind.is_binary:
+                    return {"path": path, "content": kind.summary(), "size": size, "truncated": False}
+                if line_offset or line_limit:
+                    start = max(0, line_offset or 0)
+                    if not line_indexable(kind.encoding):
+                        # Newlines are not single bytes (UTF-16/32): slice the decoded lines
+                        lines = self.file_cache.get(path).lines
+                        end = len(lines) if not line_limit else start + line_limit
+                        text = ''.join(lines[start:end])
+                        return {"path": path, "content": text, "size": size,
+                                "truncated": start > 0 or end < len(lines)}
+                    raw, _ = get_line_index(path).read_lines(start, line_limit or None)
+                    truncated = start > 0 or len(raw) < size or len(raw) > budget
+                    text = raw[:budget].decode(kind.encoding, errors='replace')
+                elif size <= budget:
+                    text = self.file_cache.get(path).text
+                    truncated = False
+                else:
+                    with open(path, 'rb') as f:
+                        text = f.read(budget).decode(kind.encoding, errors='replace')
+                    truncated = True
+                return {"path": path, "content": text, "size": size, "truncated": truncated}
+            except Exception as e:
+                return {"path": path, "error": str(e)}
+        
+        with ThreadPoolExecutor(max_workers=min(READ_MANY_WORKERS, max(1, len(file_paths)))) as executor:
+            results = list(executor.map(lambda request: read_one(*request), file_paths))
+        
+        # Apply the total byte budget (of UTF-8 text) in request order
+        files = []
+        errors = [{"path": p, "error": "File not found"} for p in missing]
+        used = 0
+        for result in results:
+            if "error" in result:
+                errors.append(result)
+                continue
+            remaining = budget - used
+            if remaining <= 0:
+                skipped.append(result["path"])
+                continue
+            content = result["content"]
+            encoded = content.encode("utf-8")
+            if len(encoded) > remaining:
+                # Cut at a byte boundary, dropping a character split by it
+                encoded = encoded[:remaining]
+                content = encoded.decode("utf-8", errors="ignore")
+                result["truncated"] = True
+            used += len(encoded)
+            files.append({
+                "path": result["path"],
+                "content": content,
+                "truncated": result["truncated"]
+            })
+        
+        return ToolResult(
+            success=bool(files) or not errors,
+            data={
+                "files": files,
+                "errors": errors,
+                "skipped": skipped,
+                "total_files": len(files),
+                "total_size": used
+            },
+            error="; ".join(f"{e['path']}: {e['error']}" for e in errors) if not files and errors else None,
+            metadata={
+                "base_dir": base_dir,
+                "action": "read_many",
+                "budget": budget
+            }
+        )
+    
     def _write_file(self, file_path: str, content: str) -> ToolResult:
         """Write content to a file."""
         try:
-            # Create directory if it doesn't exist
-            os.makedirs(os.path.dirname(file_path) or '.', exist_ok=True)
-            
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
+            # Write via temp file + rename so readers never see a partial file
+            atomic_write(file_path, content)
+            self.file_cache.put(file_path, content)
+            publish_changes([file_path])
             
             return ToolResult(
                 success=True,
@@ -108,14 +411,127 @@ class FileTool(BaseTool):
         except Exception as e:
             return ToolResult(success=False, error=f"Failed to write file: {str(e)}")
     
+    def _edit_file(self, file_path: str, edits: Optional[List[Dict[str, Any]]],
+                   blocks: Optional[str] = None) -> ToolResult:
+        """Apply search/replace edits to a file and return only the changed hunks."""
+        if not os.path.isfile(file_path):
+            return ToolResult(success=False, error=f"File not found: {file_path}")
+        
+        edits = list(edits or []) + (parse_search_replace_blocks(blocks) if blocks else [])
+        if not edits:
+            return ToolResult(success=False, error="No edits given (use edits or SEARCH/REPLACE blocks in content)")
+        
+        try:
+            original, encoding = self._read_text_for_edit(file_path)
+            
+            updated, replacements = apply_edits(original, edits)
+            atomic_write(file_path, updated, encoding)
+            self.file_cache.put(file_path, updated)
+            publish_changes([file_path])
+            
+            return ToolResult(
+                success=True,
+                data={
+                    "file_path": file_path,
+                    "diff": make_diff(original, updated, file_path),
+                    "replacements": replacements,
+                    "message": f"Applied {len(edits)} edit(s) to {file_path}"
+                },
+                metadata={
+                    "file_path": file_path,
+                    "action": "edit"
+                }
+            )
+        except PatchConflict as e:
+            return ToolResult(success=False, error=f"Edit conflict: {str(e)}")
+        except Exception as e:
+            return ToolResult(success=False, error=f"Failed to edit file: {str(e)}")
+    
+    def _apply_patch(self, file_path: str, patch: str) -> ToolResult:
+        """
+        Apply a unified diff.
+        
+        If file_path is a file, every hunk applies to it; if it is a directory,
+        the paths in the diff headers are resolved against it. Patches to
+        the same file apply in turn, each to the result of the last. All
+        files are checked for conflicts before any of them is written.
+        """
+        file_patches = parse_unified_diff(patch)
+        if not file_patches:
+            return ToolResult(success=False, error="No hunks found in patch")
+        
+        try:
+            # Resolve targets and compute new contents without touching disk;
+            # keyed by real path so patches to one file build on each other
+            pending: Dict[str, Tuple[str, str, Optional[str], str]] = {}
+            for file_patch in file_patches:
+                if os.path.isfile(file_path):
+                    target = file_path
+                elif file_patch.path:
+                    target = os.path.join(file_path or '.', file_patch.path)
+                else:
+                    return ToolResult(success=False, error="Patch has no file headers; pass the target file as file_path")
+                
+                key = os.path.realpath(target)
+                if key in pending:
+                    target, original, current, encoding = pending[key]
+                    if current is None and not file_patch.is_new_file:
+                        raise PatchConflict(f"{file_patch.path}: patched after the diff deletes it")
+                    current = current or ""
+                elif file_patch.is_new_file and not os.path.exists(target):
+                    original, encoding = "", "utf-8"
+                    current = original
+                elif os.path.isfile(target):
+                    original, encoding = self._read_text_for_edit(target)
+                    current = original
+                else:
+                    return ToolResult(success=False, error=f"File not found: {target}")
+                
+                updated = None if file_patch.is_deletion else apply_hunks(current, file_patch)
+                pending[key] = (target, original, updated, encoding)
+            changes = list(pending.values())
+            
+            diffs = []
+            for target, original, updated, encoding in changes:
+                if updated is None:
+                    os.remove(target)
+                    self.file_cache.invalidate(target)
+                    diffs.append(make_diff(original, "", target))
+                else:
+                    atomic_write(target, updated, encoding)
+                    self.file_cache.put(target, updated)
+                    diffs.append(make_diff(original, updated, target))
+            publish_changes([target for target, _, updated, _ in changes if updated is not None])
+            publish_changes([target for target, _, updated, _ in changes if updated is None], "deleted")
+            
+            return ToolResult(
+                success=True,
+                data={
+                    "files": [change[0] for change in changes],
+                    "diff": "".join(diffs),
+                    "hunks": sum(len(p.hunks) for p in file_patches),
+                    "message": f"Applied patch to {len(changes)} file(s)"
+                },
+                metadata={
+                    "file_path": file_path,
+                    "action": "apply_patch"
+                }
+            )
+        except PatchConflict as e:
+            return ToolResult(success=False, error=f"Patch conflict: {str(e)}")
+        except Exception as e:
+            return ToolResult(success=False, error=f"Failed to apply patch: {str(e)}")
+    
     def _search_in_file(self, file_path: str, pattern: str, limit: Optional[int] = None) -> ToolResult:
         """Search for pattern in a file."""
         if not os.path.exists(file_path):
             return ToolResult(success=False, error=f"File not found: {file_path}")
         
         try:
-            with open(file_path, 'r', encoding='utf-8') as f:
-                lines = f.readlines()
+            cached = self.file_cache.get(file_path)
+            if cached.is_binary:
+                return ToolResult(success=False, error=f"Cannot search binary file: {cached.kind.summary()}")
+            lines = cached.lines
             
             matches = []
             for i, line in enumerate(lines):
@@ -145,7 +561,9 @@ class FileTool(BaseTool):
         except Exception as e:
             return ToolResult(success=False, error=f"Failed to search file: {str(e)}")
     
-    def _list_directory(self, dir_path: str) -> ToolResult:
+    def _list_directory(self, dir_path: str, ignore: Optional[List[str]] = None,
+                        sort_by: Optional[str] = None, cursor: Optional[str] = None,
+                        page_size: Optional[int] = None) -> ToolResult:
         """List directory contents."""
         if not os.path.exists(dir_path):
             return ToolResult(success=False, error=f"Directory not found: {dir_path}")
@@ -154,21 +572,36 @@ class FileTool(BaseTool):
             return ToolResult(success=False, error=f"Not a directory: {dir_path}")
         
         try:
+            # Same rules as the top level of a tree walk
+            ignores = IgnoreStack(ignore)
+            ignores.push_dir(dir_path, "")
             items = []
-            for item in os.listdir(dir_path):
-                full_path = os.path.join(dir_path, item)
-                items.append({
-                    "name": item,
-                    "type": "directory" if os.path.isdir(full_path) else "file",
-                    "size": os.path.getsize(full_path) if os.path.isfile(full_path) else 0
-                })
+            with os.scandir(dir_path) as entries:
+                for entry in entries:
+                    # DirEntry reuses the type from the listing and caches its stat
+                    is_dir = entry.is_dir()
+                    if is_dir and entry.name in ALWAYS_SKIP_DIRS:
+                        continue
+                    if ignores.is_ignored(entry.name, is_dir):
+                        continue
+                    item = {
+                        "name": entry.name,
+                        "type": "directory" if is_dir else "file",
+                        "size": entry.stat().st_size if entry.is_file() else 0
+                    }
+                    if sort_by == "mtime":
+                        item["mtime"] = entry.stat().st_mtime
+                    items.append(item)
+            
+            page, next_cursor = self._paginate(items, sort_by, cursor, page_size)
             
             return ToolResult(
                 success=True,
                 data={
                     "directory": dir_path,
-                    "items": items,
-                    "total_items": len(items)
+                    "items": page,
+                    "total_items": len(items),
+                    "next_cursor": next_cursor
                 },
                 metadata={
                     "directory": dir_path,
@@ -178,6 +611,149 @@ class FileTool(BaseTool):
         except Exception as e:
             return ToolResult(success=False, error=f"Failed to list directory: {str(e)}")
     
+    def _tree(self, dir_path: str, max_depth: Optional[int] = None, ignore: Optional[List[str]] = None,
+              sort_by: Optional[str] = None, cursor: Optional[str] = None,
+              page_size: Optional[int] = None) -> ToolResult:
+        """
+        Recursively list a directory, honouring .gitignore, with directory sizes.
+        
+        Directory sizes (and the total size) include files below
+        `max_depth`. The walk is kept for the cursor it returns, so later
+        pages neither walk the tree again nor shift if it changes meanwhile.
+        """
+        if not os.path.exists(dir_path):
+            return ToolResult(success=False, error=f"Directory not found: {dir_path}")
+        
+        if not os.path.isdir(dir_path):
+            return ToolResult(success=False, error=f"Not a directory: {dir_path}")
+        
+        try:
+            key = (os.path.abspath(dir_path), max_depth, tuple(ignore or ()), sort_by)
+            token, _, offset = (cursor or "").rpartition(":")
+            with self._tree_lock:
+                cached = self._tree_walks.get(token) if token else None
+            if cached is not None and cached[0] == key:
+                items, summary = cached[1], cached[2]
+            else:
+                token = None
+                items, summary = self._walk_tree(dir_path, max_depth, ignore, sort_by)
+            
+            page, next_offset = self._paginate(items, sort_by, offset or None, page_size or TREE_PAGE_SIZE)
+            next_cursor = None
+            with self._tree_lock:
+                if next_offset is None:
+                    if token:
+                        self._tree_walks.pop(token, None)
+                else:
+                    if not token:
+                        token = uuid.uuid4().hex[:12]
+                        self._tree_walks[token] = (key, items, summary)
+                        while len(self._tree_walks) > TREE_CACHED_WALKS:
+                            self._tree_walks.popitem(last=False)
+                    next_cursor = f"{token}:{next_offset}"
+            
+            return ToolResult(
+                success=True,
+                data={
+                    "directory": dir_path,
+                    "items": page,
+                    "total_items": len(items),
+                    "next_cursor": next_cursor,
+                    "summary": summary
+                },
+                metadata={
+                    "directory": dir_path,
+                    "action": "tree",
+                    "max_depth": max_depth
+                }
+            )
+        except Exception as e:
+            return ToolResult(success=False, error=f"Failed to list directory tree: {str(e)}")
+    
+    def _walk_tree(self, dir_path: str, max_depth: Optional[int], ignore: Optional[List[str]],
+                   sort_by: Optional[str]) -> Tuple[List[Dict[str, Any]], Dict[str, int]]:
+        """Items down to `max_depth`, with sizes aggregated over the whole tree."""
+        items = []
+        dir_items = {}
+        total_files = 0
+        total_size = 0
+        for rel_path, entry, depth in walk_tree(dir_path, ignore_patterns=ignore):
+            is_dir = entry.is_dir(follow_symlinks=False)
+            size = 0 if is_dir else entry.stat(follow_symlinks=False).st_size
+            if max_depth is None or depth <= max_depth:
+                item = {
+                    "path": rel_path,
+                    "type": "directory" if is_dir else "file",
+                    "size": size,
+                    "depth": depth
+                }
+                if sort_by == "mtime":
+                    item["mtime"] = entry.stat(follow_symlinks=False).st_mtime
+                items.append(item)
+                if is_dir:
+                    dir_items[rel_path] = item
+                else:
+                    total_files += 1
+            if not is_dir:
+                total_size += size
+                # Aggregate the file size into every listed ancestor directory
+                parent = rel_path.rpartition("/")[0]
+                while parent:
+                    if parent in dir_items:
+                        dir_items[parent]["size"] += size
+                    parent = parent.rpartition("/")[0]
+        summary = {
+            "files": total_files,
+            "directories": len(dir_items),
+            "total_size": total_size
+        }
+        return items, summary
+    
+    def _find_files(self, dir_path: str, query: str, limit: Optional[int] = None) -> ToolResult:
+        """Fuzzy-find files by path under a directory, best matches first."""
+        if not os.path.isdir(dir_path):
+            return ToolResult(success=False, error=f"Directory not found: {dir_path}")
+        if not query.strip():
+            return ToolResult(success=False, error="pattern must not be empty (for find action)")
+        
+        try:
+            started = time.perf_counter()
+            index = get_path_index(dir_path)
+            index.watch()
+            matches, total = index.find(query, limit or FIND_DEFAULT_LIMIT)
+            return ToolResult(
+                success=True,
+                data={
+                    "directory": dir_path,
+                    "query": query,
+                    "matches": matches,
+                    "total_matches": total,
+                    "indexed_files": len(index)
+                },
+                metadata={
+                    "directory": dir_path,
+                    "action": "find",
+                    "milliseconds": round((time.perf_counter() - started) * 1000, 2)
+                }
+            )
+        except Exception as e:
+            return ToolResult(success=False, error=f"Failed to find files: {str(e)}")
+    
+    def _paginate(self, items: List[Dict[str, Any]], sort_by: Optional[str], cursor: Optional[str],
+                  page_size: Optional[int]) -> Any:
+        """Sort items and cut out one page; the cursor is the offset of the next page."""
+        if sort_by:
+            if sort_by not in LIST_SORT_KEYS:
+                raise ValueError(f"Unknown sort key: {sort_by}. Supported: {', '.join(LIST_SORT_KEYS)}")
+            key, reverse = LIST_SORT_KEYS[sort_by]
+            items.sort(key=key, reverse=reverse)
+        
+        start = int(cursor) if cursor else 0
+        if not page_size:
+            return items[start:], None
+        end = start + page_size
+        return items[start:end], (str(end) if end < len(items) else None)
+    
     def get_parameters_schema(self) -> Dict[str, Any]:
         """Get the parameters schema."""
         return {
@@ -186,26 +762,112 @@ class FileTool(BaseTool):
                 "action": {
                     "type": "string",
                     "description": "File operation to perform",
-                    "enum": ["read", "write", "search", "list"]
+                    "enum": ["read", "read_many", "write", "edit", "apply_patch", "search", "list", "tree", "find"]
                 },
                 "file_path": {
                     "type": "string",
-                    "description": "Path to the file or directory"
+                    "description": "Path to the file or directory (base directory for read_many)"
                 },
                 "content": {
                     "type": "string",
-                    "description": "Content to write (for write action)",
+                    "description": "Content to write (for write action), SEARCH/REPLACE blocks (for edit action) or a unified diff (for apply_patch action)",
                     "default": None
                 },
                 "pattern": {
                     "type": "string",
-                    "description": "Search pattern (for search action)",
+                    "description": "Search pattern (for search action) or fuzzy file name query such as 'srch tl' (for find action)",
                     "default": None
                 },
                 "limit": {
                     "type": "integer",
                     "description": "Limit for results or lines",
                     "default": None
+                },
+                "offset": {
+                    "type": "integer",
+                    "description": "0-based line number to start reading from (for read action)",
+                    "default": None
+                },
+                "byte_offset": {
+                    "type": "integer",
+                    "description": "Byte position to start reading from (for read action)",
+                    "default": None
+                },
+                "byte_limit": {
+                    "type": "integer",
+                    "description": "Maximum number of bytes to read (for read action)",
+                    "default": None
+                },
+                "tail": {
+                    "type": "integer",
+                    "description": "Read only the last N lines of the file (for read action)",
+                    "default": None
+                },
+                "paths": {
+                    "type": "array",
+                    "items": {
+                        "anyOf": [
+                            {"type": "string"},
+                            {
+                                "type": "object",
+                                "properties": {
+                                    "path": {"type": "string"},
+                                    "offset": {"type": "integer"},
+                                    "limit": {"type": "integer"}
+                                },
+                                "required": ["path"]
+                            }
+                        ]
+                    },
+                    "description": "File paths or glob patterns such as 'src/**/*.py', or {path, offset, limit} "
+                                   "objects to read only those lines (for read_many action)",
+                    "default": None
+                },
+                "max_bytes": {
+                    "type": "integer",
+                    "description": "Total byte budget across all files, counted in UTF-8 (for read_many action)",
+                    "default": None
+                },
+                "edits": {
+                    "type": "array",
+                    "items": {
+                        "type": "object",
+                        "properties": {
+                            "old": {"type": "string"},
+                            "new": {"type": "string"},
+                            "replace_all": {"type": "boolean"}
+                        },
+                        "required": ["old", "new"]
+                    },
+                    "description": "Exact text replacements; each old string must match uniquely unless replace_all (for edit action)",
+                    "default": None
+                },
+                "max_depth": {
+                    "type": "integer",
+                    "description": "Maximum recursion depth (for tree action)",
+                    "default": None
+                },
+                "ignore": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Extra gitignore-style patterns to skip (for list and tree actions)",
+                    "default": None
+                },
+                "sort_by": {
+                    "type": "string",
+                    "description": "Sort entries by name, size, mtime or type (for list and tree actions)",
+                    "enum": ["name", "size", "mtime", "type"],
+                    "default": None
+                },
+                "cursor": {
+                    "type": "string",
+                    "description": "next_cursor from a previous page (for list and tree actions)",
+                    "default": None
+                },
+                "page_size": {
+                    "type": "integer",
+                    "description": "Maximum entries per page (for list and tree actions)",
+                    "default": None
                 }
             },
             "required": ["action", "file_path"]
@@ -0,0 +1,180 @@
+"""Memory-mapped ranged reads backed by a sparse newline-offset index."""
+
+import mmap
+import os
+import threading
+from collections import OrderedDict
+from typing import Optional, Tuple, List
+
+# One checkpoint is recorded every CHECKPOINT_INTERVAL lines
+CHECKPOINT_INTERVAL = 1024
+
+# Bytes counted per step while extending the index; only blocks containing a
+# checkpoint are walked newline by newline
+SCAN_BLOCK = 16384
+
+
+class LineIndex:
+    """
+    Lazily built index of line start offsets for one version of a file.
+
+    Only every CHECKPOINT_INTERVAL-th line offset is stored, so the index of a
+    multi-GB log stays small. Newlines are counted block by block with
+    ``bytes.count`` and the index is only extended as far as a request needs.
+    Reading lines N..N+k then costs one checkpoint lookup plus a scan of at
+    most CHECKPOINT_INTERVAL lines and the requested bytes.
+    """
+
+    def __init__(self, path: str, size: int):
+        self.path = path
+        self.size = size
+        self._checkpoints: List[int] = [0]
+        self._scan_pos = 0
+        self._newlines_scanned = 0
+        self._complete = size == 0
+        self._lock = threading.Lock()
+
+    def _open(self) -> Optional[mmap.mmap]:
+        """Map the file read-only (None for empty files)."""
+        if self.size == 0:
+            return None
+        with open(self.path, "rb") as f:
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def _extend(self, mm: mmap.mmap, line: Optional[int]) -> None:
+        """Extend the index until `line` has a checkpoint (or to EOF if None)."""
+        while not self._complete:
+            if line is not None and line // CHECKPOINT_INTERVAL < len(self._checkpoints):
+                return
+            block_end = min(self._scan_pos + SCAN_BLOCK, self.size)
+            block = mm[self._scan_pos:block_end]
+            count = block.count(b"\n")
+            # Line `target` starts right after the target-th newline
+            target = len(self._checkpoints) * CHECKPOINT_INTERVAL
+            pos, seen = 0, self._newlines_scanned
+            while self._newlines_scanned + count >= target:
+                while seen < target:
+                    pos = block.find(b"\n", pos) + 1
+                    seen += 1
+                self._checkpoints.append(self._scan_pos + pos)
+                target += CHECKPOINT_INTERVAL
+            self._newlines_scanned += count
+            self._scan_pos = block_end
+            if block_end >= self.size:
+                self._complete = True
+
+    def total_lines(self) -> int:
+        """Number of lines in the file (forces a full index build)."""
+        with self._lock:
+            mm = self._open()
+            if mm is None:
+                return 0
+            try:
+                self._extend(mm, None)
+                last_is_newline = mm[self.size - 1:self.size] == b"\n"
+            finally:
+                mm.close()
+        return self._newlines_scanned + (0 if last_is_newline else 1)
+
+    def _line_offset(self, mm: mmap.mmap, line: int) -> int:
+        """Byte offset at which `line` (0-based) starts, or size if past EOF."""
+        self._extend(mm, line)
+        checkpoint = min(line // CHECKPOINT_INTERVAL, len(self._checkpoints) - 1)
+        pos = self._checkpoints[checkpoint]
+        for _ in range(line - checkpoint * CHECKPOINT_INTERVAL):
+            found = mm.find(b"\n", pos)
+            if found < 0:
+                return self.size
+            pos = found + 1
+        return pos
+
+    def read_lines(self, offset: int, limit: Optional[int]) -> Tuple[bytes, int]:
+        """
+        Read `limit` lines starting at 0-based line `offset`.
+
+        Returns:
+            Tuple of (raw bytes, number of lines returned)
+        """
+        with self._lock:
+            mm = self._open()
+            if mm is None:
+                return b"", 0
+            try:
+                start = self._line_offset(mm, offset)
+                if limit is None:
+                    end = self.size
+                else:
+                    end = start
+                    for _ in range(limit):
+                        found = mm.find(b"\n", end)
+                        if found < 0:
+                            end = self.size
+                            break
+                        end = found + 1
+                data = mm[start:end]
+            finally:
+                mm.close()
+        lines = data.count(b"\n") + (1 if data and not data.endswith(b"\n") else 0)
+        return data, lines
+
+    def read_tail(self, count: int) -> Tuple[bytes, int]:
+        """
+        Read the last `count` lines by scanning backwards from EOF.
+
+        Returns:
+            Tuple of (raw bytes, number of lines returned)
+        """
+        if count <= 0:
+            return b"", 0
+        mm = self._open()
+        if mm is None:
+            return b"", 0
+        try:
+            end = self.size
+            # A trailing newline terminates the last line rather than starting a new one
+            pos = end - 1 if mm[end - 1:end] == b"\n" else end
+            start = 0
+            found = 0
+            while found < count:
+                newline = mm.rfind(b"\n", 0, pos)
+                found += 1
+                if newline < 0:
+                    start = 0
+                    break
+                start = newline + 1
+                pos = newline
+            return mm[start:end], found
+        finally:
+            mm.close()
+
+    def read_bytes(self, offset: int, length: Optional[int]) -> bytes:
+        """Read a raw byte range."""
+        mm = self._open()
+        if mm is None:
+            return b""
+        try:
+            end = self.size if length is None else min(self.size, offset + length)
+            return mm[offset:end]
+        finally:
+            mm.close()
+
+
+_index_cache: "OrderedDict[Tuple[str, int, int], LineIndex]" = OrderedDict()
+_index_lock = threading.Lock()
+MAX_CACHED_INDEXES = 64
+
+
+def get_line_index(path: str) -> LineIndex:
+    """Get the cached line index for the current (path, mtime, size) of a file."""
+    st = os.stat(path)
+    key = (os.path.abspath(path), st.st_mtime_ns, st.st_size)
+    with _index_lock:
+        index = _index_cache.get(key)
+        if index is None:
+            index = LineIndex(path, st.st_size)
+            _index_cache[key] = index
+            while len(_index_cache) > MAX_CACHED_INDEXES:
+                _index_cache.popitem(last=False)
+        else:
+            _index_cache.move_to_end(key)
+        return index
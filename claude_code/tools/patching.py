@@ -0,0 +1,252 @@
+"""Search/replace edits, unified diffs and atomic writes for the file tool."""
+
+import difflib
+import os
+import re
+import tempfile
+from typing import Optional, List, Dict, Any, Tuple
+
+
+class PatchConflict(ValueError):
+    """Raised when an edit or hunk does not apply cleanly."""
+
+
+def _umask() -> int:
+    """The process umask, read without changing it where the platform allows."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("Umask:"):
+                    return int(line.split()[1], 8)
+    except (OSError, ValueError, IndexError):
+        pass
+    mask = os.umask(0o022)  # Briefly changes the umask; only where /proc is unavailable
+    os.umask(mask)
+    return mask
+
+
+def atomic_write(file_path: str, content: str, encoding: str = "utf-8") -> None:
+    """
+    Write a file atomically: temp file in the same directory, fsync, rename.
+
+    A crash mid-write leaves either the old or the new content, never a
+    truncated file. The mode of an existing file is preserved; new files
+    get the umask default, as with open(). A symlink is followed, so its
+    target is replaced and the link kept.
+    """
+    file_path = os.path.realpath(file_path)
+    directory = os.path.dirname(file_path)
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".tmp-", suffix=".part")
+    try:
+        with os.fdopen(fd, "w", encoding=encoding, newline="") as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        if os.path.exists(file_path):
+            os.chmod(tmp_path, os.stat(file_path).st_mode & 0o7777)
+        else:
+            os.chmod(tmp_path, 0o666 & ~_umask())
+        os.replace(tmp_path, file_path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def make_diff(old: str, new: str, file_path: str, context: int = 2) -> str:
+    """Compact unified diff of a change, containing only the changed hunks."""
+    return "".join(difflib.unified_diff(
+        old.splitlines(keepends=True),
+        new.splitlines(keepends=True),
+        fromfile=file_path,
+        tofile=file_path,
+        n=context
+    ))
+
+
+SEARCH_REPLACE_BLOCK = re.compile(
+    r"^<{5,9} SEARCH[^\n]*\n(.*?)^={5,9}[ \t]*\n(.*?)^>{5,9} REPLACE[^\n]*$",
+    re.MULTILINE | re.DOTALL
+)
+
+
+def parse_search_replace_blocks(text: str) -> List[Dict[str, Any]]:
+    """
+    Parse SEARCH/REPLACE blocks of the form::
+
+        <<<<<<< SEARCH
+        old text
+        =======
+        new text
+        >>>>>>> REPLACE
+    """
+    return [
+        {"old": old, "new": new}
+        for old, new in SEARCH_REPLACE_BLOCK.findall(text)
+    ]
+
+
+def apply_edits(text: str, edits: List[Dict[str, Any]]) -> Tuple[str, int]:
+    """
+    Apply search/replace edits in order.
+
+    Each edit is a dict with ``old``, ``new`` and optional ``replace_all``.
+    An ``old`` string that is missing, or ambiguous without ``replace_all``,
+    is a conflict and nothing is applied.
+
+    Returns:
+        Tuple of (new text, number of replacements made)
+    """
+    replacements = 0
+    for i, edit in enumerate(edits, 1):
+        old = edit.get("old", "")
+        new = edit.get("new", "")
+        if not old:
+            raise PatchConflict(f"Edit {i}: empty search text")
+        occurrences = text.count(old)
+        if occurrences == 0:
+            raise PatchConflict(f"Edit {i}: search text not found: {old[:80]!r}")
+        if occurrences > 1 and not edit.get("replace_all"):
+            raise PatchConflict(
+                f"Edit {i}: search text matches {occurrences} times; "
+                f"add surrounding context or set replace_all"
+            )
+        text = text.replace(old, new) if edit.get("replace_all") else text.replace(old, new, 1)
+        replacements += occurrences if edit.get("replace_all") else 1
+    return text, replacements
+
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+
+class FilePatch:
+    """The hunks of a unified diff that apply to one file."""
+
+    def __init__(self, old_path: Optional[str], new_path: Optional[str]):
+        self.old_path = old_path
+        self.new_path = new_path
+        self.hunks: List[Dict[str, Any]] = []
+
+    @property
+    def path(self) -> Optional[str]:
+        """Path of the file the patch applies to."""
+        return self.new_path or self.old_path
+
+    @property
+    def is_new_file(self) -> bool:
+        return self.old_path is None
+
+    @property
+    def is_deletion(self) -> bool:
+        return self.new_path is None
+
+
+def _diff_path(header: str) -> Optional[str]:
+    """Extract a path from a ---/+++ header, stripping a/ b/ prefixes."""
+    path = header[4:].split("\t")[0].strip()
+    if path == "/dev/null":
+        return None
+    if path.startswith(("a/", "b/")):
+        path = path[2:]
+    return path
+
+
+def parse_unified_diff(patch: str) -> List[FilePatch]:
+    """Parse a (possibly multi-file) unified diff."""
+    files: List[FilePatch] = []
+    current: Optional[FilePatch] = None
+    hunk: Optional[Dict[str, Any]] = None
+    remaining_old = remaining_new = 0
+    lines = patch.splitlines()
+    i = 0
+    while i < len(lines):
+        line = lines[i]
+        if hunk is not None and (remaining_old > 0 or remaining_new > 0) and line[:1] in (" ", "-", "+", ""):
+            tag, body = (line[:1] or " "), line[1:]
+            if tag in (" ", "-"):
+                hunk["old"].append(body)
+                remaining_old -= 1
+            if tag in (" ", "+"):
+                hunk["new"].append(body)
+                remaining_new -= 1
+        elif hunk is not None and line.startswith("\\"):
+            # "\ No newline at end of file" refers to the previous line
+            previous = lines[i - 1][:1]
+            if previous in (" ", "-"):
+                hunk["no_newline_old"] = True
+            if previous in (" ", "+"):
+                hunk["no_newline_new"] = True
+        elif line.startswith("--- ") and i + 1 < len(lines) and lines[i + 1].startswith("+++ "):
+            current = FilePatch(_diff_path(line), _diff_path(lines[i + 1]))
+            files.append(current)
+            hunk = None
+            i += 1
+        else:
+            match = HUNK_HEADER.match(line)
+            if match:
+                if current is None:
+                    current = FilePatch(None, None)
+                    files.append(current)
+                remaining_old = int(match.group(2)) if match.group(2) is not None else 1
+                remaining_new = int(match.group(4)) if match.group(4) is not None else 1
+                hunk = {
+                    "old_start": int(match.group(1)),
+                    "old_count": remaining_old,
+                    "header": line,
+                    "old": [],
+                    "new": [],
+                    "no_newline_old": False,
+                    "no_newline_new": False
+                }
+                current.hunks.append(hunk)
+        i += 1
+    return [f for f in files if f.hunks or f.is_new_file or f.is_deletion]
+
+
+def _find_block(lines: List[str], block: List[str], expected: int) -> int:
+    """Find `block` in `lines`, preferring the position closest to `expected`."""
+    if not block:
+        return max(0, min(expected, len(lines)))
+    size = len(block)
+    for distance in range(len(lines) + 1):
+        for pos in (expected - distance, expected + distance):
+            if 0 <= pos <= len(lines) - size and lines[pos:pos + size] == block:
+                return pos
+            if distance == 0:
+                break
+    return -1
+
+
+def apply_hunks(text: str, file_patch: FilePatch) -> str:
+    """Apply the hunks of one file patch, detecting conflicting context."""
+    newline = "\r\n" if "\r\n" in text else "\n"
+    ends_with_newline = text.endswith("\n")
+    lines = text.split("\n")
+    if ends_with_newline or not text:
+        lines.pop()
+    if newline == "\r\n":
+        lines = [line[:-1] if line.endswith("\r") else line for line in lines]
+    offset = 0
+
+    for hunk in file_patch.hunks:
+        expected = max(0, hunk["old_start"] - 1 + offset)
+        if hunk["old_count"] == 0:
+            expected = hunk["old_start"] + offset  # Pure insertion after old_start
+        pos = _find_block(lines, hunk["old"], expected)
+        if pos < 0:
+            raise PatchConflict(f"{file_patch.path}: hunk {hunk['header']} does not apply")
+        lines[pos:pos + len(hunk["old"])] = hunk["new"]
+        offset += len(hunk["new"]) - len(hunk["old"])
+        if pos + len(hunk["new"]) >= len(lines):
+            if hunk["no_newline_new"]:
+                ends_with_newline = False
+            elif hunk["no_newline_old"] or not text:
+                ends_with_newline = True
+
+    result = newline.join(lines)
+    if lines and ends_with_newline:
+        result += newline
+    return result
@@ -0,0 +1,281 @@
+"""Python tool for running snippets in a pool of warm worker interpreters."""
+
+import atexit
+import itertools
+import json
+import os
+import queue
+import subprocess
+import sys
+import threading
+import time
+from typing import Optional, Dict, Any, Sequence
+from .base import BaseTool, ToolResult
+
+WORKER_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "python_worker.py")
+
+# Modules imported by every worker before it accepts snippets
+DEFAULT_PRELOAD = ("json", "re", "os", "sys", "math", "collections", "itertools",
+                   "functools", "pathlib", "datetime", "subprocess", "textwrap")
+
+
+class PythonWorker:
+    """A single warm interpreter process running python_worker.py."""
+
+    def __init__(self, preload: Sequence[str]):
+        self.process = subprocess.Popen(
+            [sys.executable, "-u", WORKER_SCRIPT, *preload],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.DEVNULL,
+            text=True,
+            encoding="utf-8"
+        )
+        self.calls = 0
+        self._responses: "queue.Queue[Optional[Dict[str, Any]]]" = queue.Queue()
+        self._reader = threading.Thread(target=self._read_responses, daemon=True)
+        self._reader.start()
+
+    def _read_responses(self) -> None:
+        """Forward protocol lines from the worker to the response queue."""
+        for line in self.process.stdout:
+            try:
+                message = json.loads(line)
+            except ValueError:
+                continue
+            if not message.get("ready"):
+                self._responses.put(message)
+        self._responses.put(None)  # EOF: the worker died
+
+    def is_alive(self) -> bool:
+        """Whether the worker process is still running."""
+        return self.process.poll() is None
+
+    def run(self, request: Dict[str, Any], timeout: Optional[float]) -> Optional[Dict[str, Any]]:
+        """
+        Send a snippet to the worker and wait for its response.
+
+        Returns:
+            The response dict, or None if the worker died or timed out
+        """
+        self.calls += 1
+        try:
+            self.process.stdin.write(json.dumps(request) + "\n")
+            self.process.stdin.flush()
+            return self._responses.get(timeout=timeout)
+        except (OSError, queue.Empty):
+            return None
+
+    def kill(self) -> None:
+        """Terminate the worker process."""
+        try:
+            self.process.kill()
+            self.process.wait(timeout=5)
+        except Exception:
+            pass
+
+
+class PythonWorkerPool:
+    """
+    Pool of pre-started, pre-imported Python worker processes.
+
+    Workers are recycled after ``max_calls_per_worker`` snippets, after a
+    timeout or after a crash; a replacement is started immediately so the
+    next caller finds a warm interpreter.
+    """
+
+    def __init__(self, size: int = 2, preload: Sequence[str] = DEFAULT_PRELOAD,
+                 max_calls_per_worker: int = 50):
+        """
+        Initialize the worker pool.
+
+        Args:
+            size: Number of worker interpreters kept warm
+            preload: Modules each worker imports at start-up
+            max_calls_per_worker: Snippets a worker runs before it is recycled
+        """
+        self.size = size
+        self.preload = tuple(preload)
+        self.max_calls_per_worker = max_calls_per_worker
+        self._idle: "queue.Queue[PythonWorker]" = queue.Queue()
+        self._ids = itertools.count(1)
+        self._closed = False
+        for _ in range(size):
+            self._idle.put(PythonWorker(self.preload))
+
+    def run(self, code: str, timeout: Optional[float] = 30, cwd: Optional[str] = None,
+            stdin: Optional[str] = None, max_output: int = 100000) -> Dict[str, Any]:
+        """
+        Run a snippet on the next idle worker.
+
+        Returns:
+            Dict with stdout, stderr, exit_code, duration and timed_out
+        """
+        if self._closed:
+            raise RuntimeError("Python worker pool has been shut down")
+
+        worker = self._idle.get()
+        request = {
+            "id": next(self._ids),
+            "code": code,
+            "cwd": cwd,
+            "stdin": stdin,
+            "max_output": max_output
+        }
+        start = time.perf_counter()
+        response = worker.run(request, timeout)
+        elapsed = time.perf_counter() - start
+
+        if response is None:
+            timed_out = worker.is_alive()
+            self._recycle(worker)
+            return {
+                "stdout": "",
+                "stderr": f"Snippet timed out after {timeout}s" if timed_out else "Worker process crashed",
+                "exit_code": -1,
+                "duration": elapsed,
+                "timed_out": timed_out,
+                "truncated": False
+            }
+
+        if worker.calls >= self.max_calls_per_worker:
+            self._recycle(worker)
+        else:
+            self._idle.put(worker)
+        response["timed_out"] = False
+        return response
+
+    def _recycle(self, worker: PythonWorker) -> None:
+        """Kill a worker and put a fresh one in its place."""
+        worker.kill()
+        if not self._closed:
+            self._idle.put(PythonWorker(self.preload))
+
+    def shutdown(self) -> None:
+        """Terminate all idle workers."""
+        self._closed = True
+        while True:
+            try:
+                self._idle.get_nowait().kill()
+            except queue.Empty:
+                break
+
+
+_shared_pool: Optional[PythonWorkerPool] = None
+_shared_lock = threading.Lock()
+
+
+def get_shared_python_pool() -> PythonWorkerPool:
+    """Get the process-wide worker pool, starting it on first use."""
+    global _shared_pool
+    with _shared_lock:
+        if _shared_pool is None:
+            size = int(os.getenv("PYTHON_TOOL_WORKERS", "2"))
+            _shared_pool = PythonWorkerPool(size=size)
+            atexit.register(_shared_pool.shutdown)
+        return _shared_pool
+
+
+class PythonTool(BaseTool):
+    """Tool for running Python snippets without paying interpreter start-up."""
+
+    def __init__(self, pool: Optional[PythonWorkerPool] = None):
+        super().__init__(
+            name="run_python",
+            description="Execute a Python snippet in a warm interpreter and capture its output"
+        )
+        self._pool = pool
+
+    @property
+    def pool(self) -> PythonWorkerPool:
+        """The worker pool, defaulting to the shared pool."""
+        if self._pool is None:
+            self._pool = get_shared_python_pool()
+        return self._pool
+
+    def execute(self, code: str, description: str, timeout: Optional[float] = 30,
+                dir_path: Optional[str] = None, stdin: Optional[str] = None) -> ToolResult:
+        """
+        Execute a Python snippet.
+
+        Args:
+            code: Python source code to execute
+            description: Brief description of the snippet's purpose
+            timeout: Maximum seconds to wait before the worker is killed
+            dir_path: Optional directory to run the snippet in
+            stdin: Optional text made available on sys.stdin
+
+        Returns:
+            ToolResult with captured output and metadata
+        """
+        try:
+            print(f"Executing: {description}")
+
+            cwd = dir_path if dir_path else os.getcwd()
+            if not os.path.isdir(cwd):
+                return ToolResult(
+                    success=False,
+                    error=f"Directory does not exist: {cwd}"
+                )
+
+            response = self.pool.run(code, timeout=timeout, cwd=cwd, stdin=stdin)
+            exit_code = response["exit_code"]
+
+            data = {
+                "stdout": response["stdout"] or "(empty)",
+                "stderr": response["stderr"] or "(empty)",
+                "exit_code": exit_code,
+                "directory": cwd
+            }
+
+            success = exit_code == 0
+            return ToolResult(
+                success=success,
+                data=data,
+                error=(response["stderr"] or f"Snippet exited with code {exit_code}") if not success else None,
+                metadata={
+                    "exit_code": exit_code,
+                    "executed_in": cwd,
+                    "duration": round(response["duration"], 6),
+                    "timed_out": response["timed_out"],
+                    "truncated": response["truncated"]
+                }
+            )
+
+        except Exception as e:
+            return ToolResult(
+                success=False,
+                error=f"Failed to execute Python snippet: {str(e)}"
+            )
+
+    def get_parameters_schema(self) -> Dict[str, Any]:
+        """Get the parameters schema for the Python tool."""
+        return {
+            "type": "object",
+            "properties": {
+                "code": {
+                    "type": "string",
+                    "description": "The Python code to execute"
+                },
+                "description": {
+                    "type": "string",
+                    "description": "Brief description of the snippet's purpose"
+                },
+                "timeout": {
+                    "type": "number",
+                    "description": "Maximum execution time in seconds",
+                    "default": 30
+                },
+                "dir_path": {
+                    "type": "string",
+                    "description": "Optional directory path to run the snippet in",
+                    "default": None
+                },
+                "stdin": {
+                    "type": "string",
+                    "description": "Optional text to provide on standard input",
+                    "default": None
+                }
+            },
+            "required": ["code", "description"]
+        }
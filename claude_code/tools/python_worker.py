@@ -0,0 +1,177 @@
+"""Worker process for the Python tool.
+
+This file is run as a standalone script (not imported as part of the
+package) so that worker start-up only pays for the interpreter and the
+preloaded modules. Requests and responses are newline-delimited JSON on
+private duplicates of stdin/stdout; the real fd 0 is pointed at the null
+device and fds 1 and 2 at per-snippet capture files, so snippets cannot
+corrupt the protocol and output written below sys.stdout (os.write,
+subprocesses, C extensions) is still returned.
+"""
+
+import contextlib
+import io
+import json
+import os
+import sys
+import tempfile
+import time
+import traceback
+
+# Modules whose state is never rolled back between snippets
+UNRESTORED_MODULES = ("sys", "builtins", "__main__")
+
+_MISSING = object()
+
+
+def _snapshot_modules(names):
+    """Shallow copies of the namespaces of the named (loaded) modules."""
+    return {name: (sys.modules[name], dict(vars(sys.modules[name])))
+            for name in names if name in sys.modules and name not in UNRESTORED_MODULES}
+
+
+def _restore_modules(snapshots):
+    """Undo attribute changes a snippet made to snapshotted modules."""
+    for name, (module, saved) in snapshots.items():
+        if sys.modules.get(name) is not module:
+            sys.modules[name] = module
+        current = vars(module)
+        if len(current) == len(saved) and all(current.get(key, _MISSING) is value
+                                               for key, value in saved.items()):
+            continue
+        current.clear()
+        current.update(saved)
+
+
+@contextlib.contextmanager
+def _captured_fds(files):
+    """Point fds 1 and 2 at `files` (emptied first) for the duration."""
+    saved = [os.dup(fd) for fd in (1, 2)]
+    try:
+        for fd, f in zip((1, 2), files):
+            f.seek(0)
+            f.truncate()
+            os.dup2(f.fileno(), fd)
+        yield
+    finally:
+        for fd, saved_fd in zip((1, 2), saved):
+            os.dup2(saved_fd, fd)
+            os.close(saved_fd)
+
+
+def _read_capture(f, limit):
+    """Captured text, cut to `limit` characters, and whether it was cut."""
+    size = os.fstat(f.fileno()).st_size
+    f.seek(0)
+    # UTF-8 needs at most 4 bytes per character
+    data = f.read(limit * 4 + 4)
+    text = data.decode("utf-8", errors="replace")
+    return text[:limit], len(text) > limit or size > len(data)
+
+
+def _run_snippet(request, baseline_modules, snapshots, capture_files):
+    """Execute one snippet in a fresh namespace and restore process state."""
+    namespace = {"__name__": "__main__", "__builtins__": __builtins__}
+    saved_cwd = os.getcwd()
+    saved_environ = dict(os.environ)
+    saved_path = list(sys.path)
+    saved_argv = list(sys.argv)
+    saved_stdin = sys.stdin
+    exit_code = 0
+    error = None
+
+    start = time.perf_counter()
+    try:
+        if request.get("cwd"):
+            os.chdir(request["cwd"])
+        sys.argv = ["<snippet>"]
+        sys.stdin = io.StringIO(request.get("stdin") or "")
+        with _captured_fds(capture_files):
+            # Line-buffered like a terminal, and flushed before the fds are
+            # restored, so print() and os.write(1, ...) interleave in order
+            stdout = open(1, "w", encoding="utf-8", errors="backslashreplace", buffering=1, closefd=False)
+            stderr = open(2, "w", encoding="utf-8", errors="backslashreplace", buffering=1, closefd=False)
+            try:
+                with contextlib.redirect_stdout(stdout), contextlib.redirect_stderr(stderr):
+                    try:
+                        exec(compile(request["code"], "<snippet>", "exec"), namespace)
+                    except SystemExit as e:
+                        if isinstance(e.code, int):
+                            exit_code = e.code
+                        elif e.code is not None:
+                            print(e.code, file=sys.stderr)
+                            exit_code = 1
+                    except BaseException:
+                        exit_code = 1
+                        error = traceback.format_exc()
+            finally:
+                for stream in (stdout, stderr):
+                    try:
+                        stream.close()
+                    except Exception:
+                        pass
+    finally:
+        duration = time.perf_counter() - start
+        sys.stdin = saved_stdin
+        sys.argv = saved_argv
+        sys.path[:] = saved_path
+        os.environ.clear()
+        os.environ.update(saved_environ)
+        try:
+            os.chdir(saved_cwd)
+        except OSError:
+            pass
+        # Forget modules imported by the snippet and undo changes to
+        # preloaded ones, so calls stay isolated
+        for name in set(sys.modules) - baseline_modules:
+            del sys.modules[name]
+        _restore_modules(snapshots)
+
+    limit = request.get("max_output") or 100000
+    out, out_truncated = _read_capture(capture_files[0], limit)
+    err, err_truncated = _read_capture(capture_files[1], limit)
+    err += error or ""
+    return {
+        "id": request.get("id"),
+        "stdout": out,
+        "stderr": err[:limit],
+        "truncated": out_truncated or err_truncated or len(err) > limit,
+        "exit_code": exit_code,
+        "duration": duration
+    }
+
+
+def main():
+    proto_in = os.fdopen(os.dup(0), "r", encoding="utf-8")
+    proto_out = os.fdopen(os.dup(1), "w", encoding="utf-8")
+    devnull = os.open(os.devnull, os.O_RDWR)
+    os.dup2(devnull, 0)
+    os.dup2(devnull, 1)
+    capture_files = (tempfile.TemporaryFile(), tempfile.TemporaryFile())
+    # Behave like `python -c`: resolve imports from the working directory,
+    # not from the directory containing this script
+    sys.path[0] = ""
+
+    startup_modules = set(sys.modules)
+    for name in sys.argv[1:]:
+        try:
+            __import__(name)
+        except Exception:
+            pass
+    baseline_modules = set(sys.modules)
+    # The preloaded modules, and everything they pulled in
+    snapshots = _snapshot_modules((baseline_modules - startup_modules) | set(sys.argv[1:]))
+
+    proto_out.write(json.dumps({"ready": True, "pid": os.getpid()}) + "\n")
+    proto_out.flush()
+
+    for line in proto_in:
+        if not line.strip():
+            continue
+        response = _run_snippet(json.loads(line), baseline_modules, snapshots, capture_files)
+        proto_out.write(json.dumps(response) + "\n")
+        proto_out.flush()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+"""Retrieve tool for ranked lookup of relevant code chunks through the BM25 index."""
+
+import os
+from typing import Optional, Dict, Any, Sequence
+from .base import BaseTool, ToolResult
+from ..indexing.bm25 import find_bm25_root, get_bm25_index
+
+
+class RetrieveTool(BaseTool):
+    """Tool for finding the code chunks most relevant to a free-text query."""
+
+    def __init__(self):
+        super().__init__(
+            name="retrieve",
+            description="Rank functions, classes and paragraphs of the codebase by relevance to a query"
+        )
+
+    def execute(self, query: str, path: str = ".", top_k: int = 10,
+                snippet_lines: int = 0, build: bool = False) -> ToolResult:
+        """
+        Retrieve the chunks that best match a query, ranked by BM25.
+
+        The index covers the nearest directory at or above `path` that has
+        one; only files changed since it was saved are re-read. Without
+        one, an index is built at `path` only if `build` is set.
+
+        Args:
+            query: What to look for, in words or identifiers
+            path: Directory (or file) to retrieve from
+            top_k: Number of chunks to return
+            snippet_lines: Include up to this many lines of each chunk
+            build: Build an index at `path` if none exists at or above it
+
+        Returns:
+            ToolResult with ranked chunks
+        """
+        if not query or not query.strip():
+            return ToolResult(success=False, error="query must not be empty")
+        if not os.path.exists(path):
+            return ToolResult(success=False, error=f"Path not found: {path}")
+
+        try:
+            root = find_bm25_root(path)
+            if root is None:
+                if not build:
+                    return ToolResult(success=False, error=f"No BM25 index at or above {path}; "
+                                                           "retry with build=true to index it")
+                root = os.path.dirname(os.path.abspath(path)) if os.path.isfile(path) else path
+            index = get_bm25_index(root)
+            index.watch()
+            results = index.search(query, top_k=max(1, top_k), scope=path, snippet_lines=snippet_lines)
+            return ToolResult(
+                success=True,
+                data={"query": query, "results": results, "total": len(results)},
+                metadata={"root": index.root, "indexed_files": len(index.files)}
+            )
+
+        except Exception as e:
+            return ToolResult(success=False, error=f"Retrieval failed: {str(e)}")
+
+    def preamble(self, query: str, path: str = ".", top_k: int = 5, snippet_lines: int = 6,
+                 scope: Optional[Sequence[str]] = None) -> str:
+        """
+        Prompt section listing the chunks most relevant to `query`.
+
+        Only an index that already exists is used, and no watcher is
+        started, so this stays cheap on an agent's first turn. Chunks come
+        from `path`, or only from the `scope` paths (relative to `path`) if
+        given. Returns an empty string when there is no index, nothing
+        matches or retrieval fails, so callers can prepend it unconditionally.
+        """
+        try:
+            root = find_bm25_root(path)
+            if root is None:
+                return ""
+            paths = path if scope is None else [os.path.join(path, rel_path) for rel_path in scope]
+            results = get_bm25_index(root).search(query, top_k=max(1, top_k), scope=paths,
+                                                  snippet_lines=snippet_lines)
+        except Exception:
+            return ""
+        if not results:
+            return ""
+        sections = []
+        for chunk in results:
+            location = f"{os.path.relpath(chunk['file'])}:{chunk['start_line']}-{chunk['end_line']}"
+            section = f"- {location} ({chunk['title']}, score {chunk['score']})"
+            if chunk.get("text"):
+                section += "\n" + "\n".join("    " + line for line in chunk["text"].splitlines())
+            sections.append(section)
+        return "Top relevant chunks (local BM25 index):\n" + "\n".join(sections) + "\n"
+
+    def get_parameters_schema(self) -> Dict[str, Any]:
+        """Get the parameters schema."""
+        return {
+            "type": "object",
+            "properties": {
+                "query": {
+                    "type": "string",
+                    "description": "What to look for, in natural language and/or identifiers"
+                },
+                "path": {
+                    "type": "string",
+                    "description": "Directory or file to retrieve from",
+                    "default": "."
+                },
+                "top_k": {
+                    "type": "integer",
+                    "description": "Number of chunks to return",
+                    "default": 10
+                },
+                "snippet_lines": {
+                    "type": "integer",
+                    "description": "Include up to this many lines of each chunk's text",
+                    "default": 0
+                },
+                "build": {
+                    "type": "boolean",
+                    "description": "Build an index at path if none exists (reads every file once)",
+                    "default": False
+                }
+            },
+            "required": ["query"]
+        }
@@ -0,0 +1,212 @@
+"""Resource-limited execution profiles for shell commands."""
+
+import os
+import platform
+import shlex
+import uuid
+import warnings
+from typing import Optional, Dict, Any, List
+from pydantic import BaseModel
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+class ExecutionProfile(BaseModel):
+    """Resource limits applied to every command run by a BashTool.
+
+    Limits are applied with ``ulimit`` by the shell before it runs the
+    command, so a runaway command cannot starve other subagents on the
+    host. ``None`` leaves the corresponding limit inherited from the parent.
+    ``max_processes`` counts every process of the user, not just the
+    command's; ``cgroup_pids_max`` limits the command's own processes.
+    """
+    name: str = "custom"
+    cpu_seconds: Optional[int] = None
+    address_space_mb: Optional[int] = None
+    max_processes: Optional[int] = None
+    max_open_files: Optional[int] = None
+    max_file_size_mb: Optional[int] = None
+    use_cgroup: bool = False
+    cgroup_parent: Optional[str] = None
+    cgroup_memory_max_mb: Optional[int] = None
+    cgroup_pids_max: Optional[int] = None
+    cgroup_cpu_percent: Optional[int] = None
+
+    @classmethod
+    def from_preset(cls, name: str) -> "ExecutionProfile":
+        """Create a profile from one of the named presets."""
+        if name not in SANDBOX_PRESETS:
+            raise ValueError(
+                f"Unknown sandbox profile: {name}. Available: {', '.join(SANDBOX_PRESETS)}"
+            )
+        return cls(name=name, **SANDBOX_PRESETS[name])
+
+    @classmethod
+    def from_env(cls) -> Optional["ExecutionProfile"]:
+        """
+        Create a profile from the BASH_SANDBOX_PROFILE env var, if set.
+
+        An unknown name falls back to DEFAULT_PRESET with a warning, so a
+        typo neither disables the sandbox nor breaks the tool.
+        """
+        name = os.getenv("BASH_SANDBOX_PROFILE")
+        if not name or name == "none":
+            return None
+        if name not in SANDBOX_PRESETS:
+            warnings.warn(
+                f"Unknown sandbox profile: {name}. Available: {', '.join(SANDBOX_PRESETS)}; "
+                f"using {DEFAULT_PRESET!r}"
+            )
+            name = DEFAULT_PRESET
+        return cls.from_preset(name)
+
+    def is_supported(self) -> bool:
+        """Whether resource limits can be applied on this platform."""
+        return resource is not None and platform.system() != "Windows"
+
+    def _ulimits(self) -> List[str]:
+        """``ulimit`` commands setting this profile's limits in a POSIX shell."""
+        mb = 1024 * 1024
+        # (RLIMIT_* name, option, limit in bytes or a count, bytes per ulimit unit)
+        wanted = [
+            ("RLIMIT_CPU", "-t", self.cpu_seconds, 1),
+            ("RLIMIT_AS", "-v", self.address_space_mb and self.address_space_mb * mb, 1024),
+            ("RLIMIT_NOFILE", "-n", self.max_open_files, 1),
+            ("RLIMIT_FSIZE", "-f", self.max_file_size_mb and self.max_file_size_mb * mb, 512),
+            ("RLIMIT_NPROC", "-u", self.max_processes, 1),
+        ]
+        commands = []
+        for name, option, value, unit in wanted:
+            limit = getattr(resource, name, None)
+            if value is None or limit is None:
+                continue
+            # Never try to raise a hard limit; that fails for unprivileged users
+            hard = resource.getrlimit(limit)[1]
+            if hard != resource.RLIM_INFINITY:
+                value = min(value, hard)
+            command = f"ulimit {option} {max(1, value // unit)}"
+            if option == "-u":
+                # dash spells the process limit -p (bash's -p is read-only)
+                command = f"{{ {command} || ulimit -p {value}; }} 2>/dev/null"
+            commands.append(command)
+        return commands
+
+    def wrap_command(self, command: str, cgroup_path: Optional[str] = None) -> str:
+        """
+        The command prefixed with shell code that applies the limits.
+
+        The limits are set by the shell itself rather than by a preexec
+        hook, which is not safe in a process running other threads. If a
+        limit cannot be set the command does not run and exits with 126.
+        """
+        if not self.is_supported():
+            return command
+        setup = []
+        if cgroup_path:
+            procs_file = shlex.quote(os.path.join(cgroup_path, "cgroup.procs"))
+            # Best effort: rlimits still apply if the cgroup cannot be joined
+            setup.append(f"{{ echo $$ > {procs_file}; }} 2>/dev/null")
+        limits = self._ulimits()
+        if limits:
+            setup.append(" && ".join(limits) + " || exit 126")
+        if not setup:
+            return command
+        return "\n".join(setup) + "\n" + command
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to dictionary, dropping unset limits."""
+        return {k: v for k, v in self.model_dump().items() if v not in (None, False)}
+
+
+# Process limits are left to cgroup pids.max: RLIMIT_NPROC counts every
+# process of the user, so a small one fails in busy sessions
+SANDBOX_PRESETS: Dict[str, Dict[str, Any]] = {
+    "standard": {
+        "cpu_seconds": 120,
+        "address_space_mb": 4096,
+        "max_open_files": 1024,
+        "max_file_size_mb": 1024,
+    },
+    "strict": {
+        "cpu_seconds": 30,
+        "address_space_mb": 1024,
+        "max_open_files": 256,
+        "max_file_size_mb": 100,
+        "use_cgroup": True,
+        "cgroup_memory_max_mb": 1024,
+        "cgroup_pids_max": 64,
+        "cgroup_cpu_percent": 100,
+    },
+}
+
+# Used when BASH_SANDBOX_PROFILE names an unknown preset
+DEFAULT_PRESET = "standard"
+
+
+class CgroupPlacement:
+    """Best-effort cgroup v2 placement for a single command.
+
+    A child cgroup is created under ``cgroup_parent`` (or the cgroup of the
+    current process) and removed again once the command has finished. If
+    cgroup v2 is not mounted or the hierarchy is not delegated to us, the
+    placement is silently skipped and only rlimits apply.
+    """
+
+    CGROUP_ROOT = "/sys/fs/cgroup"
+
+    def __init__(self, profile: Optional[ExecutionProfile]):
+        self.profile = profile
+        self.path: Optional[str] = None
+
+    @classmethod
+    def current_cgroup(cls) -> Optional[str]:
+        """Path of the cgroup v2 this process belongs to."""
+        try:
+            with open("/proc/self/cgroup") as f:
+                for line in f:
+                    if line.startswith("0::"):
+                        return os.path.join(cls.CGROUP_ROOT, line[3:].strip().lstrip("/"))
+        except OSError:
+            pass
+        return None
+
+    def __enter__(self) -> Optional[str]:
+        if not self.profile or not self.profile.use_cgroup or platform.system() != "Linux":
+            return None
+        parent = self.profile.cgroup_parent or self.current_cgroup()
+        if not parent or not os.path.exists(os.path.join(parent, "cgroup.controllers")):
+            return None
+        path = os.path.join(parent, f"claude-code-{uuid.uuid4().hex[:12]}")
+        try:
+            os.mkdir(path)
+        except OSError:
+            return None
+        self.path = path
+        self._write("memory.max", self.profile.cgroup_memory_max_mb and
+                    self.profile.cgroup_memory_max_mb * 1024 * 1024)
+        self._write("pids.max", self.profile.cgroup_pids_max)
+        if self.profile.cgroup_cpu_percent:
+            period = 100000
+            self._write("cpu.max", f"{period * self.profile.cgroup_cpu_percent // 100} {period}")
+        return path
+
+    def __exit__(self, exc_type, exc_val, exc_tb) -> None:
+        if self.path:
+            try:
+                os.rmdir(self.path)
+            except OSError:
+                pass  # Still has live descendants; the kernel reaps it later
+            self.path = None
+
+    def _write(self, name: str, value: Any) -> None:
+        """Write a controller value, ignoring controllers that are not enabled."""
+        if not value:
+            return
+        try:
+            with open(os.path.join(self.path, name), "w") as f:
+                f.write(str(value))
+        except OSError:
+            pass
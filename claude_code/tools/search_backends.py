@@ -0,0 +1,267 @@
+"""Native search backends (ripgrep, git grep) that SearchTool delegates to when available."""
+
+import base64
+import json
+import os
+import re
+import shutil
+import subprocess
+from abc import ABC, abstractmethod
+from typing import Optional, List, Iterable, Iterator, Sequence, Tuple
+
+try:  # Python 3.11+
+    from re import _parser as sre_parse
+except ImportError:  # pragma: no cover
+    import sre_parse
+
+# Files passed to one backend process
+BACKEND_BATCH_SIZE = 512
+
+# Parse-tree nodes ripgrep's regex engine has no equivalent for
+_UNSUPPORTED_OPS = {"ASSERT", "ASSERT_NOT", "GROUPREF", "GROUPREF_EXISTS", "GROUPREF_IGNORE",
+                    "ATOMIC_GROUP", "POSSESSIVE_REPEAT"}
+_UNSUPPORTED_FLAGS = re.VERBOSE | re.ASCII | re.LOCALE
+
+# Character-class syntax that Rust reads as set operations or POSIX classes
+_RUST_CLASS_SYNTAX = ("[[", "&&", "--", "~~")
+
+
+class BackendError(RuntimeError):
+    """A backend failed on a query or batch; the Python engine takes over."""
+
+
+def _iter_nodes(items: Iterable) -> Iterator[Tuple[str, object]]:
+    """Every (op name, argument) in an sre_parse tree, depth first."""
+    for op, av in items:
+        yield str(op), av
+        if isinstance(av, tuple):
+            for part in av:
+                if isinstance(part, sre_parse.SubPattern):
+                    yield from _iter_nodes(part)
+                elif isinstance(part, list):
+                    for branch in part:
+                        if isinstance(branch, sre_parse.SubPattern):
+                            yield from _iter_nodes(branch)
+
+
+def plain_literal(pattern: str) -> Optional[str]:
+    """The string a regex matches if it is a plain literal without flags, else None."""
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return None
+    if parsed.state.flags & ~re.UNICODE or not len(parsed):
+        return None
+    chars = []
+    for op, av in parsed:
+        if str(op) != "LITERAL":
+            return None
+        chars.append(chr(av))
+    return "".join(chars)
+
+
+def fixed_strings(patterns: Sequence[str], literals: Sequence[str] = ()) -> Optional[List[str]]:
+    """
+    The query as a list of fixed strings, if every pattern is a plain literal.
+
+    Returns None when a regex feature is involved or a string spans lines.
+    """
+    strings = []
+    for pattern in patterns:
+        literal = plain_literal(pattern)
+        if literal is None:
+            return None
+        strings.append(literal)
+    strings.extend(literals)
+    if not strings or any(not s or "\n" in s for s in strings):
+        return None
+    return strings
+
+
+def rust_compatible(pattern: str) -> bool:
+    """Whether ripgrep reads `pattern` the way Python's re does."""
+    if "\n" in pattern or any(syntax in pattern for syntax in _RUST_CLASS_SYNTAX):
+        return False
+    try:
+        parsed = sre_parse.parse(pattern)
+    except re.error:
+        return False
+    if parsed.state.flags & _UNSUPPORTED_FLAGS:
+        return False
+    for op, av in _iter_nodes(parsed):
+        if op in _UNSUPPORTED_OPS:
+            return False
+        if op == "AT" and str(av) == "AT_END_STRING":
+            return False  # \Z means \z to ripgrep
+        if op == "SUBPATTERN" and (av[1] | av[2]) & _UNSUPPORTED_FLAGS:
+            return False
+    return True
+
+
+class SearchBackend(ABC):
+    """
+    An external program that finds matching lines in a batch of files.
+
+    Backends only select lines: SearchTool re-checks each line with Python's
+    re to build its result, so output is identical in shape to the Python
+    engine and a backend can never add lines the engine would not match.
+    """
+
+    name = ""
+    executable = ""
+
+    def __init__(self, pattern: str, fixed: Optional[List[str]] = None):
+        self.pattern = pattern
+        self.fixed = fixed
+
+    @classmethod
+    def available(cls) -> bool:
+        """Whether the backend's executable is on PATH."""
+        return shutil.which(cls.executable) is not None
+
+    @classmethod
+    @abstractmethod
+    def supports(cls, pattern: str, fixed: Optional[List[str]]) -> bool:
+        """Whether this backend can run the query with Python's semantics."""
+        pass
+
+    @abstractmethod
+    def command(self, files: List[str], max_count: Optional[int]) -> List[str]:
+        """Command line searching `files` (relative to the working directory)."""
+        pass
+
+    @abstractmethod
+    def parse(self, stream: Iterable[bytes]) -> Iterator[Tuple[str, int, str]]:
+        """Parse output lines into (relative path, line number, line text) tuples."""
+        pass
+
+    def iter_lines(self, root: str, files: List[str],
+                   max_count: Optional[int] = None) -> Iterator[Tuple[str, int, str]]:
+        """
+        Run the backend over `files` (paths under `root`), parsing as output arrives.
+
+        Yields:
+            Tuples of (path relative to root, 1-based line number, line text)
+
+        Raises:
+            BackendError: If the program is missing or exits with an error
+        """
+        args = self.command([os.path.relpath(f, root) for f in files], max_count)
+        try:
+            process = subprocess.Popen(args, cwd=root, stdin=subprocess.DEVNULL,
+                                       stdout=subprocess.PIPE, stderr=subprocess.DEVNULL)
+        except OSError as e:
+            raise BackendError(f"{self.name} could not be started: {e}")
+        try:
+            yield from self.parse(process.stdout)
+        finally:
+            if process.poll() is None:
+                process.kill()
+            process.stdout.close()
+            process.wait()
+        # Exit status 1 only means nothing matched
+        if process.returncode not in (0, 1):
+            raise BackendError(f"{self.name} exited with status {process.returncode}")
+
+
+class RipgrepBackend(SearchBackend):
+    """ripgrep, read through its JSON output."""
+
+    name = "rg"
+    executable = "rg"
+
+    @classmethod
+    def supports(cls, pattern: str, fixed: Optional[List[str]]) -> bool:
+        return fixed is not None or rust_compatible(pattern)
+
+    def command(self, files: List[str], max_count: Optional[int]) -> List[str]:
+        # Files are already filtered by our walker, so ripgrep's own ignore
+        # handling is switched off
+        args = [self.executable, "--json", "--no-config", "--no-ignore", "--hidden",
+                "--no-messages", "--line-number"]
+        if max_count is not None:
+            args += ["--max-count", str(max_count)]
+        if self.fixed is not None:
+            args.append("--fixed-strings")
+            for string in self.fixed:
+                args += ["-e", string]
+        else:
+            args += ["-e", self.pattern]
+        return args + ["--"] + files
+
+    @staticmethod
+    def _text(value: dict) -> str:
+        """Decode a ripgrep JSON string field ({"text": ...} or {"bytes": base64})."""
+        if "text" in value:
+            return value["text"]
+        return os.fsdecode(base64.b64decode(value["bytes"]))
+
+    def parse(self, stream: Iterable[bytes]) -> Iterator[Tuple[str, int, str]]:
+        for raw in stream:
+            try:
+                message = json.loads(raw)
+            except ValueError:
+                continue
+            if message.get("type") != "match":
+                continue
+            data = message["data"]
+            text = self._text(data["lines"])
+            if text.endswith("\n"):
+                text = text[:-1]
+            yield self._text(data["path"]), data["line_number"], text
+
+
+class GitGrepBackend(SearchBackend):
+    """git grep over untracked paths (--no-index); fixed strings only."""
+
+    name = "git"
+    executable = "git"
+
+    @classmethod
+    def supports(cls, pattern: str, fixed: Optional[List[str]]) -> bool:
+        # git's regex flavours differ from Python's; literals are exact
+        return fixed is not None
+
+    def command(self, files: List[str], max_count: Optional[int]) -> List[str]:
+        args = [self.executable, "--literal-pathspecs", "grep", "--no-index", "--no-color",
+                "-n", "-z", "-I", "--fixed-strings"]
+        for string in self.fixed or []:
+            args += ["-e", string]
+        return args + ["--"] + files
+
+    def parse(self, stream: Iterable[bytes]) -> Iterator[Tuple[str, int, str]]:
+        for raw in stream:
+            parts = raw.rstrip(b"\n").split(b"\0", 2)
+            if len(parts) != 3 or not parts[1].isdigit():
+                continue
+            path, line_number, text = parts
+            yield os.fsdecode(path), int(line_number), text.decode("utf-8", errors="replace")
+
+
+BACKENDS = {"rg": RipgrepBackend, "git": GitGrepBackend}
+BACKEND_CHOICES = ["auto", "python"] + list(BACKENDS)
+
+
+def search_backend_setting() -> str:
+    """Default backend: SEARCH_BACKEND ("auto", "python", "rg" or "git")."""
+    return os.getenv("SEARCH_BACKEND", "auto").strip().lower() or "auto"
+
+
+def select_backend(name: str, pattern: str, fixed: Optional[List[str]]) -> Optional[SearchBackend]:
+    """
+    The native backend to run a query with, or None for the Python engine.
+
+    "auto" prefers ripgrep, then git grep; naming a backend still falls back
+    to Python when it is missing or cannot express the query.
+
+    Raises:
+        ValueError: If `name` is not one of BACKEND_CHOICES
+    """
+    if name not in BACKEND_CHOICES:
+        raise ValueError(f"Unknown search backend: {name}. Use one of: {', '.join(BACKEND_CHOICES)}")
+    if name == "python":
+        return None
+    for backend in ([BACKENDS[name]] if name in BACKENDS else BACKENDS.values()):
+        if backend.supports(pattern, fixed) and backend.available():
+            return backend(pattern, fixed)
+    return None
@@ -1,47 +1,406 @@
 """Search tool for searching patterns across files."""
 
+import asyncio
+import atexit
+import functools
+import itertools
+import multiprocessing
 import os
 import re
-from typing import Optional, List, Dict, Any
+import threading
+from collections import deque
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Optional, List, Dict, Any, Iterator, AsyncIterator, Pattern, Sequence, Tuple
+from .aho_corasick import AhoCorasick
 from .base import BaseTool, ToolResult
+from .encoding import sniff_file
+from .file_cache import FileCache, get_file_cache
+from .search_backends import (BACKEND_BATCH_SIZE, BACKEND_CHOICES, BackendError, SearchBackend,
+                              fixed_strings, search_backend_setting, select_backend)
+from .walker import GlobSet, IgnoreRules, expand_braces, iter_files
+from ..indexing.trigram import find_index_root, get_trigram_index
+
+# Files handed to a worker at a time, and the smallest tree worth a pool for
+SEARCH_BATCH_SIZE = 64
+PARALLEL_MIN_FILES = 256
+
+# Matches buffered between the scanning thread and an async consumer
+STREAM_QUEUE_SIZE = 64
+
+# Output modes and the columns of their compact rows ("content" returns
+# one record per matching line instead)
+OUTPUT_MODES = {
+    "content": None,
+    "files_with_matches": ["file"],
+    "count": ["file", "count"],
+    "first_match_per_file": ["file", "line_number", "line_content"],
+}
+
+# Leading global inline flags, e.g. "(?i)", which must become scoped
+# "(?i:...)" groups once a pattern is part of a larger alternation
+_GLOBAL_FLAGS = re.compile(r"^\(\?([aiLmsux]+)\)")
+_NUMBERED_BACKREF = re.compile(r"(?<!\\)(?:\\\\)*\\[1-9]")
+
+
+class PatternSet:
+    """
+    Several regexes and literals searched for in a single pass.
+    
+    All of them are folded into one alternation that drives the scan, so a
+    file is read and matched once however many patterns there are. Each
+    matching line is then tagged with the patterns it contains: literals
+    through one Aho-Corasick pass over the line, regexes individually.
+    """
+    
+    def __init__(self, patterns: Sequence[str] = (), literals: Sequence[str] = ()):
+        self.patterns = tuple(patterns)
+        self.literals = tuple(literals)
+        if not self.patterns and not self.literals:
+            raise ValueError("No pattern given")
+        if any(not literal for literal in self.literals):
+            raise ValueError("Literals must not be empty")
+        self.labels = self.patterns + self.literals
+        
+        branches = []
+        groups = 0
+        for pattern in self.patterns:
+            compiled = re.compile(pattern)
+            if groups and _NUMBERED_BACKREF.search(pattern):
+                raise ValueError(f"Numbered backreferences cannot be combined with other patterns: {pattern}")
+            groups += compiled.groups
+            flags = _GLOBAL_FLAGS.match(pattern)
+            if flags:
+                branches.append(f"(?{flags.group(1)}:{pattern[flags.end():]})")
+            else:
+                branches.append(f"(?:{pattern})")
+        branches.extend(re.escape(literal) for literal in self.literals)
+        self.regex = re.compile("|".join(branches), re.MULTILINE)
+        
+        self._regexes = [re.compile(pattern, re.MULTILINE) for pattern in self.patterns]
+        self._automaton = AhoCorasick(self.literals) if self.literals else None
+    
+    def tags(self, line: str) -> List[str]:
+        """Labels of the patterns found in one line, in the order they were given."""
+        tags = [pattern for pattern, regex in zip(self.patterns, self._regexes) if regex.search(line)]
+        if self._automaton is not None:
+            found = self._automaton.find_all(line)
+            tags.extend(literal for index, literal in enumerate(self.literals) if index in found)
+        return tags
+
+
+@functools.lru_cache(maxsize=32)
+def get_pattern_set(patterns: Tuple[str, ...], literals: Tuple[str, ...]) -> PatternSet:
+    """Build a PatternSet once per process for a given query."""
+    return PatternSet(patterns, literals)
+
+
+def iter_line_matches(regex: Pattern, text: str,
+                      limit: Optional[int] = None) -> Iterator[Tuple[int, int, int, "re.Match"]]:
+    """
+    Scan a whole buffer once, yielding the first match on each matching line.
+
+    Line numbers are derived by counting newlines between consecutive
+    matches, so lines without matches are never split or visited in Python.
+    A match that reaches a newline is retried within its own line, keeping
+    per-line semantics (compile with re.MULTILINE so ``^``/``$`` anchor to lines).
+
+    Yields:
+        Tuples of (1-based line number, line start offset, line end offset, match)
+    """
+    pos = 0
+    line_number = 1
+    counted_to = 0
+    found = 0
+    end = len(text)
+    while pos < end:
+        match = regex.search(text, pos)
+        if match is None:
+            return
+        start = match.start()
+        if start == end and text[-1] == "\n":
+            return  # Empty match after the final newline is not a line
+        line_start = text.rfind("\n", 0, start) + 1
+        line_end = text.find("\n", start)
+        if line_end < 0:
+            line_end = end
+        if match.end() > line_end or match.start() == line_end:
+            # Reached the line terminator; re-run within this line (newline
+            # included, as readlines() would return it) so text beyond it
+            # cannot influence the match
+            match = regex.search(text, line_start, line_end + 1)
+            if match is not None and match.start() > line_end:
+                match = None
+        if match is not None:
+            line_number += text.count("\n", counted_to, line_start)
+            counted_to = line_start
+            yield line_number, line_start, line_end, match
+            found += 1
+            if limit is not None and found >= limit:
+                return
+        pos = line_end + 1
+
+
+def _context_lines(text: str, line_start: int, line_end: int,
+                   before: int, after: int) -> Tuple[List[str], List[str]]:
+    """Up to `before` lines preceding and `after` lines following a matched line."""
+    before_lines: List[str] = []
+    pos = line_start
+    while len(before_lines) < before and pos > 0:
+        start = text.rfind("\n", 0, pos - 1) + 1
+        before_lines.append(text[start:pos - 1])
+        pos = start
+    before_lines.reverse()
+    
+    after_lines: List[str] = []
+    pos = line_end
+    while len(after_lines) < after and pos + 1 < len(text):
+        end = text.find("\n", pos + 1)
+        if end < 0:
+            end = len(text)
+        after_lines.append(text[pos + 1:end])
+        pos = end
+    return before_lines, after_lines
+
+
+def _iter_file(cache: FileCache, file_path: str, regex: Pattern, limit: Optional[int] = None,
+               before: int = 0, after: int = 0,
+               pattern_set: Optional[PatternSet] = None) -> Iterator[Dict[str, Any]]:
+    """
+    Lazily search one file through a file cache, yielding result dicts.
+    
+    With a `pattern_set` (whose combined regex is `regex`), each result
+    also lists the patterns found on its line.
+    """
+    try:
+        cached = cache.get(file_path)
+    except Exception:
+        return  # Skip files that can't be read
+    if cached.is_binary:
+        return  # Binary verdicts are cached; nothing to decode or match
+    text = cached.text
+    
+    for line_number, line_start, line_end, match in iter_line_matches(regex, text, limit):
+        result = {
+            "file": file_path,
+            "line_number": line_number,
+            "line_content": text[line_start:line_end].strip(),
+            "match": match.group()
+        }
+        if pattern_set is not None:
+            result["patterns"] = pattern_set.tags(text[line_start:line_end + 1])
+        if before or after:
+            result["before"], result["after"] = _context_lines(text, line_start, line_end, before, after)
+        yield result
+
+
+def _file_row(cache: FileCache, file_path: str, regex: Pattern, mode: str) -> Optional[List[Any]]:
+    """
+    One compact row summarising a file's matches, or None if it has none.
+
+    No per-line records are built, and except in "count" mode the scan of
+    the file stops at its first matching line.
+    """
+    try:
+        cached = cache.get(file_path)
+    except Exception:
+        return None
+    if cached.is_binary:
+        return None
+    text = cached.text
+    if mode == "count":
+        count = sum(1 for _ in iter_line_matches(regex, text))
+        return [file_path, count] if count else None
+    for line_number, line_start, line_end, _ in iter_line_matches(regex, text, 1):
+        if mode == "files_with_matches":
+            return [file_path]
+        return [file_path, line_number, text[line_start:line_end].strip()]
+    return None
+
+
+def _iter_file_results(cache: FileCache, file_path: str, regex: Pattern, limit: Optional[int],
+                       before: int, after: int, mode: str,
+                       tags: Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]] = None) -> Iterator[Any]:
+    """
+    Match dicts for "content" mode, otherwise at most one row for the file.
+    
+    `tags` is the (patterns, literals) of a multi-pattern query; content
+    results are then tagged with the patterns they matched.
+    """
+    if mode == "content":
+        pattern_set = get_pattern_set(*tags) if tags else None
+        yield from _iter_file(cache, file_path, regex, limit, before, after, pattern_set)
+        return
+    row = _file_row(cache, file_path, regex, mode)
+    if row is not None:
+        yield row
+
+
+def _scan_batch(file_paths: List[str], pattern: str, flags: int, limit: Optional[int],
+                before: int = 0, after: int = 0, mode: str = "content",
+                tags: Optional[Tuple[Tuple[str, ...], Tuple[str, ...]]] = None) -> List[Any]:
+    """
+    Worker entry point: search a batch of files in order.
+
+    Runs in pool processes, so it uses that process's own file cache; the
+    pattern is recompiled from re's compile cache, not per file.
+    """
+    regex = re.compile(pattern, flags)
+    cache = get_file_cache()
+    results: List[Dict[str, Any]] = []
+    for file_path in file_paths:
+        remaining = None if limit is None else limit - len(results)
+        results.extend(_iter_file_results(cache, file_path, regex, remaining, before, after, mode, tags))
+        if limit is not None and len(results) >= limit:
+            break
+    return results
+
+
+def search_workers() -> int:
+    """Number of search workers: SEARCH_WORKERS, or the CPU count."""
+    return max(1, int(os.getenv("SEARCH_WORKERS", str(os.cpu_count() or 1))))
+
+
+_shared_executor: Optional[Executor] = None
+_shared_lock = threading.Lock()
+
+
+def get_search_executor() -> Executor:
+    """
+    Get the process-wide search pool, starting it on first use.
+
+    Regex matching holds the GIL, so worker processes are used to scale
+    with cores; threads are the fallback where processes are unavailable.
+    Size it with SEARCH_WORKERS (default: CPU count).
+    
+    Workers are started from a fork server (or spawned where there is
+    none): forking this process, which runs agent, watcher and worker
+    reader threads, could copy a lock some thread holds and deadlock.
+    """
+    global _shared_executor
+    with _shared_lock:
+        if _shared_executor is None:
+            workers = search_workers()
+            try:
+                try:
+                    context = multiprocessing.get_context("forkserver")
+                except ValueError:
+                    context = multiprocessing.get_context("spawn")
+                _shared_executor = ProcessPoolExecutor(max_workers=workers, mp_context=context)
+            except (OSError, NotImplementedError, ImportError):
+                _shared_executor = ThreadPoolExecutor(max_workers=workers)
+            atexit.register(_shared_executor.shutdown, wait=False, cancel_futures=True)
+        return _shared_executor
+
+
+def _native_safe(file_path: str) -> bool:
+    """
+    Whether a native backend sees this file as the Python engine does.
+
+    rg and git grep match raw bytes as UTF-8, so files sniffed as another
+    encoding (latin-1, UTF-16, ...) are left to the Python engine.
+    """
+    try:
+        kind = sniff_file(file_path)
+    except OSError:
+        return False
+    return not kind.is_binary and kind.encoding == "utf-8"
+
+
+def _walk_order(file_path: str) -> List[str]:
+    """Sort key reproducing the order of a sorted walk_tree()."""
+    return file_path.split(os.sep)
 
 
 class SearchTool(BaseTool):
     """Tool for searching patterns across multiple files."""
     
-    def __init__(self):
+    def __init__(self, file_cache: Optional[FileCache] = None,
+                 executor: Optional[Executor] = None,
+                 scope: Optional[Sequence[str]] = None):
+        """
+        Initialize the search tool.
+        
+        Args:
+            file_cache: Cache of decoded file text (the shared one by default)
+            executor: Pool for parallel search (the shared one by default)
+            scope: Paths that directory searches are limited to, e.g. one
+                agent's part of a codebase; files named directly are still searched
+        """
         super().__init__(
             name="search_tool",
             description="Search for patterns across files and directories"
         )
+        self.file_cache = file_cache if file_cache is not None else get_file_cache()
+        self._executor = executor
+        self.scope = scope
+    
+    @property
+    def executor(self) -> Executor:
+        """Pool for parallel directory search; the shared one unless injected."""
+        if self._executor is None:
+            self._executor = get_search_executor()
+        return self._executor
     
-    def execute(self, pattern: str, path: str = ".", include: Optional[str] = None, 
-                max_results: int = 100) -> ToolResult:
+    def execute(self, pattern: Optional[str] = None, path: str = ".", include: Optional[str] = None, 
+                max_results: int = 100, parallel: bool = True,
+                use_index: bool = False, exclude: Optional[str] = None,
+                max_depth: Optional[int] = None, max_file_size: Optional[int] = None,
+                before_context: int = 0, after_context: int = 0,
+                output_mode: str = "content", patterns: Optional[List[str]] = None,
+                literals: Optional[List[str]] = None, backend: Optional[str] = None) -> ToolResult:
         """
         Search for pattern in files.
         
+        Directory searches honour .gitignore and .ignore files and skip
+        binary files. Several patterns can be searched for at once with
+        `patterns` and `literals`: each file is still scanned only once,
+        and content results list the patterns found on their line.
+        
+        Large directory searches are handed to ripgrep or git grep when
+        installed and able to express the query; results are the same.
+        
         Args:
             pattern: Regular expression pattern to search for
             path: Directory or file path to search in
-            include: Glob pattern to filter files (e.g., '*.py', '*.js')
+            include: Glob pattern to filter files (e.g., '*.py', 'src/**/*.py', '*.{ts,tsx}')
             max_results: Maximum number of results to return
+            parallel: Scan large directory trees on a worker pool
+            use_index: Narrow candidate files with the trigram index of the
+                directory (or an ancestor), if one was built (see
+                `python -m claude_code.indexing build`); otherwise all files are scanned
+            exclude: Gitignore-style pattern(s) to skip (e.g., 'dist/', '*.min.js');
+                brace sets are expanded
+            max_depth: Only descend this many directory levels (1 = top level only)
+            max_file_size: Skip files larger than this many bytes
+            before_context: Lines of context to include before each match
+            after_context: Lines of context to include after each match
+            output_mode: "content" for one record per matching line, or a
+                compact table of files: "files_with_matches", "count" or
+                "first_match_per_file" (max_results then limits files)
+            patterns: Further regular expressions to search for in the same pass
+            literals: Fixed strings to search for in the same pass
+            backend: "auto" (native tool if available), "python", "rg" or
+                "git"; defaults to SEARCH_BACKEND
             
         Returns:
             ToolResult with search results
         """
+        if output_mode not in OUTPUT_MODES:
+            return ToolResult(success=False, error=f"Unknown output mode: {output_mode}. "
+                                                   f"Use one of: {', '.join(OUTPUT_MODES)}")
         try:
-            results = []
-            
-            if os.path.isfile(path):
-                # Search in a single file
-                file_results = self._search_in_file(path, pattern)
-                if file_results:
-                    results.extend(file_results)
-            elif os.path.isdir(path):
-                # Search recursively in directory
-                results = self._search_in_directory(path, pattern, include, max_results)
-            else:
-                return ToolResult(success=False, error=f"Path not found: {path}")
+            index_info: Dict[str, Any] = {}
+            # One extra match lets us tell the output was truncated; the scan
+            # stops there instead of finishing the current file
+            matches = self.iter_matches(
+                pattern, path, include=include, exclude=exclude, max_depth=max_depth,
+                max_file_size=max_file_size, before_context=before_context,
+                after_context=after_context, max_results=max_results + 1,
+                parallel=parallel, use_index=use_index, index_info=index_info,
+                output_mode=output_mode, patterns=patterns, literals=literals,
+                backend=backend
+            )
+            results = list(matches)
             
             # Limit results
             if len(results) > max_results:
@@ -50,87 +409,471 @@ class SearchTool(BaseTool):
             else:
                 truncated = False
             
-            return ToolResult(
-                success=True,
-                data={
-                    "pattern": pattern,
-                    "path": path,
-                    "results": results,
-                    "total_matches": len(results),
-                    "truncated": truncated
-                },
-                metadata={
-                    "pattern": pattern,
-                    "search_path": path,
-                    "total_files_searched": len(set(r["file"] for r in results))
-                }
-            )
+            if output_mode != "content":
+                return self._table_result(pattern, path, output_mode, results, truncated, index_info)
+            
+            metadata = {
+                "pattern": pattern,
+                "search_path": path,
+                "total_files_searched": len(set(r["file"] for r in results))
+            }
+            if index_info:
+                metadata["index"] = index_info
             
+            data = {
+                "pattern": pattern,
+                "path": path,
+                "results": results,
+                "total_matches": len(results),
+                "truncated": truncated
+            }
+            if patterns or literals:
+                labels = ([pattern] if pattern else []) + list(patterns or []) + list(literals or [])
+                counts = dict.fromkeys(labels, 0)
+                for result in results:
+                    for label in result["patterns"]:
+                        counts[label] += 1
+                data["patterns"] = labels
+                data["pattern_counts"] = counts
+            
+            return ToolResult(success=True, data=data, metadata=metadata)
+            
+        except (FileNotFoundError, ValueError) as e:
+            return ToolResult(success=False, error=str(e))
         except re.error as e:
             return ToolResult(success=False, error=f"Invalid regex pattern: {str(e)}")
         except Exception as e:
             return ToolResult(success=False, error=f"Search failed: {str(e)}")
     
-    def _search_in_file(self, file_path: str, pattern: str) -> List[Dict[str, Any]]:
-        """Search for pattern in a single file."""
-        try:
-            with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                lines = f.readlines()
-            
-            results = []
-            regex = re.compile(pattern)
-            
-            for i, line in enumerate(lines):
-                if regex.search(line):
-                    results.append({
-                        "file": file_path,
-                        "line_number": i + 1,
-                        "line_content": line.strip(),
-                        "match": regex.search(line).group() if regex.search(line) else None
-                    })
+    def _table_result(self, pattern: Optional[str], path: str, output_mode: str, rows: List[List[Any]],
+                      truncated: bool, index_info: Dict[str, Any]) -> ToolResult:
+        """Compact tabular payload for the per-file output modes."""
+        data = {
+            "pattern": pattern,
+            "path": path,
+            "output_mode": output_mode,
+            "columns": OUTPUT_MODES[output_mode],
+            "rows": rows,
+            "total_files": len(rows),
+            "truncated": truncated
+        }
+        if output_mode == "count":
+            data["total_matches"] = sum(row[1] for row in rows)
+        metadata = {"pattern": pattern, "search_path": path, "output_mode": output_mode}
+        if index_info:
+            metadata["index"] = index_info
+        return ToolResult(success=True, data=data, metadata=metadata)
+    
+    def iter_matches(self, pattern: Optional[str], path: str = ".", include: Optional[str] = None,
+                     exclude: Optional[str] = None, max_depth: Optional[int] = None,
+                     max_file_size: Optional[int] = None, before_context: int = 0,
+                     after_context: int = 0, max_results: Optional[int] = None,
+                     parallel: bool = True, use_index: bool = False,
+                     cancel: Optional[threading.Event] = None,
+                     index_info: Optional[Dict[str, Any]] = None,
+                     output_mode: str = "content", patterns: Optional[List[str]] = None,
+                     literals: Optional[List[str]] = None,
+                     backend: Optional[str] = None) -> Iterator[Any]:
+        """
+        Yield matches as they are found, in the same order execute() returns them.
+        
+        Files are read and scanned only as the consumer asks for more, so
+        stopping early (closing the generator, breaking out of a loop, or
+        setting `cancel`) stops the scan and cancels queued pool work.
+        
+        Args:
+            pattern: Regular expression pattern to search for
+            path: Directory or file path to search in
+            include, exclude, max_depth, max_file_size: File filters, as for execute()
+            before_context: Lines of context to include before each match
+            after_context: Lines of context to include after each match
+            max_results: Stop after this many matches (None for no limit)
+            parallel: Scan large directory trees on a worker pool
+            use_index: Narrow candidate files with an existing trigram index
+            cancel: Event that stops the scan when set (e.g. from another thread)
+            index_info: Optional dict filled with index statistics
+            output_mode: "content" yields a dict per matching line; other
+                modes (see OUTPUT_MODES) yield one compact row per file
+            patterns: Further regular expressions, combined with `pattern`
+                into a single pass
+            literals: Fixed strings matched in the same pass
+            backend: Native scanner for directory searches: "auto" uses
+                ripgrep or git grep once PARALLEL_MIN_FILES files are
+                found, "rg"/"git" always use that tool, "python" never
+                does; defaults to SEARCH_BACKEND. Queries a tool cannot
+                express, context lines and tool failures use the Python engine.
             
-            return results
-        except Exception:
-            return []  # Skip files that can't be read
-    
-    def _search_in_directory(self, dir_path: str, pattern: str, 
-                           include: Optional[str], max_results: int) -> List[Dict[str, Any]]:
-        """Search recursively in a directory."""
-        results = []
-        
-        # File extensions to search
-        search_extensions = None
-        if include:
-            # Parse glob pattern (simple version)
-            if include.startswith("*."):
-                ext = include[1:]  # Remove '*'
-                search_extensions = [ext]
+        Raises:
+            re.error: If a pattern is invalid (raised immediately)
+            ValueError: If no pattern is given, patterns cannot be combined
+                or the backend is unknown
+            FileNotFoundError: If the path does not exist
+        """
+        tags = None
+        if patterns or literals:
+            pattern_set = get_pattern_set(tuple(([pattern] if pattern else []) + list(patterns or [])),
+                                          tuple(literals or []))
+            regex = pattern_set.regex
+            tags = (pattern_set.patterns, pattern_set.literals)
+        elif pattern is None:
+            raise ValueError("No pattern given")
         else:
-            # Default: search common text files
-            search_extensions = ['.py', '.js', '.ts', '.jsx', '.tsx', '.java', '.cpp', '.c', '.h', 
-                               '.md', '.txt', '.json', '.xml', '.yaml', '.yml', '.html', '.css', '.scss']
+            regex = re.compile(pattern, re.MULTILINE)
+        if not os.path.exists(path):
+            raise FileNotFoundError(f"Path not found: {path}")
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"Unknown output mode: {output_mode}")
+        options = (max(0, before_context), max(0, after_context), output_mode, tags)
+        native = self._select_native(backend, regex, tags, options)
         
-        for root, dirs, files in os.walk(dir_path):
-            # Skip common directories to ignore
-            dirs[:] = [d for d in dirs if d not in ['.git', '__pycache__', 'node_modules', 'venv', '.venv']]
-            
-            for file in files:
-                file_path = os.path.join(root, file)
-                
-                # Check file extension
-                if search_extensions:
-                    if not any(file.endswith(ext) for ext in search_extensions):
-                        continue
-                
-                file_results = self._search_in_file(file_path, pattern)
-                results.extend(file_results)
-                
-                # Check if we've reached max results
-                if len(results) >= max_results:
-                    return results
+        if os.path.isfile(path):
+            files: Iterator[str] = iter([path])
+            parallel = False
+            native = None
+        else:
+            candidates = None
+            if use_index:
+                candidates, info = self._index_candidates(path, regex, include, exclude, max_depth, max_file_size)
+                if index_info is not None:
+                    index_info.update(info)
+            if candidates is not None:
+                files = iter(candidates)
+            else:
+                files = self._iter_candidate_files(path, include, exclude, max_depth, max_file_size)
+            if self.scope is not None:
+                files = self._in_scope(files)
+        return self._iter_file_matches(files, regex, max_results, parallel, options, cancel,
+                                       native, path)
+    
+    async def aiter_matches(self, pattern: Optional[str], path: str = ".", **kwargs) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Async iterator over iter_matches(), scanning on a background thread.
+        
+        Matches are handed over through a small bounded queue, so the scan
+        never runs far ahead of the consumer. Leaving the loop early, or
+        cancelling the consuming task, stops the scan.
+        """
+        loop = asyncio.get_running_loop()
+        cancel = kwargs.pop("cancel", None) or threading.Event()
+        matches = self.iter_matches(pattern, path, cancel=cancel, **kwargs)
+        queue: asyncio.Queue = asyncio.Queue(maxsize=STREAM_QUEUE_SIZE)
+        done = object()
+        
+        def produce():
+            try:
+                for match in matches:
+                    if cancel.is_set():
+                        break
+                    asyncio.run_coroutine_threadsafe(queue.put(match), loop).result()
+            except Exception as e:
+                asyncio.run_coroutine_threadsafe(queue.put(e), loop).result()
+            finally:
+                matches.close()
+                asyncio.run_coroutine_threadsafe(queue.put(done), loop).result()
+        
+        producer = loop.run_in_executor(None, produce)
+        try:
+            while True:
+                item = await queue.get()
+                if item is done:
+                    break
+                if isinstance(item, Exception):
+                    raise item
+                yield item
+        finally:
+            cancel.set()
+            # Unblock a producer waiting on a full queue, then let it finish
+            while not producer.done():
+                try:
+                    queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    await asyncio.sleep(0.01)
+    
+    @staticmethod
+    def _select_native(backend: Optional[str], regex: Pattern, tags: Optional[Tuple],
+                       options: Tuple[Any, ...]) -> Optional[Tuple[SearchBackend, int]]:
+        """
+        The native backend for a query and the file count at which to use it.
+        
+        Returns:
+            Tuple of (backend, minimum files), or None for the Python engine
+        """
+        name = backend or search_backend_setting()
+        if tags:
+            fixed = fixed_strings(tags[0], tags[1])
+        else:
+            fixed = fixed_strings([regex.pattern])
+        native = select_backend(name, regex.pattern, fixed)
+        if native is None or options[0] or options[1]:
+            # Context lines come from the cached file text
+            return None
+        return native, (PARALLEL_MIN_FILES if name == "auto" else 1)
+    
+    def _iter_candidate_files(self, dir_path: str, include: Optional[str], exclude: Optional[str],
+                              max_depth: Optional[int], max_file_size: Optional[int]) -> Iterator[str]:
+        """Walk a directory in sorted order, yielding files that pass the filters."""
+        for rel_path, _ in iter_files(dir_path, include=include, exclude=exclude,
+                                      max_depth=max_depth, max_file_size=max_file_size):
+            yield os.path.join(dir_path, rel_path)
+    
+    def _in_scope(self, files: Iterator[str]) -> Iterator[str]:
+        """The files that lie under one of the scope paths."""
+        scopes = [os.path.abspath(path) for path in self.scope]
+        for file_path in files:
+            full_path = os.path.abspath(file_path)
+            if any(full_path == scope or full_path.startswith(scope + os.sep) for scope in scopes):
+                yield file_path
+    
+    @staticmethod
+    def _compile_filters(include: Optional[str],
+                         exclude: Optional[str]) -> Tuple[Optional[GlobSet], Optional[IgnoreRules]]:
+        """The include and exclude filters compiled once for a query, as iter_files() does."""
+        includes = GlobSet(include) if include else None
+        excludes = None
+        if exclude:
+            patterns = [exclude] if isinstance(exclude, str) else exclude
+            excludes = IgnoreRules("", [p for pattern in patterns for p in expand_braces(pattern.strip())])
+        return includes, excludes
+    
+    @staticmethod
+    def _passes_filters(rel_path: str, full_path: str, includes: Optional[GlobSet],
+                        excludes: Optional[IgnoreRules], max_depth: Optional[int],
+                        max_file_size: Optional[int]) -> bool:
+        """Apply the compiled walk filters to an index candidate ('/'-separated rel_path)."""
+        if includes is not None and not includes.match(rel_path):
+            return False
+        if excludes is not None and excludes.match_path(rel_path):
+            return False
+        if max_depth is not None and rel_path.count("/") >= max_depth:
+            return False
+        if max_file_size is not None:
+            try:
+                return os.path.getsize(full_path) <= max_file_size
+            except OSError:
+                return False
+        return True
+    
+    def _index_candidates(self, dir_path: str, regex: Pattern, include: Optional[str],
+                          exclude: Optional[str], max_depth: Optional[int],
+                          max_file_size: Optional[int]) -> Tuple[Optional[List[str]], Dict[str, Any]]:
+        """
+        Files the trigram index says may match, in walk order.
+        
+        Only an index that already exists is used; none is built here. It is
+        watched from first use, so later queries see changes without
+        diffing the whole tree.
+        
+        Returns:
+            Tuple of (candidate paths, or None without an index, and index
+            statistics for the metadata)
+        """
+        root = find_index_root(dir_path)
+        index = get_trigram_index(root) if root is not None else None
+        if index is None:
+            return None, {"root": None}
+        watcher = index.watch()
+        if watcher.backend == "inotify":
+            # Drain the kernel's event queue so writes made just before the query are seen
+            watcher.flush()
+        
+        scope = os.path.abspath(dir_path)
+        includes, excludes = self._compile_filters(include, exclude)
+        candidates = []
+        for file_path in index.candidates(regex.pattern, regex.flags):
+            if scope != index.root and not file_path.startswith(scope + os.sep):
+                continue
+            rel_path = os.path.relpath(file_path, scope)
+            if self._passes_filters(rel_path.replace(os.sep, "/"), file_path,
+                                    includes, excludes, max_depth, max_file_size):
+                # Report paths the way a directory walk of `dir_path` would
+                candidates.append(os.path.join(dir_path, rel_path))
+        candidates.sort(key=_walk_order)
+        return candidates, {
+            "root": index.root,
+            "indexed_files": len(index.files),
+            "unindexed_files": len(index.unindexed),
+            "candidate_files": len(candidates)
+        }
+    
+    def _iter_file_matches(self, files: Iterator[str], regex: Pattern, limit: Optional[int],
+                           parallel: bool, options: Tuple[Any, ...],
+                           cancel: Optional[threading.Event],
+                           native: Optional[Tuple[SearchBackend, int]] = None,
+                           root: str = ".") -> Iterator[Any]:
+        """
+        Search files in order, stopping after `limit` matches or on cancel.
+        
+        Small sets are scanned in-process. Once PARALLEL_MIN_FILES
+        candidates have been seen, batches are streamed to a native
+        backend (see _select_native) or the worker pool while the
+        producer continues; results are consumed in submission order so
+        output matches a sequential scan.
+        """
+        head: List[str] = []
+        threshold = PARALLEL_MIN_FILES if native is None else min(native[1], PARALLEL_MIN_FILES)
+        if parallel or native is not None:
+            for file_path in files:
+                head.append(file_path)
+                if len(head) >= threshold:
+                    break
+        if native is not None and len(head) >= native[1]:
+            yield from self._iter_native(native[0], root, head, files, regex, limit, options, cancel)
+            return
+        if parallel and len(head) >= PARALLEL_MIN_FILES:
+            yield from self._iter_parallel(head, files, regex, limit, options, cancel)
+            return
+        
+        found = 0
+        for file_path in head or files:
+            if cancel is not None and cancel.is_set():
+                return
+            remaining = None if limit is None else limit - found
+            for result in _iter_file_results(self.file_cache, file_path, regex, remaining, *options):
+                if cancel is not None and cancel.is_set():
+                    return
+                yield result
+                found += 1
+            if limit is not None and found >= limit:
+                return
+    
+    def _iter_native(self, backend: SearchBackend, root: str, head: List[str], rest: Iterator[str],
+                     regex: Pattern, limit: Optional[int], options: Tuple[Any, ...],
+                     cancel: Optional[threading.Event]) -> Iterator[Any]:
+        """
+        Stream file batches through a native backend, in walk order.
         
+        Only files sniffed as UTF-8 are delegated (see _native_safe); the
+        rest of each batch is scanned by the Python engine and merged back
+        in walk order. If the backend fails (e.g. rejects the pattern), that
+        batch and everything after it are scanned by the Python engine instead.
+        """
+        files = itertools.chain(head, rest)
+        found = 0
+        while backend is not None:
+            batch = list(itertools.islice(files, BACKEND_BATCH_SIZE))
+            if not batch:
+                return
+            if cancel is not None and cancel.is_set():
+                return
+            delegated = [file_path for file_path in batch if _native_safe(file_path)]
+            try:
+                results = self._native_batch(backend, root, delegated, regex, limit, options) if delegated else []
+            except BackendError:
+                backend = None
+                files = itertools.chain(batch, files)
+                break
+            by_file: Dict[str, List[Any]] = {}
+            for result in results:
+                by_file.setdefault(result["file"] if isinstance(result, dict) else result[0], []).append(result)
+            native_files = set(delegated)
+            for file_path in batch:
+                if file_path in native_files:
+                    file_results = by_file.get(file_path, ())
+                else:
+                    remaining = None if limit is None else limit - found
+                    file_results = _iter_file_results(self.file_cache, file_path, regex, remaining, *options)
+                for result in file_results:
+                    if cancel is not None and cancel.is_set():
+                        return
+                    yield result
+                    found += 1
+                    if limit is not None and found >= limit:
+                        return
+        remaining = None if limit is None else limit - found
+        yield from self._iter_file_matches(files, regex, remaining, False, options, cancel)
+    
+    @staticmethod
+    def _native_batch(backend: SearchBackend, root: str, batch: List[str], regex: Pattern,
+                      limit: Optional[int], options: Tuple[Any, ...]) -> List[Any]:
+        """
+        Results for one batch from a backend, shaped and ordered like the Python engine's.
+        
+        Each reported line is re-matched with `regex`, which supplies the
+        match text and drops any line the Python engine would not report.
+        """
+        _, _, mode, tags = options
+        pattern_set = get_pattern_set(*tags) if tags else None
+        max_count = 1 if mode in ("files_with_matches", "first_match_per_file") else None
+        if mode == "content":
+            max_count = limit
+        
+        order = {os.path.normpath(os.path.relpath(file_path, root)): i for i, file_path in enumerate(batch)}
+        lines: Dict[int, List[Tuple[int, str]]] = {}
+        for rel_path, line_number, text in backend.iter_lines(root, batch, max_count):
+            index = order.get(os.path.normpath(rel_path))
+            if index is not None:
+                lines.setdefault(index, []).append((line_number, text))
+        
+        results: List[Any] = []
+        for index in sorted(lines):
+            file_path = batch[index]
+            rows = []
+            for line_number, text in sorted(lines[index]):
+                match = regex.search(text)
+                if match is None:
+                    continue
+                if mode == "content":
+                    result = {
+                        "file": file_path,
+                        "line_number": line_number,
+                        "line_content": text.strip(),
+                        "match": match.group()
+                    }
+                    if pattern_set is not None:
+                        result["patterns"] = pattern_set.tags(text + "\n")
+                    rows.append(result)
+                else:
+                    rows.append([file_path, line_number, text.strip()])
+            if not rows:
+                continue
+            if mode == "content":
+                results.extend(rows if limit is None else rows[:limit])
+            elif mode == "count":
+                results.append([file_path, len(rows)])
+            elif mode == "files_with_matches":
+                results.append([file_path])
+            else:
+                results.append(rows[0])
         return results
     
+    def _iter_parallel(self, head: List[str], rest: Iterator[str], regex: Pattern,
+                       limit: Optional[int], options: Tuple[Any, ...],
+                       cancel: Optional[threading.Event]) -> Iterator[Any]:
+        """Stream file batches to the pool, keeping a bounded window in flight."""
+        executor = self.executor
+        window = 2 * search_workers()
+        pending = deque()
+        found = 0
+        
+        def batches() -> Iterator[List[str]]:
+            batch: List[str] = []
+            for file_path in itertools.chain(head, rest):
+                batch.append(file_path)
+                if len(batch) >= SEARCH_BATCH_SIZE:
+                    yield batch
+                    batch = []
+            if batch:
+                yield batch
+        
+        try:
+            for batch in itertools.chain(batches(), [None]):
+                if batch is not None:
+                    pending.append(executor.submit(_scan_batch, batch, regex.pattern, regex.flags,
+                                                   limit, *options))
+                # Drain down to the window while walking; drain fully at the end
+                while pending and (batch is None or len(pending) >= window):
+                    for result in pending.popleft().result():
+                        if cancel is not None and cancel.is_set():
+                            return
+                        yield result
+                        found += 1
+                        if limit is not None and found >= limit:
+                            return
+        finally:
+            # Global stop: drop batches that have not started yet
+            for future in pending:
+                future.cancel()
+    
     def get_parameters_schema(self) -> Dict[str, Any]:
         """Get the parameters schema."""
         return {
@@ -140,6 +883,19 @@ class SearchTool(BaseTool):
                     "type": "string",
                     "description": "Regular expression pattern to search for"
                 },
+                "patterns": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Several regular expressions to search for in one pass; "
+                                   "each match lists the patterns found on its line",
+                    "default": None
+                },
+                "literals": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "Fixed strings (not regexes) to search for in the same pass",
+                    "default": None
+                },
                 "path": {
                     "type": "string",
                     "description": "Directory or file path to search in",
@@ -147,14 +903,63 @@ class SearchTool(BaseTool):
                 },
                 "include": {
                     "type": "string",
-                    "description": "Glob pattern to filter files (e.g., '*.py', '*.js')",
+                    "description": "Glob pattern to filter files (e.g., '*.py', 'src/**/*.py', '*.{ts,tsx}')",
+                    "default": None
+                },
+                "exclude": {
+                    "type": "string",
+                    "description": "Gitignore-style pattern of files or directories to skip (e.g., 'dist/', '*.min.js')",
+                    "default": None
+                },
+                "max_depth": {
+                    "type": "integer",
+                    "description": "Only descend this many directory levels (1 = top level only)",
+                    "default": None
+                },
+                "max_file_size": {
+                    "type": "integer",
+                    "description": "Skip files larger than this many bytes",
                     "default": None
                 },
                 "max_results": {
                     "type": "integer",
                     "description": "Maximum number of results to return",
                     "default": 100
+                },
+                "output_mode": {
+                    "type": "string",
+                    "enum": list(OUTPUT_MODES),
+                    "description": "'content' lists matching lines; 'files_with_matches', 'count' and "
+                                   "'first_match_per_file' return a compact table of files",
+                    "default": "content"
+                },
+                "before_context": {
+                    "type": "integer",
+                    "description": "Lines of context to show before each match (like grep -B)",
+                    "default": 0
+                },
+                "after_context": {
+                    "type": "integer",
+                    "description": "Lines of context to show after each match (like grep -A)",
+                    "default": 0
+                },
+                "parallel": {
+                    "type": "boolean",
+                    "description": "Scan large directory trees on a worker pool",
+                    "default": True
+                },
+                "use_index": {
+                    "type": "boolean",
+                    "description": "Use an existing trigram index to skip files that cannot match",
+                    "default": False
+                },
+                "backend": {
+                    "type": "string",
+                    "enum": BACKEND_CHOICES,
+                    "description": "Scanner for directory searches: 'auto' uses ripgrep or git grep "
+                                   "when installed, 'python' the built-in engine",
+                    "default": None
                 }
             },
-            "required": ["pattern"]
+            "required": []
         }
@@ -0,0 +1,132 @@
+"""Symbol tool for looking up definitions and references through the symbol index."""
+
+import os
+from typing import Optional, Dict, Any
+from .base import BaseTool, ToolResult
+from ..indexing.symbols import DEFINITION_KINDS, find_symbol_root, get_symbol_index
+
+SYMBOL_ACTIONS = ("definitions", "references", "outline", "stats")
+
+
+class SymbolTool(BaseTool):
+    """Tool for finding where symbols are defined, imported and called."""
+
+    def __init__(self):
+        super().__init__(
+            name="symbol_tool",
+            description="Find where classes, functions and variables are defined, imported and called"
+        )
+
+    def execute(self, action: str, name: Optional[str] = None, path: str = ".",
+                kind: Optional[str] = None, max_results: int = 100, build: bool = False) -> ToolResult:
+        """
+        Look up symbols in the persisted symbol index.
+
+        The index covers the nearest directory at or above `path` that has
+        one; only files changed since it was saved are re-parsed, and
+        changes are tracked while watching. Without one, an index is built
+        at `path` only if `build` is set.
+
+        Args:
+            action: "definitions", "references" (call sites and imports),
+                "outline" (all symbols of the file at `path`) or "stats"
+            name: Symbol name, or qualified name such as "Class.method"
+                (for definitions and references)
+            path: Directory to look in, or the file to outline
+            kind: Only this kind: class, function, method, variable or type
+                for definitions; call or import for references
+            max_results: Maximum number of locations to return
+            build: Build an index at `path` if none exists at or above it
+
+        Returns:
+            ToolResult with matching locations
+        """
+        if action not in SYMBOL_ACTIONS:
+            return ToolResult(success=False, error=f"Unknown action: {action}. "
+                                                   f"Use one of: {', '.join(SYMBOL_ACTIONS)}")
+        if action in ("definitions", "references") and not name:
+            return ToolResult(success=False, error=f"name is required for the {action} action")
+        if not os.path.exists(path):
+            return ToolResult(success=False, error=f"Path not found: {path}")
+
+        try:
+            root = find_symbol_root(path)
+            if root is None:
+                if not build:
+                    return ToolResult(success=False, error=f"No symbol index at or above {path}; "
+                                                           "retry with build=true to index it")
+                root = os.path.dirname(os.path.abspath(path)) if os.path.isfile(path) else path
+            index = get_symbol_index(root)
+            index.watch()
+
+            if action == "stats":
+                return ToolResult(success=True, data=index.stats())
+            if action == "outline":
+                outline = index.outline(path)
+                if outline is None:
+                    return ToolResult(success=False, error=f"File is not indexed: {path}")
+                return ToolResult(success=True, data=outline, metadata={"root": index.root})
+
+            if action == "definitions":
+                results = index.definitions(name, kind)
+            else:
+                results = index.references(name, kind)
+            scope = os.path.abspath(path)
+            if scope != index.root:
+                results = [r for r in results if r["file"].startswith(scope + os.sep)]
+
+            return ToolResult(
+                success=True,
+                data={
+                    "name": name,
+                    "action": action,
+                    "results": results[:max_results],
+                    "total": len(results),
+                    "truncated": len(results) > max_results
+                },
+                metadata={"root": index.root, "indexed_files": len(index.files)}
+            )
+
+        except Exception as e:
+            return ToolResult(success=False, error=f"Symbol lookup failed: {str(e)}")
+
+    def get_parameters_schema(self) -> Dict[str, Any]:
+        """Get the parameters schema."""
+        return {
+            "type": "object",
+            "properties": {
+                "action": {
+                    "type": "string",
+                    "enum": list(SYMBOL_ACTIONS),
+                    "description": "'definitions' finds where a symbol is defined, 'references' its call "
+                                   "sites and imports, 'outline' lists the symbols of a file"
+                },
+                "name": {
+                    "type": "string",
+                    "description": "Symbol name, or a qualified name such as 'ClassName.method'",
+                    "default": None
+                },
+                "path": {
+                    "type": "string",
+                    "description": "Directory to look in, or the file to outline",
+                    "default": "."
+                },
+                "kind": {
+                    "type": "string",
+                    "enum": list(DEFINITION_KINDS) + ["call", "import"],
+                    "description": "Only return this kind of definition or reference",
+                    "default": None
+                },
+                "max_results": {
+                    "type": "integer",
+                    "description": "Maximum number of locations to return",
+                    "default": 100
+                },
+                "build": {
+                    "type": "boolean",
+                    "description": "Build a symbol index at 'path' if none exists at or above it",
+                    "default": False
+                }
+            },
+            "required": ["action"]
+        }
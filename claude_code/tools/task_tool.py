@@ -1,21 +1,48 @@
 """Task Tool for creating and managing subagents."""
 
 import asyncio
+import threading
+import time
 import uuid
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable, Union
 from concurrent.futures import ThreadPoolExecutor, Future
 from .base import BaseTool, ToolResult
+from ..budget import Budget
+
+
+# Agent types accepted by create_task and the task tool
+AGENT_TYPES = ["general-purpose", "plan-agent", "explore-agent", "parallel-explore"]
+
+_agent_factories: Dict[str, Callable[..., Any]] = {}
+
+
+def register_agent_type(agent_type: str, factory: Callable[..., Any]) -> None:
+    """Make `agent_type` available to tasks; factory(description, constraints, output_format) -> agent."""
+    _agent_factories[agent_type] = factory
+    if agent_type not in AGENT_TYPES:
+        AGENT_TYPES.append(agent_type)
 
 
 class TaskResult:
     """Result from a task execution."""
     
-    def __init__(self, task_id: str, agent_type: str, status: str, result: Optional[ToolResult] = None, error: Optional[str] = None):
+    def __init__(self, task_id: str, agent_type: str, status: str, result: Optional[ToolResult] = None, error: Optional[str] = None,
+                 depends_on: Optional[List[str]] = None):
         self.task_id = task_id
         self.agent_type = agent_type
         self.status = status  # pending, running, completed, failed
         self.result = result
         self.error = error
+        self.depends_on = depends_on or []
+        self.started_at: Optional[float] = None
+        self.finished_at: Optional[float] = None
+    
+    @property
+    def duration(self) -> Optional[float]:
+        """Seconds the agent ran, once finished."""
+        if self.started_at is None or self.finished_at is None:
+            return None
+        return self.finished_at - self.started_at
     
     def to_dict(self) -> Dict[str, Any]:
         """Convert to dictionary."""
@@ -24,65 +51,147 @@ class TaskResult:
             "agent_type": self.agent_type,
             "status": self.status,
             "result": self.result.to_dict() if self.result else None,
-            "error": self.error
+            "error": self.error,
+            "depends_on": self.depends_on,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+            "duration": self.duration
         }
 
 
 class TaskManager:
-    """Manages running tasks and subagents."""
+    """
+    Manages running tasks and subagents.
+    
+    Tasks may depend on other tasks: they stay pending until every
+    dependency has completed, then start, so independent branches of a
+    dependency graph run concurrently. A task whose dependency fails
+    fails without running.
+    """
     
     def __init__(self):
         self.tasks: Dict[str, TaskResult] = {}
         self.agents: Dict[str, Any] = {}
         self.executor = ThreadPoolExecutor(max_workers=10)
         self._futures: Dict[str, Future] = {}
+        self._waiting: Dict[str, str] = {}  # task_id -> prompt, for tasks blocked on dependencies
+        self._lock = threading.RLock()
     
     def create_task(self, agent_type: str, description: str, prompt: str, 
                    constraints: Optional[str] = None, 
-                   output_format: Optional[str] = None) -> str:
-        """Create a new task with a subagent."""
+                   output_format: Optional[str] = None,
+                   depends_on: Optional[List[str]] = None,
+                   budget: Optional[Budget] = None,
+                   scope: Optional[List[str]] = None) -> str:
+        """
+        Create a new task with a subagent.
+        
+        Args:
+            depends_on: IDs of tasks that must complete before this one starts
+            budget: Token, time, tool-call and cost limits for the agent's run
+            scope: Paths, relative to the working directory, the agent keeps to
+        """
         # Delayed import to avoid circular dependencies
-        from ..agents import GeneralPurposeAgent, PlanAgent, ExploreAgent
+        from ..agents import GeneralPurposeAgent, PlanAgent, ExploreAgent, ParallelExploreAgent
         
         task_id = str(uuid.uuid4())
+        depends_on = list(depends_on or [])
+        unknown = [dep for dep in depends_on if dep not in self.tasks]
+        if unknown:
+            raise ValueError(f"Unknown dependencies: {', '.join(unknown)}")
         
         # Create appropriate agent
-        if agent_type == "general-purpose":
+        if agent_type in _agent_factories:
+            agent = _agent_factories[agent_type](description, constraints, output_format)
+        elif agent_type == "general-purpose":
             agent = GeneralPurposeAgent(description, constraints, output_format)
         elif agent_type == "plan-agent":
             agent = PlanAgent(description, constraints, output_format)
         elif agent_type == "explore-agent":
             agent = ExploreAgent(description, constraints, output_format)
+        elif agent_type == "parallel-explore":
+            agent = ParallelExploreAgent(description, constraints, output_format)
         else:
             raise ValueError(f"Unknown agent type: {agent_type}")
+        if budget is not None:
+            agent.budget = budget
+        if scope is not None:
+            agent.scope = list(scope)
         
-        # Store task and agent
-        self.tasks[task_id] = TaskResult(task_id, agent_type, "pending")
-        self.agents[task_id] = agent
-        
-        # Submit task for execution
-        future = self.executor.submit(self._run_agent, task_id, agent, prompt)
-        self._futures[task_id] = future
+        with self._lock:
+            # Store task and agent
+            self.tasks[task_id] = TaskResult(task_id, agent_type, "pending", depends_on=depends_on)
+            self.agents[task_id] = agent
+            # Resolved when the task finishes, whether or not it has started yet
+            self._futures[task_id] = Future()
+            self._waiting[task_id] = prompt
+            self._schedule(task_id)
         
         return task_id
     
+    def _schedule(self, task_id: str) -> None:
+        """Start a waiting task, or fail it, once its dependencies have finished."""
+        with self._lock:
+            if task_id not in self._waiting:
+                return
+            task = self.tasks[task_id]
+            dependencies = [self.tasks[dep] for dep in task.depends_on]
+            # An agent that ran but reported failure fails its dependents too
+            failed = [dep.task_id for dep in dependencies
+                      if dep.status == "failed" or (dep.result is not None and not dep.result.success)]
+            if failed:
+                del self._waiting[task_id]
+                task.status = "failed"
+                task.error = f"Dependency failed: {', '.join(failed)}"
+                self._finish(task_id)
+            elif all(dep.status == "completed" for dep in dependencies):
+                prompt = self._waiting.pop(task_id)
+                # Submit task for execution
+                try:
+                    self.executor.submit(self._run_agent, task_id, self.agents[task_id], prompt)
+                except Exception as e:
+                    # E.g. the executor was shut down by cleanup()
+                    task.status = "failed"
+                    task.error = f"Could not start task: {str(e)}"
+                    task.finished_at = time.time()
+                    self._finish(task_id)
+    
+    def _finish(self, task_id: str) -> None:
+        """Resolve a finished task's future and release the tasks waiting on it."""
+        try:
+            with self._lock:
+                dependents = [waiting for waiting in self._waiting
+                              if task_id in self.tasks[waiting].depends_on]
+                for dependent in dependents:
+                    self._schedule(dependent)
+        finally:
+            # Waiters must never hang, whatever happened to the dependents
+            future = self._futures[task_id]
+            if not future.done():
+                future.set_result(None)
+    
     def _run_agent(self, task_id: str, agent, prompt: str) -> None:
         """Run an agent in a separate thread."""
+        task = self.tasks[task_id]
         try:
             # Update status to running
-            self.tasks[task_id].status = "running"
+            task.started_at = time.time()
+            task.status = "running"
             
             # Execute agent
             result = agent.execute(prompt)
             
             # Update task result
-            self.tasks[task_id].status = "completed"
-            self.tasks[task_id].result = result
+            task.status = "completed"
+            task.result = result
             
         except Exception as e:
             # Update task with error
-            self.tasks[task_id].status = "failed"
-            self.tasks[task_id].error = str(e)
+            task.status = "failed"
+            task.error = str(e)
+        finally:
+            task.finished_at = time.time()
+            self._finish(task_id)
     
     def get_task_status(self, task_id: str) -> Optional[TaskResult]:
         """Get the status of a task."""
@@ -105,11 +214,12 @@ class TaskManager:
         return self.tasks.get(task_id)
     
     def wait_for_all_tasks(self, timeout: Optional[float] = None) -> List[TaskResult]:
-        """Wait for all tasks to complete."""
+        """Wait for all tasks to complete, for at most `timeout` seconds in total."""
+        deadline = None if timeout is None else time.time() + timeout
         # Wait for all futures
-        for future in self._futures.values():
+        for future in list(self._futures.values()):
             try:
-                future.result(timeout=timeout)
+                future.result(timeout=None if deadline is None else max(0.0, deadline - time.time()))
             except Exception:
                 pass
         
@@ -132,27 +242,32 @@ class TaskTool(BaseTool):
     
     def execute(self, subagent_type: str, description: str, prompt: str,
                 constraints: Optional[str] = None,
-                output_format: Optional[str] = None) -> ToolResult:
+                output_format: Optional[str] = None,
+                depends_on: Optional[List[str]] = None,
+                budget: Optional[Union[Budget, Dict[str, Any]]] = None) -> ToolResult:
         """
         Create and launch a subagent task.
         
         Args:
-            subagent_type: Type of agent to launch (general-purpose, plan-agent, explore-agent)
+            subagent_type: Type of agent to launch (general-purpose, plan-agent, explore-agent,
+                parallel-explore)
             description: Short description of the task
             prompt: The detailed task prompt for the agent
             constraints: Optional constraints or limitations
             output_format: Optional output format template
+            depends_on: IDs of tasks that must complete before this one starts
+            budget: Budget, or its fields as a dict, limiting the agent's tokens,
+                wall time, tool calls and cost
             
         Returns:
             ToolResult with task information
         """
         try:
             # Validate subagent type
-            valid_types = ["general-purpose", "plan-agent", "explore-agent"]
-            if subagent_type not in valid_types:
+            if subagent_type not in AGENT_TYPES:
                 return ToolResult(
                     success=False,
-                    error=f"Invalid subagent_type. Must be one of: {', '.join(valid_types)}"
+                    error=f"Invalid subagent_type. Must be one of: {', '.join(AGENT_TYPES)}"
                 )
             
             # Create task
@@ -161,7 +276,9 @@ class TaskTool(BaseTool):
                 description=description,
                 prompt=prompt,
                 constraints=constraints,
-                output_format=output_format
+                output_format=output_format,
+                depends_on=depends_on,
+                budget=Budget.model_validate(budget) if isinstance(budget, dict) else budget
             )
             
             # Get initial task status
@@ -173,7 +290,8 @@ class TaskTool(BaseTool):
                     "task_id": task_id,
                     "status": task.status,
                     "agent_type": subagent_type,
-                    "description": description
+                    "description": description,
+                    "depends_on": task.depends_on
                 },
                 metadata={
                     "task_id": task_id,
@@ -214,8 +332,8 @@ class TaskTool(BaseTool):
             "properties": {
                 "subagent_type": {
                     "type": "string",
-                    "description": "The type of specialized agent to launch (general-purpose, plan-agent, explore-agent)",
-                    "enum": ["general-purpose", "plan-agent", "explore-agent"]
+                    "description": "The type of specialized agent to launch (general-purpose, plan-agent, explore-agent, or parallel-explore for large codebases)",
+                    "enum": list(AGENT_TYPES)
                 },
                 "description": {
                     "type": "string",
@@ -234,6 +352,24 @@ class TaskTool(BaseTool):
                     "type": "string",
                     "description": "Optional output format template for the task result",
                     "default": None
+                },
+                "depends_on": {
+                    "type": "array",
+                    "items": {"type": "string"},
+                    "description": "IDs of earlier tasks that must complete before this one starts",
+                    "default": None
+                },
+                "budget": {
+                    "type": "object",
+                    "description": "Limits on the agent's run; it stops with a partial result when one is reached",
+                    "properties": {
+                        "max_total_tokens": {"type": "integer"},
+                        "deadline_seconds": {"type": "number"},
+                        "max_tool_calls": {"type": "integer"},
+                        "max_tool_calls_per_tool": {"type": "object", "additionalProperties": {"type": "integer"}},
+                        "max_cost_usd": {"type": "number"}
+                    },
+                    "default": None
                 }
             },
             "required": ["subagent_type", "description", "prompt"]
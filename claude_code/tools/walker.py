@@ -0,0 +1,303 @@
+"""Directory walking with .gitignore support for the file and search tools."""
+
+import os
+import re
+from typing import Optional, List, Iterator, Tuple, Pattern, Sequence, Union
+
+# Directories never worth descending into
+ALWAYS_SKIP_DIRS = {".git", "__pycache__", "node_modules", "venv", ".venv", ".claude_index"}
+
+# Ignore files read in every directory; later files take precedence
+IGNORE_FILES = (".gitignore", ".ignore")
+
+
+def expand_braces(pattern: str) -> List[str]:
+    """
+    Expand brace sets in a glob: ``src/*.{ts,tsx}`` -> ``src/*.ts``, ``src/*.tsx``.
+
+    Nested sets are expanded recursively; unbalanced braces are literal.
+    """
+    start = pattern.find("{")
+    while start >= 0:
+        depth = 0
+        commas = []
+        for i in range(start, len(pattern)):
+            c = pattern[i]
+            if c == "{":
+                depth += 1
+            elif c == "}":
+                depth -= 1
+                if depth == 0:
+                    if not commas:
+                        break  # "{x}" has nothing to expand
+                    bounds = [start] + commas + [i]
+                    head, tail = pattern[:start], pattern[i + 1:]
+                    expanded = []
+                    for a, b in zip(bounds, bounds[1:]):
+                        for option in expand_braces(pattern[a + 1:b]):
+                            expanded.extend(expand_braces(head + option + tail))
+                    return expanded
+            elif c == "," and depth == 1:
+                commas.append(i)
+        start = pattern.find("{", start + 1)
+    return [pattern]
+
+
+def compile_glob(pattern: str) -> Pattern:
+    """
+    Compile a glob into a regex over '/'-separated relative paths.
+
+    ``*`` and ``?`` do not cross directory boundaries, ``**`` matches any
+    number of directories and ``[...]`` is a character class.
+    """
+    i = 0
+    out = []
+    while i < len(pattern):
+        c = pattern[i]
+        if c == "*":
+            if pattern[i:i + 3] == "**/":
+                out.append("(?:.*/)?")
+                i += 3
+                continue
+            if pattern[i:i + 2] == "**":
+                out.append(".*")
+                i += 2
+                continue
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[":
+            end = pattern.find("]", i + 1)
+            if end < 0:
+                out.append(re.escape(c))
+            else:
+                body = pattern[i + 1:end].replace("\\", "\\\\")
+                if body.startswith("!"):
+                    body = "^" + body[1:]
+                out.append(f"[{body}]")
+                i = end
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return re.compile("".join(out) + r"\Z")
+
+
+class GlobSet:
+    """
+    Include patterns compiled to one matcher.
+
+    Patterns without a ``/`` match a file's name anywhere in the tree
+    (``*.py``); patterns with one match its path relative to the walk root
+    (``src/**/*.py``). Brace sets are expanded first.
+    """
+
+    def __init__(self, patterns: Union[str, Sequence[str]]):
+        if isinstance(patterns, str):
+            patterns = [patterns]
+        self.patterns = [p for pattern in patterns for p in expand_braces(pattern.strip())]
+        name_globs, path_globs = [], []
+        for pattern in self.patterns:
+            pattern = pattern[2:] if pattern.startswith("./") else pattern.lstrip("/")
+            (path_globs if "/" in pattern else name_globs).append(compile_glob(pattern).pattern)
+        self._name = re.compile("|".join(f"(?:{p})" for p in name_globs)) if name_globs else None
+        self._path = re.compile("|".join(f"(?:{p})" for p in path_globs)) if path_globs else None
+
+    def match(self, rel_path: str) -> bool:
+        """Whether a '/'-separated relative path matches any pattern."""
+        if self._name and self._name.match(rel_path.rsplit("/", 1)[-1]):
+            return True
+        return bool(self._path and self._path.match(rel_path))
+
+
+class IgnoreRules:
+    """Patterns from one .gitignore file, relative to the directory holding it."""
+
+    def __init__(self, base: str, lines: Sequence[str]):
+        self.base = base  # '/'-separated path relative to the walk root ('' for root)
+        self.rules: List[Tuple[Pattern, bool, bool]] = []
+        for line in lines:
+            line = line.rstrip("\n").rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            if line.startswith("\\"):
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            if not line:
+                continue
+            # A slash anywhere but the end anchors the pattern to `base`
+            if "/" not in line:
+                line = "**/" + line
+            self.rules.append((compile_glob(line.lstrip("/")), negate, dir_only))
+
+    @classmethod
+    def from_file(cls, path: str, base: str) -> Optional["IgnoreRules"]:
+        """Load rules from an ignore file, or None if it does not exist."""
+        try:
+            with open(path, "r", encoding="utf-8", errors="replace") as f:
+                rules = cls(base, f.readlines())
+        except OSError:
+            return None
+        return rules if rules.rules else None
+
+    def match_path(self, rel_path: str) -> bool:
+        """Whether a file, or any directory above it, is ignored by these rules."""
+        parts = rel_path.split("/")
+        for i in range(1, len(parts)):
+            if self.match("/".join(parts[:i]), True):
+                return True
+        return bool(self.match(rel_path, False))
+
+    def match(self, rel_path: str, is_dir: bool) -> Optional[bool]:
+        """
+        Check a root-relative path against these rules.
+
+        Returns:
+            True if ignored, False if explicitly re-included, None if no rule matched
+        """
+        if self.base:
+            if not rel_path.startswith(self.base + "/"):
+                return None
+            rel_path = rel_path[len(self.base) + 1:]
+        result = None
+        for regex, negate, dir_only in self.rules:
+            if dir_only and not is_dir:
+                continue
+            if regex.match(rel_path):
+                result = not negate
+        return result
+
+
+class IgnoreStack:
+    """The ignore rules in effect while walking, innermost last."""
+
+    def __init__(self, extra_patterns: Optional[Sequence[str]] = None):
+        self.layers: List[IgnoreRules] = []
+        self.extra = IgnoreRules("", extra_patterns) if extra_patterns else None
+
+    def push_dir(self, dir_path: str, rel_dir: str, filenames: Sequence[str] = IGNORE_FILES) -> int:
+        """Load ignore files found in a directory; returns how many were pushed."""
+        pushed = 0
+        for name in filenames:
+            rules = IgnoreRules.from_file(os.path.join(dir_path, name), rel_dir)
+            if rules:
+                self.layers.append(rules)
+                pushed += 1
+        return pushed
+
+    def pop(self, count: int) -> None:
+        """Remove the rules pushed for a directory."""
+        if count:
+            del self.layers[-count:]
+
+    def is_ignored(self, rel_path: str, is_dir: bool) -> bool:
+        """Whether a path is ignored; explicit patterns first, then deeper files win."""
+        if self.extra and self.extra.match(rel_path, is_dir):
+            return True
+        for rules in reversed(self.layers):
+            result = rules.match(rel_path, is_dir)
+            if result is not None:
+                return result
+        return False
+
+
+def is_ignored_path(root: str, rel_path: str, is_dir: bool = False) -> bool:
+    """
+    Whether walk_tree(root) would skip a '/'-separated relative path.
+
+    Loads the ignore files of each ancestor directory, so it answers for a
+    single path without walking the tree.
+    """
+    parts = rel_path.split("/")
+    if any(part in ALWAYS_SKIP_DIRS for part in (parts if is_dir else parts[:-1])):
+        return True
+    ignores = IgnoreStack()
+    ignores.push_dir(root, "")
+    for i in range(1, len(parts) + 1):
+        sub_path = "/".join(parts[:i])
+        last = i == len(parts)
+        if ignores.is_ignored(sub_path, is_dir or not last):
+            return True
+        if not last:
+            ignores.push_dir(os.path.join(root, *parts[:i]), sub_path)
+    return False
+
+
+def walk_tree(root: str, max_depth: Optional[int] = None, respect_gitignore: bool = True,
+              ignore_patterns: Optional[Sequence[str]] = None,
+              sort: bool = True) -> Iterator[Tuple[str, os.DirEntry, int]]:
+    """
+    Depth-first walk yielding (relative path, DirEntry, depth) for every entry.
+
+    Uses os.scandir so file type comes from the directory listing and at most
+    one stat per file is needed (and cached on the DirEntry). Ignored
+    directories are pruned without being opened. ``.gitignore`` and
+    ``.ignore`` files are honoured when `respect_gitignore` is set;
+    `ignore_patterns` use the same syntax and always apply.
+    """
+    ignores = IgnoreStack(ignore_patterns)
+
+    def walk(dir_path: str, rel_dir: str, depth: int) -> Iterator[Tuple[str, os.DirEntry, int]]:
+        pushed = ignores.push_dir(dir_path, rel_dir) if respect_gitignore else 0
+        try:
+            try:
+                with os.scandir(dir_path) as it:
+                    entries = list(it)
+            except OSError:
+                return
+            if sort:
+                entries.sort(key=lambda e: e.name)
+            for entry in entries:
+                rel_path = f"{rel_dir}/{entry.name}" if rel_dir else entry.name
+                is_dir = entry.is_dir(follow_symlinks=False)
+                if is_dir and entry.name in ALWAYS_SKIP_DIRS:
+                    continue
+                if ignores.is_ignored(rel_path, is_dir):
+                    continue
+                yield rel_path, entry, depth
+                if is_dir and (max_depth is None or depth < max_depth):
+                    yield from walk(entry.path, rel_path, depth + 1)
+        finally:
+            ignores.pop(pushed)
+
+    yield from walk(root, "", 1)
+
+
+def iter_files(root: str, include: Optional[Union[str, Sequence[str]]] = None,
+               exclude: Optional[Union[str, Sequence[str]]] = None,
+               max_depth: Optional[int] = None, max_file_size: Optional[int] = None,
+               respect_gitignore: bool = True, sort: bool = True) -> Iterator[Tuple[str, os.DirEntry]]:
+    """
+    Yield (relative path, DirEntry) for files to search or index.
+
+    Args:
+        root: Directory to walk
+        include: Glob(s) a file must match (see GlobSet); None for all files
+        exclude: Gitignore-style pattern(s) to skip; matching directories
+            are pruned without being opened. Brace sets are expanded.
+        max_depth: Only descend this many directory levels (1 = root only)
+        max_file_size: Skip files larger than this many bytes
+        respect_gitignore: Honour .gitignore and .ignore files
+        sort: Yield entries in name order
+    """
+    includes = GlobSet(include) if include else None
+    if isinstance(exclude, str):
+        exclude = [exclude]
+    excludes = [p for pattern in exclude or () for p in expand_braces(pattern.strip())]
+
+    for rel_path, entry, _ in walk_tree(root, max_depth=max_depth, respect_gitignore=respect_gitignore,
+                                        ignore_patterns=excludes, sort=sort):
+        if not entry.is_file():
+            continue
+        if includes and not includes.match(rel_path):
+            continue
+        if max_file_size is not None:
+            try:
+                if entry.stat().st_size > max_file_size:
+                    continue
+            except OSError:
+                continue
+        yield rel_path, entry
@@ -6,7 +6,7 @@ import sys
 import os
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from claude_code import ClaudeCode
+from claude_code import ClaudeCode, BashTool
 
 
 def test_bash_tool():
@@ -44,6 +44,245 @@ def test_file_tool():
         print("  ✓ File tool works correctly")
 
 
+def test_file_ranged_read():
+    """Test line, byte and tail reads through the line index."""
+    print("Testing File Ranged Reads...")
+    import tempfile
+    from claude_code.tools import FileTool
+    from claude_code.tools.file_cache import FileCache
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "big.log")
+        with open(path, "w") as f:
+            f.writelines(f"line {i}\n" for i in range(5000))
+        
+        with ClaudeCode() as claude:
+            result = claude.read_file(path, offset=3000, limit=2)
+            assert result.success, f"Ranged read failed: {result.error}"
+            assert result.data["content"] == "line 3000\nline 3001\n", "Line range incorrect"
+            
+            result = claude.read_file(path, tail=2)
+            assert result.data["content"] == "line 4998\nline 4999\n", "Tail read incorrect"
+            
+            result = claude.tools["file"].execute(action="read", file_path=path, byte_offset=5, byte_limit=3)
+            assert result.data["content"] == "0\nl", "Byte range incorrect"
+        
+        # A limit alone reads through the line index without decoding the file,
+        # and files too large for the cache are never stored in it
+        cache = FileCache(max_bytes=4096)
+        file_tool = FileTool(file_cache=cache)
+        result = file_tool.execute(action="read", file_path=path, limit=2)
+        assert result.data["content"] == "line 0\nline 1\n", "Limited read incorrect"
+        assert cache.stats()["misses"] == 0, "Limited read decoded the whole file"
+        assert cache.get(path).text.startswith("line 0\n") and cache.stats()["entries"] == 0, "Oversized file cached"
+        
+        utf16_path = os.path.join(tmp, "wide.txt")
+        with open(utf16_path, "w", encoding="utf-16") as f:
+            f.write("first\nsecond\nthird\n")
+        result = file_tool.execute(action="read", file_path=utf16_path, limit=2)
+        assert result.data["content"] == "first\nsecond\n", f"UTF-16 limited read incorrect: {result.data}"
+    print("  ✓ Ranged reads work correctly")
+
+
+def test_file_read_many():
+    """Test batch reads of several files in one call."""
+    print("Testing File Read Many...")
+    with ClaudeCode() as claude:
+        result = claude.tools["file"].execute(
+            action="read_many",
+            file_path="claude_code/tools",
+            paths=["base.py", "*_tool.py", "missing.py"],
+            limit=3
+        )
+        assert result.success, f"read_many failed: {result.error}"
+        paths = [os.path.basename(f["path"]) for f in result.data["files"]]
+        assert paths[0] == "base.py" and "file_tool.py" in paths, "Files missing from batch"
+        assert all(f["content"].count("\n") <= 3 for f in result.data["files"]), "Line limit ignored"
+        assert result.data["errors"][0]["path"] == "missing.py", "Missing file not reported"
+    
+    # Entries can carry their own line range; the budget counts UTF-8 bytes
+    import tempfile
+    from claude_code.tools import FileTool
+    from claude_code.tools.file_cache import FileCache
+    with tempfile.TemporaryDirectory() as tmp:
+        for name in ("a.txt", "b.txt"):
+            with open(os.path.join(tmp, name), "w", encoding="utf-8") as f:
+                f.write("".join(f"{name} 行 {i}\n" for i in range(10)))
+        file_tool = FileTool(file_cache=FileCache())
+        result = file_tool.execute(action="read_many", file_path=tmp, limit=2,
+                                   paths=["a.txt", {"path": "b.txt", "offset": 5, "limit": 3}])
+        contents = {os.path.basename(f["path"]): f["content"] for f in result.data["files"]}
+        assert contents["a.txt"].count("\n") == 2, "Default limit not applied"
+        assert contents["b.txt"] == "b.txt 行 5\nb.txt 行 6\nb.txt 行 7\n", f"Per-file range ignored: {contents}"
+        assert file_tool.file_cache.stats()["misses"] == 0, "Line range decoded the whole file"
+        
+        with open(os.path.join(tmp, "wide.txt"), "w", encoding="utf-16") as f:
+            f.write("".join(f"wide {i}\n" for i in range(10)))
+        result = file_tool.execute(action="read_many", file_path=tmp,
+                                   paths=[{"path": "wide.txt", "offset": 8}])
+        assert result.data["files"][0]["content"] == "wide 8\nwide 9\n", f"UTF-16 range wrong: {result.data}"
+        assert result.data["files"][0]["truncated"], "Offset range not marked truncated"
+        os.remove(os.path.join(tmp, "wide.txt"))
+        
+        result = file_tool.execute(action="read_many", file_path=tmp, paths=["*.txt"], max_bytes=40)
+        assert result.data["total_size"] <= 40, "Budget counted in characters"
+        assert sum(len(f["content"].encode("utf-8")) for f in result.data["files"]) == result.data["total_size"], \
+            "Reported size is not in bytes"
+    print(f"  ✓ read_many returned {len(paths)} files in one call")
+
+
+def test_file_edit_and_patch():
+    """Test search/replace edits and unified diff patches."""
+    print("Testing File Edit and Patch...")
+    import tempfile
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "module.py")
+        file_tool = ClaudeCode().tools["file"]
+        file_tool.execute(action="write", file_path=path, content="a = 1\nb = 2\nc = 3\n")
+        
+        result = file_tool.execute(action="edit", file_path=path, edits=[{"old": "b = 2", "new": "b = 20"}])
+        assert result.success, f"Edit failed: {result.error}"
+        assert "+b = 20" in result.data["diff"], "Edit diff missing change"
+        
+        result = file_tool.execute(action="edit", file_path=path, edits=[{"old": "missing", "new": "x"}])
+        assert not result.success and "conflict" in result.error, "Conflict not detected"
+        
+        patch = "--- a/module.py\n+++ b/module.py\n@@ -3,1 +3,2 @@\n c = 3\n+d = 4\n"
+        result = file_tool.execute(action="apply_patch", file_path=tmp, content=patch)
+        assert result.success, f"Patch failed: {result.error}"
+        with open(path) as f:
+            assert f.read() == "a = 1\nb = 20\nc = 3\nd = 4\n", "Patched content incorrect"
+        
+        # Two patches to one file in one diff both apply, the second on top of the first
+        patch = ("--- a/module.py\n+++ b/module.py\n@@ -1,1 +1,1 @@\n-a = 1\n+a = 10\n"
+                 "--- a/module.py\n+++ b/module.py\n@@ -4,1 +4,1 @@\n-d = 4\n+d = 40\n")
+        result = file_tool.execute(action="apply_patch", file_path=tmp, content=patch)
+        assert result.success and result.data["files"] == [path], f"Same-file patches failed: {result.error}"
+        with open(path) as f:
+            assert f.read() == "a = 10\nb = 20\nc = 3\nd = 40\n", "Same-file patch lost"
+        
+        # New files get the umask default mode; writes through a symlink keep the link
+        mask = os.umask(0o022)
+        os.umask(mask)
+        new_path = os.path.join(tmp, "fresh.py")
+        file_tool.execute(action="write", file_path=new_path, content="x = 1\n")
+        assert os.stat(new_path).st_mode & 0o777 == 0o666 & ~mask, f"New file mode {oct(os.stat(new_path).st_mode)}"
+        link_path = os.path.join(tmp, "link.py")
+        os.symlink(new_path, link_path)
+        result = file_tool.execute(action="edit", file_path=link_path, edits=[{"old": "x = 1", "new": "x = 2"}])
+        assert result.success and os.path.islink(link_path), "Symlink replaced by a regular file"
+        with open(new_path) as f:
+            assert f.read() == "x = 2\n", "Symlink target not updated"
+    print("  ✓ Edit and apply_patch work correctly")
+
+
+def test_file_cache():
+    """Test the shared file-content cache."""
+    print("Testing File Cache...")
+    import tempfile
+    import time
+    from claude_code.tools import FileTool, SearchTool
+    from claude_code.tools.file_cache import FileCache
+    cache = FileCache()
+    file_tool = FileTool(file_cache=cache)
+    search_tool = SearchTool(file_cache=cache)
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "cached.txt")
+        file_tool.execute(action="write", file_path=path, content="alpha\nbeta\n")
+        file_tool.execute(action="read", file_path=path)
+        search_tool.execute(pattern="beta", path=path)
+        assert cache.stats()["hits"] == 2 and cache.stats()["misses"] == 0, "Write did not populate cache"
+        
+        # An external change must be noticed via the stat validator
+        time.sleep(0.01)
+        with open(path, "w") as f:
+            f.write("gamma\n")
+        result = file_tool.execute(action="read", file_path=path)
+        assert result.data["content"] == "gamma\n", "Stale cached content returned"
+    print("  ✓ File cache works correctly")
+
+
+def test_file_tree():
+    """Test recursive listing with .gitignore, depth limits and pagination."""
+    print("Testing File Tree...")
+    import tempfile
+    from claude_code.tools import FileTool
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "src", "pkg"))
+        os.makedirs(os.path.join(tmp, "build"))
+        for rel in ["src/a.py", "src/pkg/b.py", "build/out.bin", "debug.log"]:
+            with open(os.path.join(tmp, rel), "w") as f:
+                f.write("x" * 10)
+        with open(os.path.join(tmp, ".gitignore"), "w") as f:
+            f.write("build/\n*.log\n")
+        
+        file_tool = FileTool()
+        result = file_tool.execute(action="tree", file_path=tmp)
+        assert result.success, f"Tree failed: {result.error}"
+        paths = [item["path"] for item in result.data["items"]]
+        assert "src/pkg/b.py" in paths, "Nested file missing"
+        assert not any(p.startswith("build") or p.endswith(".log") for p in paths), ".gitignore not honoured"
+        src = next(item for item in result.data["items"] if item["path"] == "src")
+        assert src["size"] == 20, "Directory size not aggregated"
+        
+        result = file_tool.execute(action="tree", file_path=tmp, max_depth=1, page_size=1)
+        assert len(result.data["items"]) == 1 and result.data["next_cursor"], "Pagination incorrect"
+        result = file_tool.execute(action="tree", file_path=tmp, max_depth=1, page_size=1,
+                                   cursor=result.data["next_cursor"])
+        assert result.data["items"][0]["path"] == "src", "Second page incorrect"
+        assert result.data["total_items"] == 2, "Depth limit ignored"
+        assert result.data["items"][0]["size"] == 20, "Sizes below the depth limit not counted"
+        
+        # Later pages come from the walk of the first one
+        first = file_tool.execute(action="tree", file_path=tmp, page_size=2)
+        with open(os.path.join(tmp, "added.txt"), "w") as f:
+            f.write("x")
+        second = file_tool.execute(action="tree", file_path=tmp, page_size=2, cursor=first.data["next_cursor"])
+        paths = [item["path"] for item in first.data["items"] + second.data["items"]]
+        assert "added.txt" not in paths and second.data["total_items"] == first.data["total_items"], "Tree walked again"
+        
+        result = file_tool.execute(action="list", file_path=tmp)
+        names = sorted(item["name"] for item in result.data["items"])
+        assert names == [".gitignore", "added.txt", "src"], f".gitignore not honoured by list: {names}"
+    print("  ✓ Tree listing works correctly")
+
+
+def test_file_encoding_detection():
+    """Test binary sniffing and legacy encoding detection."""
+    print("Testing Encoding Detection...")
+    import tempfile
+    from claude_code.tools import FileTool, SearchTool
+    with tempfile.TemporaryDirectory() as tmp:
+        text_path = os.path.join(tmp, "notes.txt")
+        with open(text_path, "wb") as f:
+            f.write("你好，世界\n第二行\n".encode("gbk"))
+        with open(os.path.join(tmp, "image.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n" + bytes(range(256)) * 4)
+        
+        file_tool = FileTool()
+        result = file_tool.execute(action="read", file_path=text_path)
+        assert result.success and "世界" in result.data["content"], "GBK file not decoded"
+        result = file_tool.execute(action="read", file_path=os.path.join(tmp, "image.png"))
+        assert result.success and result.data["binary"], "Binary file not detected"
+        assert result.data["file_type"] == "image/png", "Magic number not recognised"
+        
+        result = file_tool.execute(action="edit", file_path=text_path,
+                                   edits=[{"old": "第二行", "new": "第三行"}])
+        assert result.success, f"Edit failed: {result.error}"
+        with open(text_path, "rb") as f:
+            assert f.read().decode("gbk").endswith("第三行\n"), "Encoding not preserved on write"
+        
+        result = SearchTool().execute(pattern="世界", path=tmp)
+        assert result.success and result.data["total_matches"] == 1, "Search over mixed tree failed"
+        
+        # Latin-1 also decodes as GB18030; the CJK reading must be plausible to win
+        latin_path = os.path.join(tmp, "latin.txt")
+        with open(latin_path, "wb") as f:
+            f.write("Größe naïve résumés\nÑandús señor\n".encode("latin-1"))
+        result = file_tool.execute(action="read", file_path=latin_path)
+        assert "naïve résumés" in result.data["content"], f"Latin-1 read as mojibake: {result.data['content']!r}"
+    print("  ✓ Binary and encoding detection works correctly")
+
+
 def test_search_tool():
     """Test search tool functionality."""
     print("Testing Search Tool...")
@@ -55,6 +294,860 @@ def test_search_tool():
         print(f"  ✓ Search tool found {result.data['total_matches']} matches")
 
 
+def test_search_single_pass():
+    """Test whole-buffer search line numbers and early stopping."""
+    print("Testing Single-Pass Search...")
+    import tempfile
+    from claude_code.tools import SearchTool
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "data.txt")
+        with open(path, "w") as f:
+            f.write("alpha\nbeta\r\n\ngamma beta\nbeta")
+        
+        search_tool = SearchTool()
+        result = search_tool.execute(pattern="^beta$|gamma", path=path)
+        assert result.success, f"Search failed: {result.error}"
+        assert [r["line_number"] for r in result.data["results"]] == [2, 4, 5], "Wrong line numbers"
+        assert result.data["results"][1]["match"] == "gamma", "Wrong match text"
+        
+        result = search_tool.execute(pattern="beta", path=path, max_results=2)
+        assert result.data["total_matches"] == 2 and result.data["truncated"], "Early stop incorrect"
+        
+        result = search_tool.execute(pattern="(unclosed", path=path)
+        assert not result.success, "Invalid regex not reported"
+    print("  ✓ Single-pass search works correctly")
+
+
+def test_search_parallel():
+    """Test that parallel directory search matches a sequential scan."""
+    print("Testing Parallel Search...")
+    import tempfile
+    from claude_code.tools import SearchTool
+    from claude_code.tools.search_tool import PARALLEL_MIN_FILES
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(PARALLEL_MIN_FILES + 50):
+            sub = os.path.join(tmp, f"pkg{i % 7}")
+            os.makedirs(sub, exist_ok=True)
+            with open(os.path.join(sub, f"mod{i}.py"), "w") as f:
+                f.write(f"x = {i}\n" + ("TOKEN here\n" if i % 3 == 0 else ""))
+        
+        search_tool = SearchTool()
+        sequential = search_tool.execute(pattern="TOKEN", path=tmp, max_results=1000, parallel=False)
+        parallel = search_tool.execute(pattern="TOKEN", path=tmp, max_results=1000)
+        assert parallel.success, f"Parallel search failed: {parallel.error}"
+        assert parallel.data["results"] == sequential.data["results"], "Parallel order differs"
+        
+        limited = search_tool.execute(pattern="TOKEN", path=tmp, max_results=5)
+        assert limited.data["results"] == sequential.data["results"][:5], "Global stop incorrect"
+        assert limited.data["truncated"], "Truncation not reported"
+    print(f"  ✓ Parallel search found {parallel.data['total_matches']} matches in order")
+
+
+def test_trigram_index():
+    """Test trigram index candidate narrowing and refresh."""
+    print("Testing Trigram Index...")
+    import tempfile
+    from claude_code.tools import SearchTool
+    from claude_code.indexing import build_index, refresh_index, get_trigram_index
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(20):
+            with open(os.path.join(tmp, f"mod{i}.py"), "w") as f:
+                f.write(f"def handler_{i}():\n    return {i}\n" + ("# Needle marker\n" if i in (3, 7) else ""))
+        
+        with open(os.path.join(tmp, "logo.png"), "wb") as f:
+            f.write(b"\x89PNG\r\n\x1a\n\x00\x00" * 64)
+        
+        stats = build_index(tmp)
+        assert stats["files"] == 20, "Files not indexed"
+        assert stats["skipped_files"] == 1, "Binary not listed as skipped"
+        index = get_trigram_index(tmp)
+        assert not index.is_stale(), "Binary file makes a fresh index stale"
+        index.rescan()
+        index.candidates("needle")
+        assert index.pending_changes() == 0, "Unchanged binary re-read by rescan"
+        candidates = [os.path.basename(p) for p in index.candidates("(?i)needle")]
+        assert candidates == ["mod3.py", "mod7.py"], f"Wrong candidates: {candidates}"
+        assert len(index.candidates(r"handler_\d+")) == 20, "Literal prefix over-filtered"
+        
+        search_tool = SearchTool()
+        indexed = search_tool.execute(pattern="Needle", path=tmp, use_index=True)
+        scanned = search_tool.execute(pattern="Needle", path=tmp)
+        assert indexed.data["results"] == scanned.data["results"], "Indexed search differs from scan"
+        assert indexed.metadata["index"]["candidate_files"] == 2, "Index not used"
+        assert index.watched, "Queried index not watched"
+        
+        assert not refresh_index(tmp)["rebuilt"], "Fresh index rebuilt"
+        with open(os.path.join(tmp, "new.py"), "w") as f:
+            f.write("needle = True\n")
+        assert refresh_index(tmp)["rebuilt"], "Stale index not rebuilt"
+        assert len(get_trigram_index(tmp).candidates("needle")) == 3, "Refresh missed new file"
+        
+        # Oversized files are not indexed but still searched, even when added later
+        with open(os.path.join(tmp, "generated.py"), "w") as f:
+            f.write("x = 1\n" * 400000 + "needle_here = 1\n")
+        indexed = search_tool.execute(pattern="needle_here", path=tmp, use_index=True)
+        assert [os.path.basename(r["file"]) for r in indexed.data["results"]] == ["generated.py"], "Large file lost"
+        build_index(tmp)
+        assert get_trigram_index(tmp).stats()["unindexed_files"] == 1, "Large file not listed"
+        indexed = search_tool.execute(pattern="needle_here", path=tmp, use_index=True)
+        assert len(indexed.data["results"]) == 1, "Unindexed file not a candidate"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "a.py"), "w") as f:
+            f.write("needle = 1\n")
+        result = SearchTool().execute(pattern="needle", path=tmp, use_index=True)
+        assert len(result.data["results"]) == 1, "Search without an index failed"
+        assert not os.path.exists(os.path.join(tmp, ".claude_index")), "Index built as a side effect"
+    print("  ✓ Trigram index works correctly")
+
+
+def test_search_filters():
+    """Test glob include/exclude, ignore files, depth and size limits."""
+    print("Testing Search Filters...")
+    import tempfile
+    import claude_code.tools.search_tool as search_module
+    from claude_code.indexing import build_index
+    from claude_code.tools import SearchTool
+    with tempfile.TemporaryDirectory() as tmp:
+        files = {
+            "src/app.ts": "TOKEN\n",
+            "src/view.tsx": "TOKEN\n",
+            "src/deep/util.ts": "TOKEN\n",
+            "src/app.js": "TOKEN\n",
+            "dist/bundle.ts": "TOKEN\n",
+            "vendor/lib.ts": "TOKEN\n",
+            "big.ts": "TOKEN\n" + "x" * 5000,
+        }
+        for rel, content in files.items():
+            os.makedirs(os.path.join(tmp, os.path.dirname(rel)), exist_ok=True)
+            with open(os.path.join(tmp, rel), "w") as f:
+                f.write(content)
+        with open(os.path.join(tmp, ".gitignore"), "w") as f:
+            f.write("dist/\n")
+        with open(os.path.join(tmp, ".ignore"), "w") as f:
+            f.write("vendor/\n")
+        
+        search_tool = SearchTool()
+        
+        def found(**kwargs):
+            result = search_tool.execute(pattern="TOKEN", path=tmp, **kwargs)
+            assert result.success, f"Search failed: {result.error}"
+            return sorted(os.path.relpath(r["file"], tmp).replace(os.sep, "/") for r in result.data["results"])
+        
+        assert found(include="*.{ts,tsx}") == ["big.ts", "src/app.ts", "src/deep/util.ts", "src/view.tsx"], "Brace include failed"
+        assert found(include="src/**/*.ts") == ["src/app.ts", "src/deep/util.ts"], "Path glob failed"
+        assert found(include="*.ts", exclude="deep/") == ["big.ts", "src/app.ts"], "Exclude failed"
+        assert found(include="*.ts", max_depth=2) == ["big.ts", "src/app.ts"], "Depth limit failed"
+        assert found(include="*.ts", max_file_size=1000) == ["src/app.ts", "src/deep/util.ts"], "Size limit failed"
+        
+        # Index candidates get the same filters, compiled once per query
+        build_index(tmp)
+        compiled = []
+        glob_set = search_module.GlobSet
+        
+        class CountingGlobSet(glob_set):
+            def __init__(self, *args):
+                compiled.append(args)
+                super().__init__(*args)
+        
+        search_module.GlobSet = CountingGlobSet
+        try:
+            assert found(include="*.ts", exclude="deep/", use_index=True) == ["big.ts", "src/app.ts"], "Index filters differ"
+        finally:
+            search_module.GlobSet = glob_set
+        assert len(compiled) == 1, f"Include glob compiled {len(compiled)} times"
+    print("  ✓ Search filters work correctly")
+
+
+def test_search_streaming():
+    """Test streaming matches with context lines and early cancellation."""
+    print("Testing Streaming Search...")
+    import asyncio
+    import tempfile
+    import threading
+    from claude_code.tools import SearchTool
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(5):
+            with open(os.path.join(tmp, f"part{i}.txt"), "w") as f:
+                f.write("\n".join(f"line {n} HIT" if n % 10 == 0 else f"line {n}" for n in range(50)) + "\n")
+        
+        search_tool = SearchTool()
+        matches = search_tool.iter_matches("HIT", tmp, before_context=2, after_context=1)
+        first, second = next(matches), next(matches)
+        assert first["line_number"] == 1 and first["before"] == [], "Wrong first match"
+        assert second["before"] == ["line 8", "line 9"] and second["after"] == ["line 11"], "Wrong context"
+        matches.close()
+        
+        cancel = threading.Event()
+        seen = []
+        for match in search_tool.iter_matches("HIT", tmp, cancel=cancel):
+            seen.append(match)
+            if len(seen) == 3:
+                cancel.set()
+        assert len(seen) == 3, "Cancellation ignored"
+        
+        async def first_two():
+            found = []
+            async for match in search_tool.aiter_matches("HIT", tmp):
+                found.append(match["line_number"])
+                if len(found) == 2:
+                    break
+            return found
+        assert asyncio.run(first_two()) == [1, 11], "Async iteration failed"
+        
+        result = search_tool.execute(pattern="HIT", path=tmp, max_results=4, after_context=1)
+        assert result.data["truncated"] and len(result.data["results"]) == 4, "execute() limit incorrect"
+        assert result.data["results"][0]["after"] == ["line 1"], "execute() context missing"
+    print("  ✓ Streaming search works correctly")
+
+
+def test_search_output_modes():
+    """Test files_with_matches, count and first_match_per_file modes."""
+    print("Testing Search Output Modes...")
+    import tempfile
+    from claude_code.tools import SearchTool
+    with tempfile.TemporaryDirectory() as tmp:
+        for name, hits in [("a.txt", 3), ("b.txt", 0), ("c.txt", 1)]:
+            with open(os.path.join(tmp, name), "w") as f:
+                f.write("intro\n" + "TODO fix\n" * hits)
+        
+        search_tool = SearchTool()
+        result = search_tool.execute(pattern="TODO", path=tmp, output_mode="files_with_matches")
+        assert result.success, f"Search failed: {result.error}"
+        assert [os.path.basename(row[0]) for row in result.data["rows"]] == ["a.txt", "c.txt"], "Wrong files"
+        
+        result = search_tool.execute(pattern="TODO", path=tmp, output_mode="count")
+        assert result.data["columns"] == ["file", "count"], "Wrong columns"
+        assert [row[1] for row in result.data["rows"]] == [3, 1] and result.data["total_matches"] == 4, "Wrong counts"
+        
+        result = search_tool.execute(pattern="TODO", path=tmp, output_mode="first_match_per_file", max_results=1)
+        assert result.data["rows"][0][1:] == [2, "TODO fix"] and result.data["truncated"], "Wrong first match"
+        
+        assert not search_tool.execute(pattern="TODO", path=tmp, output_mode="bogus").success, "Bad mode accepted"
+    print("  ✓ Search output modes work correctly")
+
+
+def test_search_multi_pattern():
+    """Test searching several regexes and literals in one pass."""
+    print("Testing Multi-Pattern Search...")
+    import tempfile
+    from claude_code.tools import SearchTool
+    from claude_code.tools.aho_corasick import AhoCorasick
+    assert sorted(AhoCorasick(["he", "she", "hers"]).iter_matches("ushers")) == [(1, 1), (2, 0), (2, 2)], "Bad automaton"
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "a.py"), "w") as f:
+            f.write("import os\n# TODO: fix\nvalue = 1 + 2\nx = 3\n")
+        
+        search_tool = SearchTool()
+        result = search_tool.execute(patterns=[r"(?i)todo", r"^import \w+"], literals=["1 + 2", "os"], path=tmp)
+        assert result.success, f"Search failed: {result.error}"
+        tagged = [(r["line_number"], r["patterns"]) for r in result.data["results"]]
+        assert tagged == [(1, [r"^import \w+", "os"]), (2, [r"(?i)todo"]), (3, ["1 + 2"])], f"Wrong tags: {tagged}"
+        assert result.data["pattern_counts"]["os"] == 1, "Wrong pattern counts"
+        
+        assert not search_tool.execute(path=tmp).success, "Search without a pattern accepted"
+    print("  ✓ Multi-pattern search works correctly")
+
+
+def test_search_backends():
+    """Test native search backends and the fallback to the Python engine."""
+    print("Testing Search Backends...")
+    import json
+    import shutil
+    import tempfile
+    from claude_code.tools import SearchTool
+    from claude_code.tools.search_backends import RipgrepBackend, fixed_strings, rust_compatible
+    assert fixed_strings([r"a\.b"], ["c"]) == ["a.b", "c"] and fixed_strings(["a+"]) is None, "Bad literal detection"
+    assert rust_compatible(r"(?i)\bfoo\d+") and not rust_compatible(r"(?<=a)b"), "Bad compatibility check"
+    message = {"type": "match", "data": {"path": {"text": "a.py"}, "lines": {"text": "x = 1\n"}, "line_number": 3}}
+    lines = [json.dumps({"type": "begin"}).encode(), json.dumps(message).encode()]
+    assert list(RipgrepBackend("x").parse(lines)) == [("a.py", 3, "x = 1")], "Bad rg JSON parsing"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        for i in range(3):
+            with open(os.path.join(tmp, f"f{i}.py"), "w") as f:
+                f.write("x = 1\n# TODO one\n" * (i + 1))
+        search_tool = SearchTool()
+        expected = search_tool.execute(pattern="TODO", path=tmp, backend="python")
+        for backend in ("git", "rg", "auto"):
+            # Missing tools and unsupported queries fall back to Python
+            result = search_tool.execute(pattern="TODO", path=tmp, backend=backend)
+            assert result.success and result.data["results"] == expected.data["results"], f"{backend} differs"
+        result = search_tool.execute(pattern="TO+DO", path=tmp, backend="git", output_mode="count")
+        assert [row[1] for row in result.data["rows"]] == [1, 2, 3], "Fallback counts wrong"
+        assert not search_tool.execute(pattern="x", path=tmp, backend="bogus").success, "Bad backend accepted"
+        if shutil.which("git"):
+            result = search_tool.execute(literals=["x = 1", "TODO"], path=tmp, backend="git", max_results=2)
+            assert [r["patterns"] for r in result.data["results"]] == [["x = 1"], ["TODO"]], "git backend tags wrong"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        # Enough files for auto to delegate; non-UTF-8 files stay with Python
+        for i in range(300):
+            with open(os.path.join(tmp, f"f{i:03}.txt"), "w") as f:
+                f.write("plain text\n")
+        for name, encoding in (("latin.txt", "latin-1"), ("wide.txt", "utf-16"), ("utf8.txt", "utf-8")):
+            with open(os.path.join(tmp, name), "w", encoding=encoding) as f:
+                f.write("menu\ncafé au lait\n")
+        search_tool = SearchTool()
+        expected = search_tool.execute(pattern="café", path=tmp, backend="python")
+        assert len(expected.data["results"]) == 3, "Python engine missed an encoding"
+        for backend in ("auto", "git", "rg"):
+            result = search_tool.execute(pattern="café", path=tmp, backend=backend)
+            assert result.data["results"] == expected.data["results"], f"{backend} missed non-UTF-8 files"
+    print("  ✓ Search backends work correctly")
+
+
+def test_symbol_index():
+    """Test the AST symbol index and symbol tool."""
+    print("Testing Symbol Index...")
+    import tempfile
+    from claude_code.tools import SymbolTool
+    from claude_code.indexing import SymbolIndex, get_symbol_index
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "shapes.py"), "w") as f:
+            f.write("import math\n\nclass Circle:\n    def area(self):\n        return math.pi * square(self.r)\n\n"
+                    "def square(x):\n    return x * x\n")
+        with open(os.path.join(tmp, "app.ts"), "w") as f:
+            f.write("import { square } from './shapes';\nexport function main() {\n  return square(2);\n}\n")
+        
+        symbol_tool = SymbolTool()
+        result = symbol_tool.execute(action="definitions", name="Circle.area", path=tmp)
+        assert not result.success and "build=true" in result.error, "Index built without build=true"
+        assert not os.path.exists(os.path.join(tmp, ".claude_index")), "Index written without build=true"
+        result = symbol_tool.execute(action="definitions", name="Circle.area", path=tmp, build=True)
+        assert result.success, f"Lookup failed: {result.error}"
+        assert [(r["kind"], r["line"]) for r in result.data["results"]] == [("method", 4)], "Wrong definition"
+        
+        result = symbol_tool.execute(action="references", name="square", path=tmp)
+        found = sorted((os.path.basename(r["file"]), r["kind"], r["line"]) for r in result.data["results"])
+        assert found == [("app.ts", "call", 3), ("app.ts", "import", 1), ("shapes.py", "call", 5)], f"Wrong references: {found}"
+        
+        # Persisted; only the changed file is re-extracted
+        with open(os.path.join(tmp, "shapes.py"), "a") as f:
+            f.write("\ndef cube(x):\n    return x ** 3\n")
+        index = SymbolIndex(tmp)
+        assert len(index.files) == 2, "Index not persisted"
+        assert index.update()["updated"] == 1, "Unchanged files re-extracted"
+        assert index.definitions("cube")[0]["line"] == 10, "Changed file not re-indexed"
+        
+        assert not symbol_tool.execute(action="definitions", path=tmp).success, "Missing name accepted"
+        get_symbol_index(tmp).unwatch()
+    print("  ✓ Symbol index works correctly")
+
+
+def test_bm25_retrieval():
+    """Test the BM25 chunk index and retrieve tool."""
+    print("Testing BM25 Retrieval...")
+    import tempfile
+    from claude_code.tools import RetrieveTool
+    from claude_code.indexing import BM25Index
+    from claude_code.indexing.bm25 import tokenize
+    assert tokenize("parseConfig file_cache") == ["parseconfig", "parse", "config", "file_cache", "file", "cache"], "Bad tokens"
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "net.py"), "w") as f:
+            f.write("class HttpClient:\n    def retry_request(self, url):\n        return backoff(url)\n\n"
+                    "def parse_headers(raw):\n    return dict(line.split(':') for line in raw)\n")
+        with open(os.path.join(tmp, "README.md"), "w") as f:
+            f.write("# Project\n\nRetries use exponential backoff.\n\nHeaders are parsed lazily.\n")
+        
+        retrieve = RetrieveTool()
+        assert retrieve.preamble("retry", path=tmp) == "", "Preamble without an index"
+        assert not retrieve.execute(query="retry", path=tmp).success, "Index built without build=True"
+        assert not os.path.exists(os.path.join(tmp, ".claude_index")), "Index written as a side effect"
+        result = retrieve.execute(query="retry request with backoff", path=tmp, top_k=2, build=True)
+        assert result.success, f"Retrieval failed: {result.error}"
+        top = result.data["results"][0]
+        assert (os.path.basename(top["file"]), top["title"], top["start_line"]) == ("net.py", "HttpClient.retry_request", 2), f"Wrong top chunk: {top}"
+        
+        # Only the changed file is re-chunked
+        with open(os.path.join(tmp, "net.py"), "a") as f:
+            f.write("\ndef open_socket(host):\n    return host\n")
+        index = BM25Index(tmp)
+        assert index.update()["updated"] == 1, "Unchanged files re-chunked"
+        assert index.search("socket", 1)[0]["title"] == "open_socket", "Changed file not re-indexed"
+        
+        preamble = retrieve.preamble("parse headers", path=tmp, top_k=1)
+        assert "parse_headers" in preamble and "def parse_headers" in preamble, "Preamble missing chunk"
+        preamble = retrieve.preamble("parse headers", path=tmp, top_k=5, scope=["README.md"])
+        assert "README.md" in preamble and "net.py" not in preamble, f"Scope not applied: {preamble}"
+    print("  ✓ BM25 retrieval works correctly")
+
+
+def test_path_finder():
+    """Test fuzzy file finding through the cached path index."""
+    print("Testing Path Finder...")
+    import tempfile
+    from claude_code.tools import FileTool
+    from claude_code.indexing import fuzzy_match, get_path_index
+    from claude_code.indexing.watcher import is_watched, watch_directory
+    assert fuzzy_match("cfg", "src/config.py")[0] > fuzzy_match("cfg", "cli/fancy/gui.py")[0], "Basename not preferred"
+    assert fuzzy_match("xyz", "src/config.py") is None, "Non-subsequence matched"
+    with tempfile.TemporaryDirectory() as tmp:
+        for rel in ["src/search_tool.py", "src/tools/settings.py", "docs/search.md", "build/search_tool.py"]:
+            os.makedirs(os.path.join(tmp, os.path.dirname(rel)), exist_ok=True)
+            open(os.path.join(tmp, rel), "w").close()
+        with open(os.path.join(tmp, ".gitignore"), "w") as f:
+            f.write("build/\n")
+        
+        file_tool = FileTool()
+        result = file_tool.execute(action="find", file_path=tmp, pattern="srchtool")
+        assert result.success, f"Find failed: {result.error}"
+        assert [m["path"] for m in result.data["matches"]] == ["src/search_tool.py"], f"Wrong matches: {result.data}"
+        result = file_tool.execute(action="find", file_path=tmp, pattern="src st", limit=1)
+        assert result.data["total_matches"] == 2 and len(result.data["matches"]) == 1, f"Terms not combined: {result.data}"
+        
+        # New files arrive through the change bus without a rescan
+        index = get_path_index(tmp)
+        open(os.path.join(tmp, "src", "fresh_module.py"), "w").close()
+        watch_directory(tmp, holder=index).flush()
+        result = file_tool.execute(action="find", file_path=tmp, pattern="frshmod")
+        assert [m["path"] for m in result.data["matches"]] == ["src/fresh_module.py"], f"New file not found: {result.data}"
+        
+        # Releasing the index stops its watcher; the next find walks the tree again
+        index.unwatch()
+        assert not is_watched(tmp), "Watcher still running after unwatch"
+        open(os.path.join(tmp, "docs", "later_notes.md"), "w").close()
+        assert file_tool.execute(action="find", file_path=tmp, pattern="latrnotes").data["total_matches"] == 1, \
+            "File created while unwatched not found"
+        index.unwatch()
+    print("  ✓ Path finder works correctly")
+
+
+def test_repo_map():
+    """Test the token-budgeted repository map and its caches."""
+    print("Testing Repository Map...")
+    import tempfile
+    from claude_code.indexing import RepoMap, repo_map_preamble
+    with tempfile.TemporaryDirectory() as tmp:
+        os.makedirs(os.path.join(tmp, "pkg", "core"))
+        with open(os.path.join(tmp, "pkg", "core", "engine.py"), "w") as f:
+            f.write("class Engine:\n    def run(self):\n        pass\n\ndef _helper():\n    pass\n")
+        with open(os.path.join(tmp, "cli.py"), "w") as f:
+            f.write("def main():\n    pass\n\nif __name__ == '__main__':\n    main()\n")
+        for i in range(40):
+            with open(os.path.join(tmp, "pkg", f"module_{i}.py"), "w") as f:
+                f.write(f"def function_number_{i}():\n    return {i}\n")
+        
+        repo_map = RepoMap(tmp)
+        repo_map.update()
+        text = repo_map.render(2000)
+        assert "Entry points: cli.py" in text and "Python 42 files" in text, f"Bad header: {text}"
+        assert "engine.py (6): Engine" in text and "_helper" not in text, f"Bad symbols: {text}"
+        assert text.index("  core/") < text.index("  module_0.py"), "Directories not listed first"
+        small = repo_map.render(150)
+        assert len(small) <= 150 * 4 and "pkg/ (41 files" in small, f"Budget not applied: {small}"
+        
+        # A fresh instance renders from the on-disk cache for the same fingerprint
+        reloaded = RepoMap(tmp)
+        assert reloaded.fingerprint() == repo_map.fingerprint(), "Fingerprint not stable"
+        reloaded._render = None
+        assert reloaded.render(2000) == text, "Rendered map not cached on disk"
+        
+        with open(os.path.join(tmp, "cli.py"), "a") as f:
+            f.write("\nclass Settings:\n    pass\n")
+        assert repo_map.update()["updated"] == 1, "Unchanged files re-read"
+        assert "cli.py (8): main, Settings" in repo_map.render(2000), "Map not refreshed"
+        assert repo_map_preamble(tmp).startswith("Repository map"), "Preamble missing"
+        scoped = repo_map_preamble(os.path.join(tmp, "pkg"), scope=["core/"])
+        assert "engine.py" in scoped and "cli.py" not in scoped and "module_0" not in scoped, f"Bad scope: {scoped}"
+        assert "cli.py" not in repo_map_preamble(os.path.join(tmp, "pkg")), "Path not used as scope"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        with open(os.path.join(tmp, "app.py"), "w") as f:
+            f.write("def main():\n    pass\n")
+        assert repo_map_preamble(tmp) == "", "Preamble without a saved map"
+        assert not os.path.exists(os.path.join(tmp, ".claude_index")), "Map built as a side effect"
+    print("  ✓ Repository map works correctly")
+
+
+def test_partition_tree():
+    """Test partitioning a tree for the parallel explore agent."""
+    print("Testing Tree Partitioning...")
+    import tempfile
+    from claude_code.agents import ParallelExploreAgent, partition_tree
+    from claude_code.tools import SearchTool
+    from claude_code.tools.base import ToolResult
+    from claude_code.tools.task_tool import TaskManager, TaskTool, _agent_factories, register_agent_type
+    with tempfile.TemporaryDirectory() as tmp:
+        layout = {"big/a": 4, "big/b": 4, "big/c/d": 4, "small/x": 1, "small/y": 1, "top": 2}
+        for rel, kb in layout.items():
+            os.makedirs(os.path.dirname(os.path.join(tmp, rel)), exist_ok=True)
+            with open(os.path.join(tmp, rel + ".py"), "w") as f:
+                f.write("x" * kb * 1024)
+        
+        partitions = partition_tree(tmp, 3)
+        assert 1 < len(partitions) <= 3, f"Bad partition count: {partitions}"
+        covered = sum(p["files"] for p in partitions)
+        assert covered == len(layout), f"Files lost or duplicated: {partitions}"
+        paths = [path for p in partitions for path in p["paths"]]
+        assert "big/" not in paths and "small/" in paths, f"Heavy directory not split: {paths}"
+        assert max(p["bytes"] for p in partitions) <= 8 * 1024, f"Unbalanced partitions: {partitions}"
+        assert len(partition_tree(tmp, 1)) == 1, "Single partition not honoured"
+        
+        # A partition is the working scope of directory searches
+        part = min(partitions, key=lambda p: p["files"])
+        search = SearchTool(scope=[os.path.join(tmp, path) for path in part["paths"]])
+        result = search.execute(pattern="^x", path=tmp, output_mode="files_with_matches", parallel=False)
+        assert result.success and result.data["total_files"] == part["files"], f"Scope not applied: {result.data}"
+    
+    class ScopeAgent:
+        def __init__(self, description, constraints=None, output_format=None):
+            self.scope = None
+        
+        def execute(self, prompt):
+            return ToolResult(success=True, data={"scope": self.scope})
+    
+    register_agent_type("test-scope", ScopeAgent)
+    manager = TaskManager()
+    try:
+        task_id = manager.create_task("test-scope", "scoped", "go", scope=["small/", "top.py"])
+        manager.wait_for_task(task_id, 5)
+        assert manager.get_task_status(task_id).result.data["scope"] == ["small/", "top.py"], "Scope not passed to agent"
+    finally:
+        manager.cleanup()
+    assert "parallel-explore" in TaskTool().get_parameters_schema()["properties"]["subagent_type"]["enum"], "Agent type not registered"
+    
+    # Without a budget, the default token budget is still split across the partitions
+    child_budgets = []
+    
+    class BudgetAgent:
+        def __init__(self, description, constraints=None, output_format=None):
+            self.budget = None
+        
+        def execute(self, prompt):
+            child_budgets.append(self.budget)
+            return ToolResult(success=True, data={"llm_result": {"llm_response": "findings"}})
+    
+    register_agent_type("explore-agent", BudgetAgent)
+    cwd = os.getcwd()
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            for name in ("a", "b", "c"):
+                os.makedirs(os.path.join(tmp, name))
+                with open(os.path.join(tmp, name, "mod.py"), "w") as f:
+                    f.write("x = 1\n" * 500)
+            os.chdir(tmp)
+            result = ParallelExploreAgent("explore").execute("map it")
+        assert result.metadata["partitions"] == 3, f"Unexpected partitions: {result.metadata}"
+        limits = [b.max_total_tokens if b else None for b in child_budgets]
+        share = ParallelExploreAgent.TOKEN_BUDGET // 4
+        assert limits == [share] * 3, f"Default budget not split: {limits}"
+    finally:
+        os.chdir(cwd)
+        _agent_factories.pop("explore-agent", None)
+    print("  ✓ Tree partitioning works correctly")
+
+
+def test_plan_execution():
+    """Test structured plan validation and execution as a task graph."""
+    print("Testing Plan Execution...")
+    import time
+    from claude_code.planning import PlanExecutor, parse_plan
+    from claude_code.tools.base import ToolResult
+    from claude_code.tools.task_tool import TaskManager, register_agent_type
+    
+    class SleepAgent:
+        def __init__(self, description, constraints=None, output_format=None):
+            self.description = description
+        
+        def execute(self, prompt):
+            time.sleep(0.2)
+            return ToolResult(success=prompt != "fail", data={"done": self.description})
+    
+    register_agent_type("test-sleep", SleepAgent)
+    plan = parse_plan("""Here is the plan:
+```json
+{"goal": "diamond", "steps": [
+  {"id": "a", "description": "a", "agent_type": "test-sleep", "prompt": "go"},
+  {"id": "b", "description": "b", "agent_type": "test-sleep", "prompt": "go", "depends_on": ["a"]},
+  {"id": "c", "description": "c", "agent_type": "test-sleep", "prompt": "go", "depends_on": ["a"]},
+  {"id": "d", "description": "d", "agent_type": "test-sleep", "prompt": "go", "depends_on": ["b", "c"]}
+]}
+```""")
+    for bad in ['{"steps": [{"id": "a", "description": "a", "prompt": "p", "depends_on": ["a"]}]}',
+                '{"steps": [{"id": "a", "description": "a", "prompt": "p", "depends_on": ["z"]}]}',
+                '{"steps": [{"id": "a", "description": "a", "prompt": "p", "agent_type": "nope"}]}',
+                'no plan here']:
+        try:
+            parse_plan(bad)
+            assert False, f"Invalid plan accepted: {bad}"
+        except ValueError:
+            pass
+    
+    manager = TaskManager()
+    try:
+        result = PlanExecutor(manager).execute(plan, timeout=10)
+        assert result.success, f"Plan failed: {result.data}"
+        steps = {step["id"]: step for step in result.data["steps"]}
+        assert abs(steps["b"]["started_after"] - steps["c"]["started_after"]) < 0.15, "Independent steps not concurrent"
+        assert steps["d"]["started_after"] >= steps["b"]["started_after"] + steps["b"]["duration"], "Dependency not awaited"
+        assert result.metadata["wall_seconds"] < 0.75 and result.metadata["speedup"] > 1.1, f"No parallelism: {result.metadata}"
+        
+        failing = plan.model_copy(deep=True)
+        failing.steps[1].prompt = "fail"
+        result = PlanExecutor(manager).execute(failing, timeout=10)
+        statuses = {step["id"]: step["status"] for step in result.data["steps"]}
+        assert not result.success and statuses == {"a": "completed", "b": "failed", "c": "completed", "d": "failed"}, f"Failure not propagated: {statuses}"
+        assert steps["d"]["duration"] is not None and result.data["steps"][3]["duration"] is None, "Skipped step ran"
+    finally:
+        manager.cleanup()
+    
+    # Tasks that cannot be submitted fail, with their dependents, instead of hanging waiters
+    first = manager.create_task("test-sleep", "late", "go")
+    second = manager.create_task("test-sleep", "later", "go", depends_on=[first])
+    assert manager.wait_for_task(first).status == "failed", "Unsubmitted task not failed"
+    assert manager.wait_for_task(second).status == "failed", "Dependent of unsubmitted task not failed"
+    print("  ✓ Plan execution works correctly")
+
+
+def test_agent_budgets():
+    """Test token, tool-call and time budgets in the LLM tool loop."""
+    print("Testing Agent Budgets...")
+    import json
+    import time
+    from types import SimpleNamespace
+    from claude_code.budget import Budget, BudgetTracker
+    from claude_code.llm_client import LLMClient
+    from claude_code.tools.base import BaseTool, ToolResult
+    from claude_code.tools.task_tool import TaskManager, register_agent_type
+    
+    class EchoTool(BaseTool):
+        def __init__(self, name):
+            super().__init__(name=name, description="Echo")
+            self.calls = 0
+        
+        def execute(self, **kwargs):
+            self.calls += 1
+            return ToolResult(success=True, data=kwargs)
+        
+        def get_parameters_schema(self):
+            return {"type": "object", "properties": {}}
+    
+    def looping_llm(**kwargs):
+        # A confused model that asks for both tools forever
+        calls = [SimpleNamespace(id=f"call_{name}", function=SimpleNamespace(name=name, arguments=json.dumps({"n": 1})))
+                 for name in ("alpha", "beta")]
+        message = SimpleNamespace(content="partial findings", tool_calls=calls)
+        return SimpleNamespace(choices=[SimpleNamespace(message=message)],
+                               usage=SimpleNamespace(prompt_tokens=100, completion_tokens=20))
+    
+    client = LLMClient(api_key="test-key")
+    client.chat_completion = looping_llm
+    alpha, beta = EchoTool("alpha"), EchoTool("beta")
+    budget = Budget(max_total_tokens=500, max_tool_calls_per_tool={"alpha": 2},
+                    prompt_price_per_million=1000, completion_price_per_million=1000)
+    result = client.execute_with_tools("system", "user", {"alpha": alpha, "beta": beta}, budget=budget)
+    assert result.success and result.data["budget_exhausted"] == "token budget of 500 reached", f"Budget not enforced: {result.data}"
+    assert result.data["llm_response"] == "partial findings", "Partial result lost"
+    spend = result.metadata["budget"]
+    assert spend["total_tokens"] == 600 and spend["iterations"] == 5 and spend["cost_usd"] == 0.6, f"Bad spend: {spend}"
+    assert (alpha.calls, beta.calls) == (2, 5) and spend["tool_calls"] == {"alpha": 2, "beta": 5}, "Per-tool budget not enforced"
+    
+    result = client.execute_with_tools("system", "user", {"alpha": alpha}, budget=Budget(deadline_seconds=0))
+    assert result.data["budget_exhausted"].startswith("deadline") and result.data["iterations"] == 0, "Deadline not enforced"
+    
+    shares = Budget(max_total_tokens=900, max_tool_calls=10, max_cost_usd=0.3, deadline_seconds=60).split(3, deadline_seconds=20)
+    assert (shares.max_total_tokens, shares.max_tool_calls, shares.deadline_seconds) == (300, 3, 20), f"Bad split: {shares}"
+    assert abs(shares.max_cost_usd - 0.1) < 1e-9, "Cost not split"
+    
+    # A tracker started by the caller charges its time to the run
+    tracker = BudgetTracker(Budget(deadline_seconds=0.05))
+    time.sleep(0.1)
+    result = client.execute_with_tools("system", "user", {"alpha": alpha}, tracker=tracker)
+    assert result.data["budget_exhausted"].startswith("deadline"), "Caller's tracker not used"
+    
+    # The timeout of wait_for_all_tasks bounds the whole wait, not each task
+    class SlowAgent:
+        def __init__(self, description, constraints=None, output_format=None):
+            pass
+        
+        def execute(self, prompt):
+            time.sleep(1)
+            return ToolResult(success=True, data={})
+    
+    register_agent_type("test-slow", SlowAgent)
+    manager = TaskManager()
+    for i in range(4):
+        manager.create_task("test-slow", f"slow {i}", "go")
+    started = time.time()
+    manager.wait_for_all_tasks(timeout=0.2)
+    assert time.time() - started < 0.5, "Timeout applied per task"
+    manager.cleanup()
+    print("  ✓ Agent budgets work correctly")
+
+
+def test_file_watcher():
+    """Test change events from the watcher, FileTool and the index overlay."""
+    print("Testing File Watcher...")
+    import tempfile
+    from claude_code.tools import FileTool
+    from claude_code.indexing import build_index, get_path_index, get_trigram_index
+    from claude_code.indexing.watcher import ChangeBus, FileWatcher, PollingWatcher, get_change_bus, is_watched, \
+        watch_directory
+    try:
+        FileWatcher("/", ChangeBus())
+        assert False, "Abstract FileWatcher instantiated"
+    except TypeError:
+        pass
+    with tempfile.TemporaryDirectory() as tmp:
+        bus = ChangeBus()
+        seen = []
+        bus.subscribe(seen.extend)
+        watcher = PollingWatcher(tmp, bus, interval=0.05)
+        with open(os.path.join(tmp, "a.txt"), "w") as f:
+            f.write("hello\n")
+        watcher.flush()
+        assert [(os.path.basename(c.path), c.kind) for c in seen] == [("a.txt", "created")], f"Unexpected events: {seen}"
+        
+        for i in range(3):
+            with open(os.path.join(tmp, f"mod{i}.py"), "w") as f:
+                f.write(f"value_{i} = {i}\n")
+        build_index(tmp)
+        index = get_trigram_index(tmp)
+        index.watch()
+        
+        published = []
+        token = get_change_bus().subscribe(published.extend)
+        try:
+            FileTool().execute(action="write", file_path=os.path.join(tmp, "mod1.py"), content="needle = 1\n")
+        finally:
+            get_change_bus().unsubscribe(token)
+        assert any(c.path.endswith("mod1.py") for c in published), "FileTool write not published"
+        
+        os.remove(os.path.join(tmp, "mod2.py"))
+        with open(os.path.join(tmp, "extra.py"), "w") as f:
+            f.write("needle = 2\n")
+        watch_directory(tmp, holder=index).flush()
+        names = sorted(os.path.basename(p) for p in index.candidates("needle"))
+        assert names == ["extra.py", "mod1.py"], f"Overlay not applied: {names}"
+        assert not any(p.endswith("mod2.py") for p in index.candidates(r"\w+")), "Deleted file still a candidate"
+        
+        # The watcher runs while any index still needs it
+        path_index = get_path_index(tmp)
+        path_index.watch()
+        index.unwatch()
+        assert is_watched(tmp), "Watcher stopped while another index needs it"
+        path_index.unwatch()
+        assert not is_watched(tmp), "Watcher still running after every index unwatched"
+    print("  ✓ File watcher and incremental index updates work correctly")
+
+
+def test_bash_sandbox():
+    """Test bash tool resource-limit profiles."""
+    print("Testing Bash Sandbox...")
+    import tempfile
+    import warnings
+    from claude_code.tools.sandbox import DEFAULT_PRESET, ExecutionProfile
+    if not ExecutionProfile().is_supported():
+        print("  - Skipped (resource limits not supported on this platform)")
+        return
+    bash = BashTool(ExecutionProfile(cpu_seconds=5, max_file_size_mb=1))
+    result = bash.execute("ulimit -t", "Check CPU limit")
+    assert result.success, f"Sandboxed command failed: {result.error}"
+    assert result.data["stdout"].strip() == "5", "CPU limit not applied"
+    result = bash.execute("head -c 2000000 /dev/zero > /dev/null", "Write to null device")
+    assert result.success, "File size limit should not affect pipes"
+    with tempfile.TemporaryDirectory() as tmp:
+        result = bash.execute("head -c 500000 /dev/zero > small.bin", "Write under the file size limit", tmp)
+        assert result.success, f"File under the limit rejected: {result.error}"
+        result = bash.execute("head -c 2000000 /dev/zero > big.bin", "Write over the file size limit", tmp)
+        assert not result.success and os.path.getsize(os.path.join(tmp, "big.bin")) <= 1024 * 1024, \
+            "File size limit not applied"
+    
+    # A typo in the preset name falls back to the default preset instead of failing
+    previous = os.environ.get("BASH_SANDBOX_PROFILE")
+    os.environ["BASH_SANDBOX_PROFILE"] = "strcit"
+    try:
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            profile = BashTool().profile
+        assert profile is not None and profile.name == DEFAULT_PRESET, f"No fallback profile: {profile}"
+        assert caught, "Unknown preset not reported"
+    finally:
+        if previous is None:
+            del os.environ["BASH_SANDBOX_PROFILE"]
+        else:
+            os.environ["BASH_SANDBOX_PROFILE"] = previous
+    assert ExecutionProfile.from_preset("strict").max_processes is None, "Preset limits all processes of the user"
+    print("  ✓ Bash sandbox applies resource limits")
+
+
+def test_bash_command_cache():
+    """Test memoisation of read-only bash commands."""
+    print("Testing Bash Command Cache...")
+    import subprocess
+    import tempfile
+    from claude_code.tools.command_cache import CommandCache, is_read_only_command
+    assert is_read_only_command("git status") and is_read_only_command("ls -la | wc -l")
+    assert not is_read_only_command("ls > out.txt") and not is_read_only_command("find . -delete")
+    assert is_read_only_command("git branch -a") and is_read_only_command("git branch --list 'feat*'")
+    for command in ("git branch feature", "git branch -d old", "git diff --output=patch.txt",
+                    "git log --out=log.txt", "find . -fprint0 list", "find . -fls list", "sort -no out.txt",
+                    "sort -oout.txt", "git grep -O vim foo", "ls\nrm -rf build", "ls\rtouch x",
+                    "rg --pre cat foo", "rg --pre=cat foo"):
+        assert not is_read_only_command(command), f"Writing command cached: {command!r}"
+    
+    with tempfile.TemporaryDirectory() as tmp:
+        bash = BashTool(cache=CommandCache())
+        bash.execute("ls", "List files", tmp)
+        result = bash.execute("ls", "List files again", tmp)
+        assert result.metadata.get("cached"), "Repeated read-only command was not cached"
+        bash.execute("touch new.txt", "Create file", tmp)
+        result = bash.execute("ls", "List files after write", tmp)
+        assert not result.metadata.get("cached"), "Cache not invalidated after write"
+        assert "new.txt" in result.data["stdout"], "Stale listing returned"
+    
+    # A commit made elsewhere only moves the branch ref; cached git output must not survive it
+    with tempfile.TemporaryDirectory() as tmp:
+        bash = BashTool(cache=CommandCache())
+        git = ["git", "-c", "user.name=t", "-c", "user.email=t@t", "-c", "commit.gpgsign=false"]
+        subprocess.run(["git", "init", "-q"], cwd=tmp, check=True)
+        subprocess.run(git + ["commit", "-q", "--allow-empty", "-m", "first"], cwd=tmp, check=True)
+        bash.execute("git log --oneline", "Log", tmp)
+        subprocess.run(git + ["commit", "-q", "--allow-empty", "-m", "second"], cwd=tmp, check=True)
+        result = bash.execute("git log --oneline", "Log after commit", tmp)
+        assert not result.metadata.get("cached") and "second" in result.data["stdout"], "Stale git log returned"
+    print("  ✓ Bash command cache works correctly")
+
+
+def test_python_tool():
+    """Test Python snippet execution in warm workers."""
+    print("Testing Python Tool...")
+    from claude_code.tools.python_tool import PythonTool, PythonWorkerPool
+    pool = PythonWorkerPool(size=1, max_calls_per_worker=2)
+    try:
+        python = PythonTool(pool)
+        result = python.execute("x = 21\nprint(x * 2)", "Compute answer")
+        assert result.success, f"Python snippet failed: {result.error}"
+        assert result.data["stdout"].strip() == "42", "Python snippet output incorrect"
+        
+        result = python.execute("print(x)", "Check isolation")
+        assert not result.success and "NameError" in result.error, "State leaked between snippets"
+        
+        result = python.execute("import time; time.sleep(10)", "Sleep too long", timeout=0.5)
+        assert not result.success and result.metadata["timed_out"], "Timeout not enforced"
+        
+        result = python.execute("print('recovered')", "Run after recycle")
+        assert result.success and "recovered" in result.data["stdout"], "Worker not replaced"
+    finally:
+        pool.shutdown()
+    
+    pool = PythonWorkerPool(size=1, max_calls_per_worker=10)
+    try:
+        python = PythonTool(pool)
+        code = "import os, subprocess, sys\nprint('a')\nos.write(1, b'b\\n')\nsubprocess.run(['echo', 'c'])\nos.write(2, b'e\\n')"
+        result = python.execute(code, "Write below sys.stdout")
+        assert result.data["stdout"] == "a\nb\nc\n", f"Fd output lost: {result.data}"
+        assert "e" in result.data["stderr"], "Fd 2 output lost"
+        
+        python.execute("import json\njson.dumps = None\njson.extra = 1", "Patch a preloaded module")
+        result = python.execute("import json\nprint(json.dumps([1]), hasattr(json, 'extra'))", "Use it again")
+        assert result.data["stdout"].strip() == "[1] False", f"Module state leaked: {result.data}"
+    finally:
+        pool.shutdown()
+    print("  ✓ Python tool works correctly")
+
+
 def test_task_tool():
     """Test task tool with subagents."""
     print("Testing Task Tool...")
@@ -137,7 +1230,32 @@ def main():
     try:
         test_bash_tool()
         test_file_tool()
+        test_file_ranged_read()
+        test_file_read_many()
+        test_file_edit_and_patch()
+        test_file_cache()
+        test_file_tree()
+        test_file_encoding_detection()
         test_search_tool()
+        test_search_single_pass()
+        test_search_parallel()
+        test_trigram_index()
+        test_search_filters()
+        test_search_streaming()
+        test_search_output_modes()
+        test_search_multi_pattern()
+        test_search_backends()
+        test_symbol_index()
+        test_bm25_retrieval()
+        test_path_finder()
+        test_repo_map()
+        test_partition_tree()
+        test_plan_execution()
+        test_agent_budgets()
+        test_file_watcher()
+        test_bash_sandbox()
+        test_bash_command_cache()
+        test_python_tool()
         test_task_tool()
         test_parallel_tasks()
         